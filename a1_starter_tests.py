@@ -35,13 +35,26 @@ add further test cases in this file to improve your confidence in your code.
 Tip: if you put your mouse inside a pytest function and right click, the "run"
 menu will give you the option of running just that test function.
 """
+import itertools
+import pickle
+import random
+import time
 import pytest
-from typing import Dict
+from typing import Dict, List, Tuple
+import distance_map
 from distance_map import DistanceMap
 from domain import Truck, Parcel, Fleet
-from scheduler import GreedyScheduler
-from container import PriorityQueue, _shorter
-from experiment import SchedulingExperiment
+from scheduler import GreedyScheduler, RandomScheduler
+from container import PriorityQueue, IndexedPriorityQueue, BucketQueue, \
+    _shorter
+from partition import PartitionedScheduler
+from anytime import AnytimeScheduler
+from multistart import MultiStartScheduler
+from exact import ExactScheduler, EXACT_TOUR_LIMIT
+from cluster import ClusterScheduler
+from improve import improve_schedule, optimize_routes
+from experiment import SCHEDULERS, SchedulingExperiment, \
+    read_distance_map, compile_distance_map, load_distance_map
 
 # This variable is used in the special pytest test case defined by function
 # test_experiment below.  The variable defines a single scheduling experiment
@@ -84,6 +97,122 @@ def test_distance_map_basic() -> None:
     assert m.distance('Montreal', 'Toronto') == 4
 
 
+def test_distance_map_both_directions() -> None:
+    """Test DistanceMap lookups in both directions, and that the first
+    distance stored for a pair of cities is kept."""
+    m = DistanceMap()
+    m.add_distance('Montreal', 'Toronto', 4, 6)
+    m.add_distance('Toronto', 'Montreal', 10)
+    assert m.distance('Montreal', 'Toronto') == 4
+    assert m.distance('Toronto', 'Montreal') == 6
+    assert m.distance('Toronto', 'Ottawa') == -1
+
+
+def test_distance_map_dense_matches_sparse() -> None:
+    """Test that a dense DistanceMap agrees with a sparse one, both by city
+    name and by city id."""
+    sparse = read_distance_map('data/map-data.txt')
+    dense = read_distance_map('data/map-data.txt', dense=True)
+    assert dense.is_dense() and not sparse.is_dense()
+    n = dense.num_cities()
+    sources = [i for i in range(n) for _ in range(n)]
+    targets = [j for _ in range(n) for j in range(n)]
+    assert dense.distances(sources, targets) == \
+        sparse.distances(sources, targets)
+    for i, j in zip(sources, targets):
+        c1, c2 = dense.city_name(i), dense.city_name(j)
+        assert dense.distance(c1, c2) == sparse.distance(c1, c2)
+
+
+@pytest.mark.parametrize('dense', [False, True])
+def test_add_distances_matches_add_distance(dense: bool) -> None:
+    """Test that adding distances in bulk gives the same map as adding them
+    one at a time, including repeated pairs of cities."""
+    entries = [('A', 'B', 4, 1), ('B', 'C', 2), ('B', 'A', 9),
+               ('C', 'D', 3, 3), ('D', 'C', 8, 8), ('A', 'A', 5)]
+    one_at_a_time = DistanceMap(dense)
+    one_at_a_time.add_distance('D', 'E', 6)
+    for entry in entries:
+        one_at_a_time.add_distance(*entry)
+    bulk = DistanceMap(dense)
+    bulk.add_distance('D', 'E', 6)
+    bulk.add_distances(entries)
+    for c1 in 'ABCDEF':
+        for c2 in 'ABCDEF':
+            assert bulk.distance(c1, c2) == one_at_a_time.distance(c1, c2)
+    for add in [lambda: one_at_a_time.add_distance('E', 'F', 7, -1),
+                lambda: bulk.add_distances([('E', 'F', 7, -1)])]:
+        with pytest.raises(ValueError):
+            add()
+    assert bulk.distance('E', 'F') == one_at_a_time.distance('E', 'F') == -1
+
+
+def test_complete_distances_dijkstra_matches_floyd_warshall() -> None:
+    """Test that both shortest path algorithms used by
+    DistanceMap.complete_distances fill in the same distances."""
+    floyd = DistanceMap()
+    dijkstra = DistanceMap()
+    roads = [('A', 'B', 4, 1), ('B', 'C', 2, 7), ('C', 'D', 3, 3),
+             ('A', 'D', 20, 20), ('E', 'F', 1, 1)]
+    for c1, c2, d1, d2 in roads:
+        floyd.add_distance(c1, c2, d1, d2)
+        dijkstra.add_distance(c1, c2, d1, d2)
+    floyd.complete_distances()
+    old_limit = distance_map.FLOYD_WARSHALL_LIMIT
+    distance_map.FLOYD_WARSHALL_LIMIT = 0
+    try:
+        dijkstra.complete_distances()
+    finally:
+        distance_map.FLOYD_WARSHALL_LIMIT = old_limit
+    assert floyd.distance('A', 'D') == 20
+    assert floyd.distance('D', 'B') == 10
+    assert floyd.distance('A', 'E') == -1
+    # Adding a road after completing the map only fills in distances that
+    # are still missing, whether the map was completed at once or lazily.
+    floyd.add_distance('D', 'E', 1)
+    dijkstra.add_distance('D', 'E', 1)
+    for c1 in 'ABCDEF':
+        for c2 in 'ABCDEF':
+            assert floyd.distance(c1, c2) == dijkstra.distance(c1, c2)
+    assert dijkstra.export_matrix() == floyd.export_matrix()
+
+
+@pytest.mark.parametrize('dense', [False, True])
+def test_complete_distances_is_lazy_for_large_maps(dense: bool) -> None:
+    """Test that completing a large map does not compute every distance up
+    front, so that a road map of thousands of cities completes quickly, and
+    that the distances it looks up are shortest paths."""
+    n = 5000
+    dmap = DistanceMap(dense)
+    dmap.add_distances([(f'City{i}', f'City{(i + 1) % n}', 1, 3)
+                        for i in range(n)])
+    start = time.perf_counter()
+    dmap.complete_distances()
+    assert dmap.distance('City0', 'City10') == 10
+    assert dmap.distance('City10', 'City0') == 30
+    assert dmap.distance('City0', f'City{n - 1}') == 3
+    assert dmap.route_distance(['City0', 'City2500']) == 2500 + 2500
+    assert time.perf_counter() - start < 30
+
+
+def test_compiled_distance_map(tmp_path) -> None:
+    """Test that a compiled distance map loads the same distances as the
+    text map it was compiled from, and can still be changed."""
+    base = str(tmp_path / 'map-data')
+    compile_distance_map('data/map-data.txt', base)
+    text = read_distance_map('data/map-data.txt')
+    compiled = load_distance_map(base + '.dmap')
+    assert compiled.is_dense()
+    assert compiled.num_cities() == text.num_cities()
+    for i in range(text.num_cities()):
+        for j in range(text.num_cities()):
+            c1, c2 = text.city_name(i), text.city_name(j)
+            assert compiled.distance(c1, c2) == text.distance(c1, c2)
+    compiled.add_distance('Toronto', 'Barrie', 90)
+    assert compiled.distance('Barrie', 'Toronto') == 90
+    assert compiled.distance('Toronto', 'Hamilton') == 69
+
+
 def test_num_trucks_doctest() -> None:
     """Test the doctest provided for Fleet.num_trucks"""
     f = Fleet()
@@ -192,6 +321,47 @@ def test_average_distance_travelled_doctest() -> None:
     assert f.average_distance_travelled(m) == 18.0
 
 
+def test_parcels_and_trucks_have_fixed_attributes() -> None:
+    """Test that parcels and trucks cannot be given new attributes, and still
+    survive pickling, which the parallel schedulers rely on."""
+    parcel = Parcel(1, 5, 'Toronto', 'Guelph')
+    truck = Truck(1, 10, 'Toronto')
+    truck.pack(parcel)
+    for obj in [parcel, truck]:
+        with pytest.raises(AttributeError):
+            obj.colour = 'red'
+    copy = pickle.loads(pickle.dumps(truck))
+    assert (copy.id, copy.capacity, copy.current, copy.routes) == \
+        (1, 10, 5, ['Toronto', 'Guelph'])
+    assert [(p.id, p.volume, p.source, p.destiny) for p in copy.parcels] == \
+        [(1, 5, 'Toronto', 'Guelph')]
+
+
+def test_distances_travelled_matches_route_legs() -> None:
+    """Test that Fleet.distances_travelled agrees with adding up the legs of
+    each truck's route one at a time."""
+    config = {'depot_location': 'Toronto',
+              'parcel_file': 'data/parcel-data-small.txt',
+              'truck_file': 'data/truck-data-small.txt',
+              'map_file': 'data/map-data.txt',
+              'algorithm': 'random',
+              'dense_map': True,
+              'verbose': False}
+    experiment = SchedulingExperiment(config)
+    experiment.run()
+    m = experiment.dmap
+    distances = experiment.fleet.distances_travelled(m)
+    for truck in experiment.fleet.trucks:
+        tour = truck.routes[:]
+        if tour[-1] != tour[0]:
+            tour.append(tour[0])
+        expected = sum(m.distance(tour[i - 1], tour[i])
+                       for i in range(1, len(tour)))
+        assert distances[truck.id] == expected
+    assert sum(distances.values()) == \
+        experiment.fleet.total_distance_travelled(m)
+
+
 def test_priority_queue_is_empty_doctest() -> None:
     """Test the doctest provided for PriorityQueue.is_empty"""
     pq = PriorityQueue(str.__lt__)
@@ -215,6 +385,96 @@ def test_priority_queue_add_remove_doctest() -> None:
     assert pq.remove() == 'monalisa'
 
 
+def test_priority_queue_fifo_ties() -> None:
+    """Test that PriorityQueue removes items in the same order as a stable
+    sort by priority, when items are added and removed in turn."""
+    rng = random.Random(148)
+    words = [rng.choice(['a', 'bb', 'ccc', 'dd', 'e']) + str(i)
+             for i in range(200)]
+    pq = PriorityQueue(_shorter)
+    waiting = []
+    removed = []
+    expected = []
+    for i, word in enumerate(words):
+        pq.add(word)
+        waiting.append(word)
+        if i % 3 == 2:
+            removed.append(pq.remove())
+            waiting.sort(key=len)
+            expected.append(waiting.pop(0))
+    while not pq.is_empty():
+        removed.append(pq.remove())
+    assert removed == expected + sorted(waiting, key=len)
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_priority_queue_key_matches_higher_priority(reverse: bool) -> None:
+    """Test that a PriorityQueue ordered by a key, filled with add_all, removes
+    items in the same order as one ordered by the equivalent comparison."""
+    rng = random.Random(148)
+    words = [rng.choice(['ant', 'bee', 'cat', 'dog']) + str(i % 3)
+             for i in range(100)]
+    if reverse:
+        by_key = PriorityQueue(key=lambda w: w[:3], reverse=True)
+        by_function = PriorityQueue(lambda a, b: a[:3] > b[:3])
+    else:
+        by_key = PriorityQueue(key=lambda w: w[:3])
+        by_function = PriorityQueue(lambda a, b: a[:3] < b[:3])
+    by_key.add_all(words)
+    for word in words:
+        by_function.add(word)
+    while not by_function.is_empty():
+        assert by_key.remove() == by_function.remove()
+    assert by_key.is_empty()
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_bucket_queue_matches_priority_queue(reverse: bool) -> None:
+    """Test that a BucketQueue removes items in the same order as a
+    PriorityQueue with the same key, when items are added and removed in
+    turn."""
+    rng = random.Random(148)
+    parcels = [Parcel(i, rng.randint(5, 25), 'Toronto', 'Guelph')
+               for i in range(300)]
+    bq = BucketQueue(lambda p: p.volume, reverse)
+    pq = PriorityQueue(key=lambda p: p.volume, reverse=reverse)
+    for i, parcel in enumerate(parcels):
+        bq.add(parcel)
+        pq.add(parcel)
+        if i % 4 == 3:
+            assert bq.remove() is pq.remove()
+    while not pq.is_empty():
+        assert bq.remove() is pq.remove()
+    assert bq.is_empty()
+
+
+def test_indexed_priority_queue_updates() -> None:
+    """Test IndexedPriorityQueue against a simple model, while items are added,
+    removed, re-prioritized and discarded at random."""
+    rng = random.Random(148)
+    pq = IndexedPriorityQueue(key=lambda p: p.volume)
+    live = []
+    for i in range(2000):
+        action = rng.random()
+        if action < 0.4 or not live:
+            parcel = Parcel(i, rng.randint(1, 10), 'Toronto', 'Guelph')
+            live.append((pq.add(parcel), i))
+        elif action < 0.6:
+            handle, _ = rng.choice(live)
+            handle.item.volume = rng.randint(1, 10)
+            pq.update_priority(handle)
+        elif action < 0.75:
+            handle = live.pop(rng.randrange(len(live)))[0]
+            pq.discard(handle)
+            with pytest.raises(ValueError):
+                pq.discard(handle)
+        else:
+            expected = min(live, key=lambda h: (h[0].item.volume, h[1]))
+            live.remove(expected)
+            assert pq.remove() is expected[0].item
+        assert pq.is_empty() == (not live)
+
+
 def test_greedy_scheduler_example() -> None:
     """Test GreedyScheduler on the example provided."""
     p17 = Parcel(17, 25, 'York', 'Toronto')
@@ -259,6 +519,454 @@ def test_greedy_scheduler_example() -> None:
     assert truck_parcels[3] == [21, 13]
 
 
+def test_random_scheduler_is_uniform() -> None:
+    """Test that RandomScheduler only packs a parcel into a truck with enough
+    space, and picks each such truck about equally often."""
+    random.seed(148)
+    counts = {1: 0, 2: 0, 3: 0, 4: 0}
+    for _ in range(3000):
+        trucks = [Truck(1, 10, 'York'), Truck(2, 40, 'York'),
+                  Truck(3, 25, 'York'), Truck(4, 30, 'York')]
+        unscheduled = RandomScheduler().schedule(
+            [Parcel(1, 20, 'York', 'London')], trucks)
+        assert unscheduled == []
+        for truck in trucks:
+            counts[truck.id] += len(truck.parcels)
+    assert counts[1] == 0
+    for tid in (2, 3, 4):
+        assert 900 < counts[tid] < 1100
+
+
+def test_greedy_session_matches_schedule() -> None:
+    """Test that submitting parcels to a GreedySession in priority order, in
+    several batches, gives the same schedule as scheduling them all at once."""
+    rng = random.Random(148)
+    cities = ['Guelph', 'London', 'Ottawa', 'Windsor']
+    parcels = [Parcel(i, rng.randint(5, 25), 'York', rng.choice(cities))
+               for i in range(200)]
+    capacities = [rng.randint(20, 120) for _ in range(20)]
+    config = {'parcel_priority': 'volume', 'parcel_order': 'non-increasing',
+              'truck_order': 'non-decreasing'}
+    scheduler = GreedyScheduler(config)
+
+    trucks = [Truck(i, c, 'York') for i, c in enumerate(capacities)]
+    expected = scheduler.schedule(parcels, trucks)
+
+    online = [Truck(i, c, 'York') for i, c in enumerate(capacities)]
+    session = scheduler.session(online)
+    ordered = sorted(parcels, key=lambda p: p.volume, reverse=True)
+    unscheduled = session.submit_many(ordered[:50])
+    for parcel in ordered[50:120]:
+        if not session.submit(parcel):
+            unscheduled.append(parcel)
+    unscheduled.extend(session.submit_many(ordered[120:]))
+
+    assert unscheduled == expected
+    assert [t.parcels for t in online] == [t.parcels for t in trucks]
+    assert [t.routes for t in online] == [t.routes for t in trucks]
+
+
+@pytest.mark.parametrize('order', ['non-decreasing', 'non-increasing'])
+def test_greedy_destination_order_matches_priority_queue(order: str) -> None:
+    """Test that the greedy scheduler by destination, which sorts the parcels
+    once, takes them in the same order as a PriorityQueue by destination,
+    including ties."""
+    rng = random.Random(148)
+    cities = ['Guelph', 'London', 'Ottawa', 'Windsor']
+    parcels = [Parcel(i, rng.randint(5, 25), 'York', rng.choice(cities))
+               for i in range(200)]
+    capacities = [rng.randint(20, 120) for _ in range(20)]
+    config = {'parcel_priority': 'destination', 'parcel_order': order,
+              'truck_order': 'non-decreasing'}
+    trucks = [Truck(i, c, 'York') for i, c in enumerate(capacities)]
+    unscheduled = GreedyScheduler(config).schedule(parcels, trucks)
+
+    pq = PriorityQueue(key=lambda p: p.destiny,
+                       reverse=order == 'non-increasing')
+    pq.add_all(parcels)
+    expected = [Truck(i, c, 'York') for i, c in enumerate(capacities)]
+    session = GreedyScheduler(config).session(expected)
+    missed = []
+    while not pq.is_empty():
+        parcel = pq.remove()
+        if not session.submit(parcel):
+            missed.append(parcel)
+
+    assert unscheduled == missed
+    assert [t.parcels for t in trucks] == [t.parcels for t in expected]
+
+
+def test_partitioned_scheduler_is_reproducible() -> None:
+    """Test that a seeded PartitionedScheduler running in several processes
+    schedules every parcel exactly once, within capacity, and gives the same
+    schedule every time."""
+    rng = random.Random(148)
+    cities = ['Guelph', 'London', 'Ottawa', 'Windsor']
+    parcels = [Parcel(i, rng.randint(5, 25), 'York', rng.choice(cities))
+               for i in range(200)]
+    capacities = [rng.randint(20, 120) for _ in range(20)]
+    results = []
+    for _ in range(2):
+        trucks = [Truck(i, c, 'York') for i, c in enumerate(capacities)]
+        scheduler = PartitionedScheduler(RandomScheduler(), workers=2, seed=1)
+        unscheduled = scheduler.schedule(parcels, trucks)
+        packed = [p.id for t in trucks for p in t.parcels]
+        assert sorted(packed + [p.id for p in unscheduled]) == list(range(200))
+        assert all(t.current == sum([p.volume for p in t.parcels])
+                   <= t.capacity for t in trucks)
+        results.append(([p.id for p in unscheduled],
+                        [[p.id for p in t.parcels] for t in trucks],
+                        [t.routes for t in trucks]))
+    assert results[0] == results[1]
+
+    random.seed(2)
+    state = random.getstate()
+    trucks = [Truck(i, c, 'York') for i, c in enumerate(capacities)]
+    PartitionedScheduler(RandomScheduler(), workers=1,
+                         seed=1).schedule(parcels, trucks)
+    assert random.getstate() == state
+
+
+def test_improve_schedule_keeps_parcels_and_never_worsens() -> None:
+    """Test that improving a random schedule keeps every parcel on exactly one
+    truck within capacity, and uses no more trucks or distance than before."""
+    rng = random.Random(148)
+    cities = ['Guelph', 'London', 'Ottawa', 'Windsor', 'Barrie']
+    dmap = DistanceMap()
+    for i, c1 in enumerate(['York'] + cities):
+        for c2 in cities[i:]:
+            dmap.add_distance(c1, c2, rng.randint(10, 100))
+    parcels = [Parcel(i, rng.randint(5, 25), 'York', rng.choice(cities))
+               for i in range(100)]
+    fleet = Fleet()
+    for i in range(15):
+        fleet.add_truck(Truck(i, rng.randint(50, 150), 'York'))
+    random.seed(148)
+    unscheduled = RandomScheduler().schedule(parcels, fleet.trucks)
+    before = (fleet.num_nonempty_trucks(), fleet.total_distance_travelled(dmap))
+
+    report = improve_schedule(fleet.trucks, dmap, 5.0)
+
+    after = (fleet.num_nonempty_trucks(), fleet.total_distance_travelled(dmap))
+    assert after <= before
+    assert report['trucks_freed'] == before[0] - after[0]
+    assert report['distance_saved'] == before[1] - after[1]
+    packed = sorted([p.id for t in fleet.trucks for p in t.parcels])
+    assert packed == sorted(set(range(100)) - {p.id for p in unscheduled})
+    for truck in fleet.trucks:
+        assert truck.current == sum([p.volume for p in truck.parcels])
+        assert truck.current <= truck.capacity
+
+
+def test_optimize_routes_keeps_parcels_and_never_worsens() -> None:
+    """Test that optimizing routes keeps the same parcels on each truck, visits
+    each of their destinations, matches the route to the parcel order, and
+    saves exactly the distance it reports."""
+    rng = random.Random(148)
+    cities = ['Guelph', 'London', 'Ottawa', 'Windsor', 'Barrie', 'Sudbury']
+    dmap = DistanceMap()
+    for i, c1 in enumerate(['York'] + cities):
+        for c2 in cities[i:]:
+            dmap.add_distance(c1, c2, rng.randint(10, 100),
+                              rng.randint(10, 100))
+    parcels = [Parcel(i, rng.randint(5, 25), 'York', rng.choice(cities))
+               for i in range(100)]
+    fleet = Fleet()
+    for i in range(10):
+        fleet.add_truck(Truck(i, rng.randint(100, 200), 'York'))
+    random.seed(148)
+    RandomScheduler().schedule(parcels, fleet.trucks)
+    loads = [sorted([p.id for p in t.parcels]) for t in fleet.trucks]
+    before = fleet.total_distance_travelled(dmap)
+
+    saved = optimize_routes(fleet.trucks, dmap, workers=1)
+
+    assert saved > 0
+    assert fleet.total_distance_travelled(dmap) == before - saved
+    assert [sorted([p.id for p in t.parcels]) for t in fleet.trucks] == loads
+    for truck in fleet.trucks:
+        route = [truck.routes[0]]
+        for parcel in truck.parcels:
+            if route[-1] != parcel.destiny:
+                route.append(parcel.destiny)
+        assert route == truck.routes
+
+
+@pytest.mark.parametrize('best, decreasing', [(False, False), (False, True),
+                                              (True, False), (True, True)])
+def test_bin_packing_schedulers(best: bool, decreasing: bool) -> None:
+    """Test that the First-Fit and Best-Fit schedulers choose the same truck
+    for each parcel as scanning every truck would."""
+    rng = random.Random(148)
+    parcels = [Parcel(i, rng.randint(5, 25), 'York', 'Guelph')
+               for i in range(200)]
+    capacities = [rng.randint(20, 120) for _ in range(20)]
+    ordered = parcels
+    if decreasing:
+        ordered = sorted(parcels, key=lambda p: p.volume, reverse=True)
+
+    expected = [Truck(i, c, 'York') for i, c in enumerate(capacities)]
+    expected_unscheduled = []
+    for parcel in ordered:
+        fits = [t for t in expected if t.unused_space() >= parcel.volume]
+        if best:
+            fits.sort(key=lambda t: t.unused_space())
+        if fits:
+            fits[0].pack(parcel)
+        else:
+            expected_unscheduled.append(parcel)
+
+    trucks = [Truck(i, c, 'York') for i, c in enumerate(capacities)]
+    name = 'best_fit' if best else 'first_fit'
+    if decreasing:
+        name += '_decreasing'
+    scheduler = SCHEDULERS[name]({}, DistanceMap())
+    assert scheduler.schedule(parcels, trucks) == expected_unscheduled
+    assert [t.parcels for t in trucks] == [t.parcels for t in expected]
+
+
+def test_anytime_scheduler_meets_deadline_and_improves() -> None:
+    """Test that the anytime scheduler returns close to its deadline, with a
+    schedule that is no worse than the greedy schedule it starts from, and
+    that with no time left it returns the greedy schedule unchanged."""
+    rng = random.Random(148)
+    cities = ['Guelph', 'London', 'Ottawa', 'Windsor', 'Barrie', 'Sudbury']
+    dmap = DistanceMap()
+    for i, c1 in enumerate(['York'] + cities):
+        for c2 in cities[i:]:
+            dmap.add_distance(c1, c2, rng.randint(10, 100))
+    parcels = [Parcel(i, rng.randint(5, 25), 'York', rng.choice(cities))
+               for i in range(300)]
+    capacities = [rng.randint(50, 150) for _ in range(40)]
+    config = {'parcel_priority': 'destination',
+              'parcel_order': 'non-decreasing',
+              'truck_order': 'non-increasing'}
+    deadline = 0.2
+    fleets = []
+    for scheduler in [GreedyScheduler(config),
+                      AnytimeScheduler(GreedyScheduler(config), dmap, 0),
+                      AnytimeScheduler(GreedyScheduler(config), dmap,
+                                       int(deadline * 1000))]:
+        fleet = Fleet()
+        for i, c in enumerate(capacities):
+            fleet.add_truck(Truck(i, c, 'York'))
+        start = time.perf_counter()
+        unscheduled = scheduler.schedule(parcels, fleet.trucks)
+        elapsed = time.perf_counter() - start
+        fleets.append((len(unscheduled), fleet.num_nonempty_trucks(),
+                       fleet.total_distance_travelled(dmap),
+                       [t.routes for t in fleet.trucks]))
+        for truck in fleet.trucks:
+            assert truck.current == sum([p.volume for p in truck.parcels])
+            assert truck.current <= truck.capacity
+    # Generous, so that a slow or loaded machine does not fail the test.
+    assert elapsed < deadline * 5
+    assert fleets[1] == fleets[0]
+    assert fleets[2][:3] <= fleets[0][:3]
+
+
+def test_multistart_scheduler_keeps_best_trial() -> None:
+    """Test that the multi-start scheduler gives the same schedule in parallel
+    as serially, and that it keeps the schedule of its best trial."""
+    rng = random.Random(148)
+    cities = ['Guelph', 'London', 'Ottawa', 'Windsor']
+    dmap = DistanceMap()
+    for i, c1 in enumerate(['York'] + cities):
+        for c2 in cities[i:]:
+            dmap.add_distance(c1, c2, rng.randint(10, 100))
+    parcels = [Parcel(i, rng.randint(5, 25), 'York', rng.choice(cities))
+               for i in range(100)]
+    capacities = [rng.randint(50, 150) for _ in range(12)]
+    results = []
+    for workers in [1, 2]:
+        fleet = Fleet()
+        for i, c in enumerate(capacities):
+            fleet.add_truck(Truck(i, c, 'York'))
+        scheduler = MultiStartScheduler(RandomScheduler(), dmap, 6, seed=10,
+                                        workers=workers)
+        random.seed(2)
+        state = random.getstate()
+        unscheduled = scheduler.schedule(parcels, fleet.trucks)
+        assert random.getstate() == state
+        stats = fleet.statistics(dmap, len(unscheduled))
+        best = [s for s in scheduler.trial_stats if s['best']]
+        assert len(best) == 1
+        assert {key: best[0][key] for key in stats} == stats
+        assert all((s['unscheduled'], -s['unused_trucks'], s['avg_distance'])
+                   >= (stats['unscheduled'], -stats['unused_trucks'],
+                       stats['avg_distance'])
+                   for s in scheduler.trial_stats)
+        results.append(([t.routes for t in fleet.trucks],
+                        scheduler.trial_stats))
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize('volumes, capacities', [([], [20]), ([5], []),
+                                                  ([30, 40], [10, 20])])
+def test_multistart_scheduler_when_nothing_is_packed(
+        volumes: List[int], capacities: List[int]) -> None:
+    """Test that the multi-start scheduler handles trials that pack no parcel:
+    no parcels, no trucks, or parcels larger than every truck."""
+    dmap = DistanceMap()
+    dmap.add_distance('York', 'Guelph', 10)
+    parcels = [Parcel(i, v, 'York', 'Guelph') for i, v in enumerate(volumes)]
+    trucks = [Truck(i, c, 'York') for i, c in enumerate(capacities)]
+    scheduler = MultiStartScheduler(RandomScheduler(), dmap, 3, workers=1)
+    unscheduled = scheduler.schedule(parcels, trucks)
+    assert sorted(p.id for p in unscheduled) == list(range(len(volumes)))
+    assert all(truck.parcels == [] for truck in trucks)
+    assert [(s['avg_distance'], s['avg_fullness'], s['unscheduled'])
+            for s in scheduler.trial_stats] == [(0, 0, len(parcels))] * 3
+
+
+@pytest.mark.parametrize('objective', ['trucks', 'distance'])
+def test_exact_scheduler_matches_brute_force(objective: str) -> None:
+    """Test that the exact scheduler finds a schedule as good as the best of
+    every possible assignment of parcels to trucks."""
+    rng = random.Random(148)
+    cities = ['Guelph', 'London', 'Ottawa']
+    places = {city: (rng.randint(0, 50), rng.randint(0, 50))
+              for city in ['York'] + cities}
+    dmap = DistanceMap()
+    for c1 in places:
+        for c2 in places:
+            if c1 < c2:
+                dmap.add_distance(c1, c2, 1 + abs(places[c1][0] - places[c2][0])
+                                  + abs(places[c1][1] - places[c2][1]))
+
+    def shortest(load: List[Parcel]) -> int:
+        stops = {p.destiny for p in load}
+        return min([dmap.route_distance(['York'] + list(tour))
+                    for tour in itertools.permutations(stops)])
+
+    def score(unscheduled: int, loads: List[List[Parcel]]) -> Tuple:
+        used = len([load for load in loads if load])
+        distance = sum([shortest(load) for load in loads])
+        if objective == 'trucks':
+            return unscheduled, used, distance
+        return unscheduled, distance, used
+
+    for _ in range(10):
+        parcels = [Parcel(i, rng.randint(3, 20), 'York', rng.choice(cities))
+                   for i in range(5)]
+        capacities = [rng.randint(10, 40) for _ in range(3)]
+        best = None
+        for owners in itertools.product(range(-1, 3), repeat=5):
+            loads = [[p for p, t in zip(parcels, owners) if t == truck]
+                     for truck in range(3)]
+            if all(sum([p.volume for p in load]) <= c
+                   for load, c in zip(loads, capacities)):
+                candidate = score(owners.count(-1), loads)
+                best = candidate if best is None else min(best, candidate)
+
+        trucks = [Truck(i, c, 'York') for i, c in enumerate(capacities)]
+        scheduler = ExactScheduler(dmap, objective)
+        unscheduled = scheduler.schedule(parcels, trucks)
+        assert scheduler.optimal
+        assert score(len(unscheduled), [t.parcels for t in trucks]) == best
+        for truck in trucks:
+            assert dmap.route_distance(truck.routes) == shortest(truck.parcels)
+
+
+@pytest.mark.parametrize('objective', ['trucks', 'distance'])
+def test_exact_scheduler_without_triangle_inequality(objective: str) -> None:
+    """Test that the exact scheduler finds the best schedule on the example
+    map, whose distances break the triangle inequality, by comparing it with
+    every possible assignment of parcels to trucks."""
+    dmap = read_distance_map('data/map-data.txt')
+    cities = [dmap.city_name(c) for c in range(dmap.num_cities())]
+    rng = random.Random(35)
+    for _ in range(10):
+        depot = rng.choice(cities)
+        parcels = [Parcel(i, rng.randint(3, 20), depot,
+                          rng.choice([c for c in cities if c != depot]))
+                   for i in range(5)]
+        capacities = [rng.randint(10, 40) for _ in range(3)]
+
+        def shortest(load: List[Parcel]) -> int:
+            return min([dmap.route_distance([depot] + list(tour))
+                        for tour in itertools.permutations(
+                            {p.destiny for p in load})])
+
+        def score(unscheduled: int, loads: List[List[Parcel]]) -> Tuple:
+            used = len([load for load in loads if load])
+            distance = sum([shortest(load) for load in loads])
+            if objective == 'trucks':
+                return unscheduled, used, distance
+            return unscheduled, distance, used
+
+        best = None
+        for owners in itertools.product(range(-1, 3), repeat=5):
+            loads = [[p for p, t in zip(parcels, owners) if t == truck]
+                     for truck in range(3)]
+            if all(sum([p.volume for p in load]) <= c
+                   for load, c in zip(loads, capacities)):
+                candidate = score(owners.count(-1), loads)
+                best = candidate if best is None else min(best, candidate)
+
+        trucks = [Truck(i, c, depot) for i, c in enumerate(capacities)]
+        scheduler = ExactScheduler(dmap, objective)
+        unscheduled = scheduler.schedule(parcels, trucks)
+        assert scheduler.optimal
+        assert score(len(unscheduled), [t.parcels for t in trucks]) == best
+        for truck in trucks:
+            assert dmap.route_distance(truck.routes) == shortest(truck.parcels)
+
+
+def test_exact_scheduler_is_not_optimal_with_heuristic_tours() -> None:
+    """Test that the exact scheduler does not claim an optimal schedule when a
+    truck's tour goes through more cities than it can route exactly."""
+    cities = [f'City{i}' for i in range(EXACT_TOUR_LIMIT + 1)]
+    dmap = DistanceMap()
+    for i, c1 in enumerate(['York'] + cities):
+        for c2 in cities[i:]:
+            dmap.add_distance(c1, c2, 10)
+    for stops, optimal in [(EXACT_TOUR_LIMIT, True),
+                           (EXACT_TOUR_LIMIT + 1, False)]:
+        parcels = [Parcel(i, 1, 'York', city)
+                   for i, city in enumerate(cities[:stops])]
+        trucks = [Truck(1, 100, 'York')]
+        scheduler = ExactScheduler(dmap)
+        assert scheduler.schedule(parcels, trucks) == []
+        assert len(trucks[0].routes) == stops + 1
+        assert scheduler.optimal == optimal
+
+
+def test_cluster_scheduler_keeps_regions_together() -> None:
+    """Test that the cluster scheduler never sends a truck to two regions far
+    apart, and travels less than the greedy scheduler by destination."""
+    rng = random.Random(148)
+    places = {'York': (0, 0)}
+    for region, (x, y) in enumerate([(100, 0), (0, 100), (-100, 0)]):
+        for i in range(10):
+            places[f'{region}-{i}'] = (x + rng.randint(-10, 10),
+                                       y + rng.randint(-10, 10))
+    dmap = DistanceMap()
+    for c1 in places:
+        for c2 in places:
+            if c1 < c2:
+                dmap.add_distance(c1, c2, abs(places[c1][0] - places[c2][0])
+                                  + abs(places[c1][1] - places[c2][1]))
+    parcels = [Parcel(i, 10, 'York', city) for i, city in
+               enumerate(sorted(places)[:-1] * 2)]
+    fleets = []
+    for scheduler in [ClusterScheduler(dmap),
+                      GreedyScheduler({'parcel_priority': 'destination',
+                                       'parcel_order': 'non-decreasing',
+                                       'truck_order': 'non-decreasing'})]:
+        fleet = Fleet()
+        for i in range(3):
+            fleet.add_truck(Truck(i, 200, 'York'))
+        assert scheduler.schedule(parcels, fleet.trucks) == []
+        assert len({p.id for t in fleet.trucks for p in t.parcels}) == 60
+        fleets.append(fleet)
+
+    for truck in fleets[0].trucks:
+        assert len({city.split('-')[0] for city in truck.routes[1:]}) == 1
+    distances = [fleet.total_distance_travelled(dmap) for fleet in fleets]
+    assert distances[0] < distances[1]
+
+
 ################################################################################
 # The test below uses pytest.mark.parametrize.
 #
@@ -0,0 +1,154 @@
+"""Assignment 1 - Anytime scheduling
+
+CSC148, Winter 2021
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2021 Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+===== Module Description =====
+
+This module contains the class AnytimeScheduler, which returns a schedule
+within a deadline.
+
+It first builds a schedule quickly with another scheduler, and then spends
+whatever time is left before the deadline improving it:
+1. moving parcels between trucks with improve_schedule,
+2. packing any parcels that did not fit into the space this frees, and
+3. shortening the trucks' routes with optimize_routes.
+Every stage keeps the schedule feasible and only ever makes it better, so the
+schedule it holds is the best one found so far at every moment.  All of this
+happens on copies of the trucks; the schedule is copied into the real trucks
+once, when time runs out or there is nothing left to improve.
+"""
+from time import perf_counter
+from typing import List
+from distance_map import DistanceMap
+from domain import Parcel, Truck
+from improve import improve_schedule, optimize_routes
+from packing import BestFitScheduler
+from scheduler import Scheduler
+
+# The share of the time left after the schedule is built that is given to
+# moving parcels between trucks.  The rest is left for reinserting parcels
+# and shortening routes.
+IMPROVE_SHARE = 0.75
+
+
+class AnytimeScheduler(Scheduler):
+    """A scheduler that builds a schedule and improves it until a deadline.
+
+    === Private Attributes ===
+    _scheduler:
+      The scheduler that builds the first schedule.
+    _dmap:
+      The distances used to improve schedules.
+    _deadline:
+      How many seconds a call to schedule may take.
+
+    === Representation Invariants ===
+    - <_deadline> >= 0
+    """
+    _scheduler: Scheduler
+    _dmap: DistanceMap
+    _deadline: float
+
+    def __init__(self, scheduler: Scheduler, dmap: DistanceMap,
+                 deadline_ms: int) -> None:
+        """Initialize a scheduler that builds schedules with <scheduler>, and
+        improves them using the distances in <dmap> until <deadline_ms>
+        milliseconds after it starts.
+
+        Precondition: <deadline_ms> >= 0
+        """
+        self._scheduler = scheduler
+        self._dmap = dmap
+        self._deadline = deadline_ms / 1000
+
+    def schedule(self, parcels: List[Parcel], trucks: List[Truck],
+                 verbose: bool = False) -> List[Parcel]:
+        """Schedule the given <parcels> onto the given <trucks>, returning
+        at about the deadline of this scheduler with the best schedule found
+        by then.
+
+        The deadline is only overrun when building the first schedule takes
+        longer than the deadline, or by the time one improving step takes.
+
+        Mutate the Truck objects in <trucks> so that they store information
+        about which parcel objects they will deliver and what route they will
+        take.  Do *not* mutate the list <parcels>, or any of the parcel objects
+        in that list.
+
+        Return a list containing the parcels that did not get scheduled onto any
+        truck, due to lack of capacity.
+
+        If <verbose> is True, print how long each stage took.
+
+        >>> from scheduler import GreedyScheduler
+        >>> config = {'parcel_priority': 'volume',
+        ...           'parcel_order': 'non-increasing',
+        ...           'truck_order': 'non-decreasing'}
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('York', 'Guelph', 10)
+        >>> dm.add_distance('York', 'London', 20)
+        >>> dm.add_distance('Guelph', 'London', 15)
+        >>> trucks = [Truck(1, 10, 'York'), Truck(2, 30, 'York')]
+        >>> parcels = [Parcel(1, 10, 'York', 'Guelph'),
+        ...            Parcel(2, 10, 'York', 'London'),
+        ...            Parcel(3, 20, 'York', 'Guelph')]
+        >>> scheduler = AnytimeScheduler(GreedyScheduler(config), dm, 1000)
+        >>> scheduler.schedule(parcels, trucks)
+        []
+        >>> [truck.routes for truck in trucks]
+        [['York', 'London'], ['York', 'Guelph']]
+        """
+        start = perf_counter()
+        copies = [truck.copy() for truck in trucks]
+        unscheduled = self._scheduler.schedule(parcels, copies)
+        if verbose:
+            print(f'Built a schedule in {perf_counter() - start:.3f}s')
+
+        left = self._deadline - (perf_counter() - start)
+        if left > 0:
+            report = improve_schedule(copies, self._dmap, left * IMPROVE_SHARE)
+            if unscheduled:
+                unscheduled = BestFitScheduler().schedule(unscheduled, copies)
+            left = self._deadline - (perf_counter() - start)
+            if verbose:
+                print(f'Improved it in {report["seconds"]:.3f}s: {report}')
+        if left > 0:
+            saved = optimize_routes(copies, self._dmap, budget=left)
+            if verbose:
+                print(f'Shortened routes by {saved}')
+
+        for truck, copy in zip(trucks, copies):
+            truck.parcels = copy.parcels
+            truck.routes = copy.routes
+            truck.current = copy.current
+        return unscheduled
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'time', 'distance_map', 'domain',
+                                   'improve', 'packing', 'scheduler'],
+        'allowed-io': ['AnytimeScheduler.schedule'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
@@ -0,0 +1,110 @@
+"""Assignment 1 - Memory used by parcels and trucks (No tasks)
+
+CSC148, Winter 2021
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2021 Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+===== Module Description =====
+
+This module measures how much memory each Parcel and Truck object takes, with
+tracemalloc, and compares it with the same classes when each object keeps its
+attributes in a dictionary of its own, as it would without __slots__.
+
+Only the objects themselves are counted: every parcel shares the same city
+names, and every truck has an empty list of parcels and a route of one city.
+The results are printed as a table.
+
+You have no tasks associated with this module.
+"""
+import tracemalloc
+from typing import Callable, List
+from domain import Parcel, Truck
+
+# How many objects of each kind to make for each measurement.
+NUM_OBJECTS = 100000
+
+# City names shared by all of the objects.
+CITIES = ['Toronto', 'Guelph', 'London', 'Ottawa', 'Kingston']
+
+
+class DictParcel(Parcel):
+    """A parcel that keeps its attributes in a dictionary of its own.
+
+    A subclass that does not set __slots__ gives each of its objects a
+    __dict__, so this is what a Parcel would be without __slots__.
+    """
+
+
+class DictTruck(Truck):
+    """A truck that keeps its attributes in a dictionary of its own."""
+
+
+def bytes_per_object(make: Callable[[int], object],
+                     n: int = NUM_OBJECTS) -> float:
+    """Return the average number of bytes allocated for each of <n> objects
+    made by calling <make> with 0, 1, ..., <n> - 1, not counting the list
+    that holds them.
+
+    >>> bytes_per_object(lambda i: None, 1000) < 1
+    True
+    """
+    objects = [None] * n
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(n):
+        objects[i] = make(i)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / n
+
+
+def measure() -> List[List[object]]:
+    """Return one row for parcels and one for trucks, each with the kind of
+    object, the bytes per object with and without __slots__, and the share
+    of memory saved.
+    """
+    rows = []
+    for kind, slotted, plain in [('Parcel', Parcel, DictParcel),
+                                 ('Truck', Truck, DictTruck)]:
+        if kind == 'Parcel':
+            sizes = [bytes_per_object(
+                lambda i, cls=cls: cls(i, 1 + i % 50, CITIES[0],
+                                       CITIES[1 + i % 4]))
+                for cls in [plain, slotted]]
+        else:
+            sizes = [bytes_per_object(
+                lambda i, cls=cls: cls(i, 100 + i % 50, CITIES[0]))
+                for cls in [plain, slotted]]
+        rows.append([kind, sizes[0], sizes[1], 1 - sizes[1] / sizes[0]])
+    return rows
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
+    import python_ta
+    python_ta.check_all(config={
+        'allowed-io': ['<module>'],
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'tracemalloc', 'domain'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
+
+    print(f'Bytes per object, over {NUM_OBJECTS} objects of each kind')
+    print(f'{"Class":<8}{"__dict__":>10}{"__slots__":>11}{"Saved":>8}')
+    for name, plain_size, slotted_size, saved in measure():
+        print(f'{name:<8}{plain_size:>10.1f}{slotted_size:>11.1f}'
+              f'{saved:>8.0%}')
@@ -0,0 +1,308 @@
+"""Assignment 1 - Clustered scheduling
+
+CSC148, Winter 2021
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2021 Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+===== Module Description =====
+
+This module contains the class ClusterScheduler, which keeps parcels for
+nearby cities on the same truck.
+
+Before scheduling, it groups the destinations of the parcels into clusters of
+cities that are close together, with k-medoids clustering: each cluster has
+one of its cities as its centre, or "medoid", and each city belongs to the
+cluster of the nearest medoid.  The distances between every two destinations
+are looked up once, into a matrix, and all of the clustering works on that
+matrix.
+
+Each cluster is then scheduled as a unit, from the largest total volume to
+the smallest, onto the truck with the least unused space that can take all
+of its parcels.  Within a cluster, parcels are packed in the order of a
+nearest-neighbour tour of its cities.  The parcels of clusters that fit on no
+truck are scheduled last, one at a time, by another scheduler.
+"""
+from array import array
+from bisect import bisect_left, insort
+from random import Random
+from typing import List, Optional
+from distance_map import DistanceMap, MATRIX_TYPECODE
+from domain import Parcel, Truck
+from scheduler import Scheduler, GreedyScheduler
+
+# The most rounds of reassigning cities to medoids and moving medoids.
+MEDOID_ROUNDS = 20
+
+# When moving a medoid, only this many of the cities of its cluster that are
+# closest to the current medoid are tried as the new one.
+MEDOID_CANDIDATES = 64
+
+# The scheduler that fills trucks with the parcels of clusters that could not
+# be scheduled as units, by default.
+FILL_CONFIG = {'parcel_priority': 'volume',
+               'parcel_order': 'non-increasing',
+               'truck_order': 'non-decreasing'}
+
+
+class ClusterScheduler(Scheduler):
+    """A scheduler that schedules clusters of nearby destinations together.
+
+    === Private Attributes ===
+    _dmap:
+      The distances between cities.
+    _clusters:
+      The number of clusters, or None to use about as many clusters as the
+      number of trucks needed to hold all of the parcels.
+    _seed:
+      The seed that chooses the first medoids.
+    _fill:
+      The scheduler for the parcels of clusters that do not fit on any truck
+      as a unit.
+    """
+    _dmap: DistanceMap
+    _clusters: Optional[int]
+    _seed: int
+    _fill: Scheduler
+
+    def __init__(self, dmap: DistanceMap, clusters: Optional[int] = None,
+                 seed: int = 0, fill: Optional[Scheduler] = None) -> None:
+        """Initialize a scheduler that clusters destinations by the distances
+        in <dmap> into <clusters> clusters, choosing the first medoids with
+        <seed>, and schedules parcels left over with <fill>, or a greedy
+        scheduler if <fill> is None.
+
+        Precondition: <clusters> is None or at least 1.
+        """
+        self._dmap = dmap
+        self._clusters = clusters
+        self._seed = seed
+        self._fill = GreedyScheduler(FILL_CONFIG) if fill is None else fill
+
+    def schedule(self, parcels: List[Parcel], trucks: List[Truck],
+                 verbose: bool = False) -> List[Parcel]:
+        """Schedule the given <parcels> onto the given <trucks>, keeping
+        parcels for nearby cities together.
+
+        Mutate the Truck objects in <trucks> so that they store information
+        about which parcel objects they will deliver and what route they will
+        take.  Do *not* mutate the list <parcels>, or any of the parcel objects
+        in that list.
+
+        Return a list containing the parcels that did not get scheduled onto any
+        truck, due to lack of capacity.
+
+        If <verbose> is True, print the clusters.
+
+        Precondition: <self._dmap> contains the distance between every two
+        destinations of <parcels>.
+
+        >>> dm = DistanceMap()
+        >>> for c1, c2, d in [('York', 'Guelph', 10), ('York', 'Kitchener', 12),
+        ...                   ('York', 'Ottawa', 40), ('York', 'Kingston', 35),
+        ...                   ('Guelph', 'Kitchener', 3),
+        ...                   ('Ottawa', 'Kingston', 8),
+        ...                   ('Guelph', 'Ottawa', 45),
+        ...                   ('Guelph', 'Kingston', 42),
+        ...                   ('Kitchener', 'Ottawa', 47),
+        ...                   ('Kitchener', 'Kingston', 44)]:
+        ...     dm.add_distance(c1, c2, d)
+        >>> parcels = [Parcel(1, 10, 'York', 'Guelph'),
+        ...            Parcel(2, 10, 'York', 'Ottawa'),
+        ...            Parcel(3, 10, 'York', 'Kitchener'),
+        ...            Parcel(4, 10, 'York', 'Kingston')]
+        >>> trucks = [Truck(1, 20, 'York'), Truck(2, 20, 'York')]
+        >>> ClusterScheduler(dm).schedule(parcels, trucks)
+        []
+        >>> sorted([sorted(t.routes[1:]) for t in trucks])
+        [['Guelph', 'Kitchener'], ['Kingston', 'Ottawa']]
+        """
+        groups = {}
+        for parcel in parcels:
+            groups.setdefault(parcel.destiny, []).append(parcel)
+        cities = list(groups)
+        n = len(cities)
+        if n == 0:
+            return []
+        matrix = _matrix(self._dmap, cities)
+
+        k = self._clusters
+        if k is None:
+            total = sum([parcel.volume for parcel in parcels])
+            capacity = sum([truck.capacity for truck in trucks])
+            k = -(-total * len(trucks) // max(capacity, 1))
+        k = max(1, min(k, n))
+        labels = _k_medoids(matrix, n, k, Random(self._seed))
+        clusters = [[] for _ in range(k)]
+        for i, label in enumerate(labels):
+            clusters[label].append(i)
+        clusters = [members for members in clusters if members]
+        if verbose:
+            for members in clusters:
+                print([cities[i] for i in members])
+
+        units = []
+        for members in clusters:
+            load = []
+            for i in _nearest_order(matrix, n, members):
+                load.extend(groups[cities[i]])
+            units.append((sum([parcel.volume for parcel in load]), load))
+        units.sort(key=lambda unit: unit[0], reverse=True)
+
+        by_space = sorted((truck.unused_space(), t)
+                          for t, truck in enumerate(trucks))
+        leftover = []
+        for volume, load in units:
+            pos = bisect_left(by_space, (volume, -1))
+            if pos == len(by_space):
+                leftover.extend(load)
+                continue
+            t = by_space.pop(pos)[1]
+            for parcel in load:
+                trucks[t].pack(parcel)
+            insort(by_space, (trucks[t].unused_space(), t))
+
+        if not leftover:
+            return []
+        return self._fill.schedule(leftover, trucks, verbose)
+
+
+# ----- Helper functions -----
+
+
+def _matrix(dmap: DistanceMap, cities: List[str]) -> array:
+    """Return the distances in <dmap> between every two of <cities>, as a
+    flat matrix in which the distance from <cities>[i] to <cities>[j] is at
+    position i * len(<cities>) + j.
+
+    The distances are looked up a row at a time.  A missing distance is
+    replaced by one longer than any two known distances put together, so
+    that cities with no known distance between them are never clustered
+    together if there is any other choice.
+
+    >>> dm = DistanceMap()
+    >>> dm.add_distance('York', 'Guelph', 10)
+    >>> dm.add_distance('Guelph', 'London', 15, 12)
+    >>> list(_matrix(dm, ['York', 'Guelph', 'London']))
+    [0, 10, 31, 10, 0, 15, 31, 12, 0]
+    """
+    n = len(cities)
+    ids = [dmap.city_id(city) for city in cities]
+    matrix = array(MATRIX_TYPECODE)
+    missing = False
+    for k, i in enumerate(ids):
+        row = dmap.distances([i] * n, ids)
+        row[k] = 0
+        missing = missing or -1 in row
+        matrix.extend(row)
+    if missing:
+        far = 2 * max(matrix) + 1
+        matrix = array(MATRIX_TYPECODE, [far if d < 0 else d for d in matrix])
+    return matrix
+
+
+def _k_medoids(matrix: array, n: int, k: int, rng: Random) -> List[int]:
+    """Cluster <n> cities into <k> clusters by k-medoids, and return the
+    cluster of each city, numbered from 0 to <k> - 1.
+
+    The distance from city i to city j is <matrix>[i * <n> + j], and cities
+    are compared by the distance there and back.  The first medoid is chosen
+    at random with <rng>, and each next one at random with probability in
+    proportion to its distance from the nearest medoid so far.  Then, until
+    nothing changes or MEDOID_ROUNDS rounds have passed, each city joins the
+    cluster of its nearest medoid, and each medoid moves to the city of its
+    cluster with the least total distance to the others.
+
+    Precondition: 1 <= <k> <= <n>
+
+    >>> matrix = array('i', [0, 1, 9, 9, 1, 0, 9, 9, 9, 9, 0, 1, 9, 9, 1, 0])
+    >>> labels = _k_medoids(matrix, 4, 2, Random(0))
+    >>> labels[0] == labels[1] != labels[2] == labels[3]
+    True
+    """
+    def gap(i: int, j: int) -> int:
+        return matrix[i * n + j] + matrix[j * n + i]
+
+    medoids = [rng.randrange(n)]
+    nearest = [gap(i, medoids[0]) for i in range(n)]
+    while len(medoids) < k:
+        total = sum(nearest)
+        if total == 0:
+            medoids.append(next(i for i in range(n) if i not in medoids))
+        else:
+            target = rng.random() * total
+            i = 0
+            while target >= nearest[i] or i in medoids:
+                target -= nearest[i]
+                i = (i + 1) % n
+            medoids.append(i)
+        nearest = [min(d, gap(i, medoids[-1])) for i, d in enumerate(nearest)]
+
+    labels = []
+    for _ in range(MEDOID_ROUNDS):
+        labels = [min(range(k), key=lambda m: (gap(i, medoids[m]), m))
+                  for i in range(n)]
+        members = [[] for _ in range(k)]
+        for i, label in enumerate(labels):
+            members[label].append(i)
+        moved = False
+        for m in range(k):
+            if not members[m]:
+                continue
+            candidates = sorted(members[m],
+                                key=lambda i: gap(i, medoids[m]))
+            best = min(candidates[:MEDOID_CANDIDATES],
+                       key=lambda c: (sum([gap(c, i) for i in members[m]]),
+                                      c != medoids[m]))
+            if best != medoids[m]:
+                medoids[m] = best
+                moved = True
+        if not moved:
+            break
+    return labels
+
+
+def _nearest_order(matrix: array, n: int, members: List[int]) -> List[int]:
+    """Return <members> in the order of a tour that starts at the first of
+    them and always goes on to the nearest city not yet visited, with the
+    distances in <matrix> as in _k_medoids.
+
+    >>> matrix = array('i', [0, 5, 1, 5, 0, 2, 1, 2, 0])
+    >>> _nearest_order(matrix, 3, [0, 1, 2])
+    [0, 2, 1]
+    """
+    order = [members[0]]
+    left = set(members[1:])
+    while left:
+        here = order[-1] * n
+        city = min(left, key=lambda j: (matrix[here + j], j))
+        order.append(city)
+        left.remove(city)
+    return order
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'array', 'bisect', 'random',
+                                   'distance_map', 'domain', 'scheduler'],
+        'allowed-io': ['ClusterScheduler.schedule'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
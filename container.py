@@ -17,10 +17,13 @@ Sophia Huynh, Maryam Majedi, and Jaisie Sin.
 
 ===== Module Description =====
 
-This module contains the Container and PriorityQueue classes.
+This module contains the Container class, and the PriorityQueue,
+IndexedPriorityQueue and BucketQueue classes that implement it.
 """
 
-from typing import Any, List, Callable
+from collections import deque
+from heapq import heapify, heappush, heappop
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
 
 
 class Container:
@@ -34,6 +37,12 @@ class Container:
         """
         raise NotImplementedError
 
+    def add_all(self, items: Iterable[Any]) -> None:
+        """Add every item in <items> to this Container, in order.
+        """
+        for item in items:
+            self.add(item)
+
     def remove(self) -> Any:
         """Remove and return a single item from this Container.
         """
@@ -53,6 +62,67 @@ def _shorter(a: str, b: str) -> bool:
     return len(a) < len(b)
 
 
+class _Priority:
+    """The priority of one item in a PriorityQueue, which makes items with
+    higher priority compare as smaller, and breaks ties by insertion order.
+
+    === Public Attributes ===
+    item:
+      The item whose priority this is.
+    order:
+      The number of items that were added to the queue before <item>.
+    higher_priority:
+      The function that the queue compares items with.
+    """
+    __slots__ = ('item', 'order', 'higher_priority')
+    item: Any
+    order: int
+    higher_priority: Callable[[Any, Any], bool]
+
+    def __init__(self, item: Any, order: int,
+                 higher_priority: Callable[[Any, Any], bool]) -> None:
+        """Initialize the priority of <item>, the <order>-th item added to a
+        queue that compares items with <higher_priority>.
+        """
+        self.item = item
+        self.order = order
+        self.higher_priority = higher_priority
+
+    def __lt__(self, other: '_Priority') -> bool:
+        """Return True iff <self> should be removed from the queue before
+        <other>.
+        """
+        if self.higher_priority(self.item, other.item):
+            return True
+        if self.higher_priority(other.item, self.item):
+            return False
+        return self.order < other.order
+
+
+class _Reversed:
+    """A wrapper around a key that reverses how it compares with other wrapped
+    keys, so that a larger key is treated as a smaller one.
+
+    === Public Attributes ===
+    key:
+      The wrapped key.
+    """
+    __slots__ = ('key',)
+    key: Any
+
+    def __init__(self, key: Any) -> None:
+        """Initialize a wrapper around <key>."""
+        self.key = key
+
+    def __eq__(self, other: Any) -> bool:
+        """Return True iff <self> and <other> wrap equal keys."""
+        return isinstance(other, _Reversed) and self.key == other.key
+
+    def __lt__(self, other: '_Reversed') -> bool:
+        """Return True iff <self> wraps a larger key than <other>."""
+        return other.key < self.key
+
+
 class PriorityQueue(Container):
     """A queue of items that operates in FIFO-priority order.
 
@@ -62,40 +132,78 @@ class PriorityQueue(Container):
     to be removed.
 
     Priority is defined by the <higher_priority> function that is provided at
-    time of initialization.
+    time of initialization, or else by a <key> function: items with smaller
+    keys have higher priority, or items with larger keys if <reverse> is True.
+    Keys are compared directly, without calling a Python function for each
+    comparison, so a <key> makes the queue considerably faster than an
+    equivalent <higher_priority> function.
 
     All objects in the container must be of the same type.
 
+    The queue is a binary heap, so adding and removing an item take
+    O(log n) time for a queue of n items.
+
     === Private Attributes ===
     _queue:
-      The end of the list represents the *front* of the queue, that is,
-      the next item to be removed.
+      A binary heap of entries, one for each item in the queue.  The front of
+      the heap, _queue[0], is the entry of the next item to be removed.  An
+      entry is [priority, item], where priority is the _Priority of item, if
+      <_key> is None, and [key, order, item] otherwise, where order is the
+      number of items that were added before item, and key is _key(item),
+      or _key(item) reversed if <_reverse> is True.
     _higher_priority:
       A function that compares two items by their priority.
       If <_higher_priority>(x, y) is true, then x has higher priority than y
-      and should be removed from the queue before y.
+      and should be removed from the queue before y.  None if <_key> is used.
+    _key:
+      A function that returns the key of an item, or None if
+      <_higher_priority> is used.
+    _reverse:
+      True iff items with larger keys have higher priority.
+    _count:
+      The number of items that have been added to this queue.
 
     === Representation Invariants ===
     - all elements of <_queue> are of the same type.
-    - the elements of <_queue> are appropriate arguments for the
-      function <_higher_priority>.
-    - the elements of <_queue> are in order according to the
-      function <_higher_priority>.
+    - the items in <_queue> are appropriate arguments for the
+      function <_higher_priority>, or <_key> if it is not None.
+    - exactly one of <_higher_priority> and <_key> is None.
+    - <_queue> satisfies the heap property: no entry is smaller than the
+      entry of its parent.
     """
-    _queue: List[Any]
-    _higher_priority: Callable[[Any, Any], bool]
-
-    def __init__(self, higher_priority: Callable[[Any, Any], bool]) -> None:
+    _queue: List[List[Any]]
+    _higher_priority: Optional[Callable[[Any, Any], bool]]
+    _key: Optional[Callable[[Any], Any]]
+    _reverse: bool
+    _count: int
+
+    def __init__(self,
+                 higher_priority: Optional[Callable[[Any, Any], bool]] = None,
+                 key: Optional[Callable[[Any], Any]] = None,
+                 reverse: bool = False) -> None:
         """Initialize this to an empty PriorityQueue. For any two elements x
         and y of the queue, if <higher_priority>(x, y) is true, then x has
         higher priority than y.
 
+        If <key> is given instead of <higher_priority>, then x has higher
+        priority than y if <key>(x) < <key>(y), or if <key>(x) > <key>(y) when
+        <reverse> is True.
+
+        Precondition: exactly one of <higher_priority> and <key> is None.
+
         >>> pq = PriorityQueue(str.__lt__)
         >>> pq.is_empty()
         True
+        >>> pq = PriorityQueue(key=len, reverse=True)
+        >>> pq.add_all(['fred', 'hat', 'monalisa', 'arju'])
+        >>> [pq.remove() for _ in range(4)]
+        ['monalisa', 'fred', 'arju', 'hat']
         """
         self._queue = []
         self._higher_priority = higher_priority
+        self._key = key
+        self._reverse = reverse
+        self._count = 0
 
     def add(self, item: Any) -> None:
         """Add <item> to this PriorityQueue.
@@ -109,21 +217,40 @@ class PriorityQueue(Container):
         >>> pq.add('hat')
         >>> # 'arju' and fred have the same priority, but 'arju' is behind
         >>> # 'fred' in the queue because it was added later.
-        >>> pq._queue
-        ['monalisa', 'arju', 'fred', 'hat']
-        >>> pq.remove()
-        'hat'
-        >>> pq._queue
-        ['monalisa', 'arju', 'fred']
+        >>> [pq.remove() for _ in range(4)]
+        ['hat', 'fred', 'arju', 'monalisa']
         """
-        if self.is_empty():
-            self._queue.append(item)
-        else:
-            self._queue.insert(0, item)
-            for i in range(1, len(self._queue)):
-                if self._higher_priority(self._queue[i - 1], self._queue[i]):
-                    self._queue[i - 1], self._queue[i] = \
-                        self._queue[i], self._queue[i - 1]
+        heappush(self._queue, self._entry(item))
+
+    def add_all(self, items: Iterable[Any]) -> None:
+        """Add every item in <items> to this PriorityQueue, in order.
+
+        This builds the heap once for all of the items, which takes linear
+        time, rather than adding the items one at a time.
+
+        >>> pq = PriorityQueue(key=len)
+        >>> pq.add('fred')
+        >>> pq.add_all(['arju', 'monalisa', 'hat'])
+        >>> [pq.remove() for _ in range(4)]
+        ['hat', 'fred', 'arju', 'monalisa']
+        """
+        self._queue.extend([self._entry(item) for item in items])
+        heapify(self._queue)
+
+    def _entry(self, item: Any, order: Optional[int] = None) -> List[Any]:
+        """Return a new heap entry for <item>, which ranks as the <order>-th
+        item added to this queue among items of equal priority.  If <order> is
+        None, <item> ranks after every item that has been added so far.
+        """
+        if order is None:
+            order = self._count
+            self._count += 1
+        if self._key is None:
+            return [_Priority(item, order, self._higher_priority), item]
+        key = self._key(item)
+        if self._reverse:
+            key = -key if isinstance(key, (int, float)) else _Reversed(key)
+        return [key, order, item]
 
     def remove(self) -> Any:
         """Remove and return the next item from this PriorityQueue.
@@ -146,7 +273,7 @@ class PriorityQueue(Container):
         >>> pq.remove()
         'monalisa'
         """
-        return self._queue.pop()
+        return heappop(self._queue)[-1]
 
     def is_empty(self) -> bool:
         """Return True iff this PriorityQueue is empty.
@@ -161,11 +288,306 @@ class PriorityQueue(Container):
         return not self._queue
 
 
+class QueueHandle:
+    """A reference to an item in an IndexedPriorityQueue, which is returned
+    when the item is added and can be used to change or discard it later.
+
+    Callers may change <item>, to replace the item with one of a different
+    priority, and then pass the handle to update_priority.  Only the queue
+    should change the other attributes of a handle.
+
+    === Public Attributes ===
+    item:
+      The item this handle refers to.
+    entry:
+      The heap entry of <item>.
+    index:
+      The position of <entry> in the queue's heap, or -1 if <item> is no
+      longer in the queue.
+    """
+    __slots__ = ('item', 'entry', 'index')
+    item: Any
+    entry: List[Any]
+    index: int
+
+    def __init__(self, item: Any, entry: List[Any]) -> None:
+        """Initialize a handle for <item>, whose heap entry is <entry>.
+        """
+        self.item = item
+        self.entry = entry
+        self.index = -1
+
+
+class IndexedPriorityQueue(PriorityQueue):
+    """A PriorityQueue whose items can have their priority changed, or be
+    discarded, while they are in the queue.
+
+    <add> returns a QueueHandle for the new item, which can be passed to
+    <update_priority> after the item's priority has changed, or to <discard>
+    to take the item out of the queue.  Both take O(log n) time, because each
+    handle knows the position of its item's entry in the heap.  An item keeps
+    its place in FIFO order among items of equal priority when its priority
+    is updated.
+
+    === Representation Invariants ===
+    - the last element of each entry in <_queue> is the QueueHandle of its
+      item, and _queue[i][-1].index == i.
+    """
+
+    def add(self, item: Any) -> QueueHandle:
+        """Add <item> to this queue, and return its handle.
+
+        >>> pq = IndexedPriorityQueue(key=len)
+        >>> handle = pq.add('fred')
+        >>> handle.item
+        'fred'
+        """
+        handle = self._handle(item)
+        self._queue.append(handle.entry)
+        self._sift_up(len(self._queue) - 1)
+        return handle
+
+    def add_all(self, items: Iterable[Any]) -> List[QueueHandle]:
+        """Add every item in <items> to this queue, in order, and return
+        their handles, in the same order.
+
+        >>> pq = IndexedPriorityQueue(key=len)
+        >>> [h.item for h in pq.add_all(['fred', 'hat'])]
+        ['fred', 'hat']
+        """
+        handles = [self._handle(item) for item in items]
+        self._queue.extend([handle.entry for handle in handles])
+        heapify(self._queue)
+        for i, entry in enumerate(self._queue):
+            entry[-1].index = i
+        return handles
+
+    def remove(self) -> Any:
+        """Remove and return the next item from this queue.
+
+        Precondition: this queue is non-empty.
+
+        >>> pq = IndexedPriorityQueue(key=len)
+        >>> pq.add_all(['fred', 'arju', 'hat'])  # doctest: +ELLIPSIS
+        [...]
+        >>> pq.remove()
+        'hat'
+        """
+        handle = self._queue[0][-1]
+        self._take(0)
+        return handle.item
+
+    def update_priority(self, handle: QueueHandle) -> None:
+        """Move the item of <handle> to its place in this queue according to
+        its current priority, after that priority has changed.
+
+        Raise a ValueError if the item of <handle> is not in this queue.
+
+        >>> pq = IndexedPriorityQueue(key=len)
+        >>> handles = pq.add_all(['fred', 'arju', 'monalisa'])
+        >>> handles[2].item = 'mo'
+        >>> pq.update_priority(handles[2])
+        >>> [pq.remove() for _ in range(3)]
+        ['mo', 'fred', 'arju']
+        >>> pq.update_priority(handles[2])
+        Traceback (most recent call last):
+        ...
+        ValueError: the item of this handle is not in the queue
+        """
+        self._check(handle)
+        if self._key is None:
+            handle.entry[0].item = handle.item
+        else:
+            handle.entry[0] = self._entry(handle.item, handle.entry[1])[0]
+        self._sift_up(handle.index)
+        self._sift_down(handle.index)
+
+    def discard(self, handle: QueueHandle) -> None:
+        """Remove the item of <handle> from this queue.
+
+        Raise a ValueError if the item of <handle> is not in this queue, for
+        example because it has already been removed or discarded.
+
+        >>> pq = IndexedPriorityQueue(key=len)
+        >>> handles = pq.add_all(['fred', 'arju', 'hat'])
+        >>> pq.discard(handles[2])
+        >>> [pq.remove() for _ in range(2)]
+        ['fred', 'arju']
+        >>> pq.discard(handles[2])
+        Traceback (most recent call last):
+        ...
+        ValueError: the item of this handle is not in the queue
+        """
+        self._check(handle)
+        self._take(handle.index)
+
+    def _check(self, handle: QueueHandle) -> None:
+        """Raise a ValueError unless the item of <handle> is in this queue.
+        """
+        i = handle.index
+        if not 0 <= i < len(self._queue) or self._queue[i][-1] is not handle:
+            raise ValueError('the item of this handle is not in the queue')
+
+    def _handle(self, item: Any) -> QueueHandle:
+        """Return a new handle for <item>, with a heap entry that is not yet
+        in <_queue>.
+        """
+        entry = self._entry(item)
+        handle = QueueHandle(item, entry)
+        entry[-1] = handle
+        return handle
+
+    def _take(self, i: int) -> None:
+        """Remove the entry at position <i> from the heap.
+        """
+        queue = self._queue
+        queue[i][-1].index = -1
+        last = queue.pop()
+        if i < len(queue):
+            queue[i] = last
+            last[-1].index = i
+            self._sift_up(i)
+            self._sift_down(last[-1].index)
+
+    def _sift_up(self, i: int) -> None:
+        """Move the entry at position <i> towards the front of the heap until
+        it is not smaller than its parent.
+        """
+        queue = self._queue
+        entry = queue[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if not entry < queue[parent]:
+                break
+            queue[i] = queue[parent]
+            queue[i][-1].index = i
+            i = parent
+        queue[i] = entry
+        entry[-1].index = i
+
+    def _sift_down(self, i: int) -> None:
+        """Move the entry at position <i> away from the front of the heap
+        until neither of its children is smaller than it.
+        """
+        queue = self._queue
+        n = len(queue)
+        entry = queue[i]
+        child = 2 * i + 1
+        while child < n:
+            if child + 1 < n and queue[child + 1] < queue[child]:
+                child += 1
+            if not queue[child] < entry:
+                break
+            queue[i] = queue[child]
+            queue[i][-1].index = i
+            i = child
+            child = 2 * i + 1
+        queue[i] = entry
+        entry[-1].index = i
+
+
+class BucketQueue(Container):
+    """A queue of items with integer priorities that operates in FIFO-priority
+    order, like a PriorityQueue that uses a <key>.
+
+    Items with the same key are kept together in a bucket, in FIFO order, so
+    adding an item takes O(1) time.  Removing an item takes O(1) time, plus
+    O(log k) time whenever a bucket is emptied, where k is the number of
+    distinct keys in the queue.  This is much faster than a PriorityQueue
+    when many items share a few keys, such as the small integer volumes of
+    parcels.
+
+    === Private Attributes ===
+    _buckets:
+      A dictionary that maps each key in the queue to a deque of the items
+      with that key, in the order they were added.
+    _keys:
+      A binary heap of the keys in <_buckets>, negated if <_reverse> is
+      True, so that _keys[0] belongs to the next item to be removed.
+    _key:
+      A function that returns the integer key of an item.
+    _reverse:
+      True iff items with larger keys have higher priority.
+
+    === Representation Invariants ===
+    - every deque in <_buckets> is non-empty.
+    - <_keys> has exactly one element for each key in <_buckets>.
+    """
+    _buckets: Dict[int, Deque[Any]]
+    _keys: List[int]
+    _key: Callable[[Any], int]
+    _reverse: bool
+
+    def __init__(self, key: Callable[[Any], int],
+                 reverse: bool = False) -> None:
+        """Initialize this to an empty BucketQueue.  Items with smaller
+        <key> have higher priority, or items with larger <key> if <reverse> is
+        True.
+
+        >>> bq = BucketQueue(len)
+        >>> bq.is_empty()
+        True
+        """
+        self._buckets = {}
+        self._keys = []
+        self._key = key
+        self._reverse = reverse
+
+    def add(self, item: Any) -> None:
+        """Add <item> to this BucketQueue.
+
+        >>> bq = BucketQueue(len, reverse=True)
+        >>> bq.add_all(['fred', 'hat', 'monalisa', 'arju'])
+        >>> [bq.remove() for _ in range(4)]
+        ['monalisa', 'fred', 'arju', 'hat']
+        """
+        key = self._key(item)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = deque()
+            heappush(self._keys, -key if self._reverse else key)
+        bucket.append(item)
+
+    def remove(self) -> Any:
+        """Remove and return the next item from this BucketQueue.
+
+        Precondition: this queue is non-empty.
+
+        >>> bq = BucketQueue(len)
+        >>> bq.add_all(['fred', 'arju', 'monalisa', 'hat'])
+        >>> bq.remove()
+        'hat'
+        >>> bq.remove()
+        'fred'
+        >>> bq.add('ox')
+        >>> bq.remove()
+        'ox'
+        """
+        key = -self._keys[0] if self._reverse else self._keys[0]
+        bucket = self._buckets[key]
+        item = bucket.popleft()
+        if not bucket:
+            del self._buckets[key]
+            heappop(self._keys)
+        return item
+
+    def is_empty(self) -> bool:
+        """Return True iff this BucketQueue is empty.
+
+        >>> bq = BucketQueue(len)
+        >>> bq.add('fred')
+        >>> bq.is_empty()
+        False
+        """
+        return not self._keys
+
+
 if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'allowed-import-modules': ['doctest', 'python_ta', 'typing'],
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'collections', 'heapq'],
         'disable': ['E1136'],
         'max-attributes': 15,
     })
@@ -23,22 +23,318 @@ from the map file. (All reading from files is done in module experiment.)
 Instead, it provides public methods that can be called to store and look up
 distances.
 """
-from typing import List, Union
+from array import array
+from collections import OrderedDict
+from heapq import heappush, heappop
+from math import inf
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, \
+    Set, Tuple, Union
+
+# The array typecode used for the dense distance matrix.
+MATRIX_TYPECODE = 'i'
+
+# The default number of routes whose lengths a DistanceMap remembers.
+ROUTE_CACHE_SIZE = 65536
+
+# Maps with at most this many cities are completed at once with
+# Floyd-Warshall; larger maps run Dijkstra's algorithm from each city only
+# when a distance from that city is first looked up and missing.
+FLOYD_WARSHALL_LIMIT = 256
+
+
+class RouteCostCache:
+    """A cache of route lengths that holds at most a fixed number of routes,
+    evicting the least recently used route when it is full.
+
+    === Public Attributes ===
+    maxsize:
+      The largest number of routes this cache holds at once.
+    hits:
+      The number of lookups that found their route in this cache.
+    misses:
+      The number of lookups that did not find their route in this cache.
+
+    === Private Attributes ===
+    _costs:
+      The cached route lengths, from least to most recently used.
+
+    === Representation Invariants ===
+    - len(_costs) <= maxsize
+    - maxsize > 0
+    """
+    maxsize: int
+    hits: int
+    misses: int
+    _costs: OrderedDict
+
+    def __init__(self, maxsize: int = ROUTE_CACHE_SIZE) -> None:
+        """Initialize an empty cache that holds at most <maxsize> routes.
+
+        Precondition: <maxsize> > 0
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._costs = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of routes in this cache."""
+        return len(self._costs)
+
+    def get(self, route: Hashable) -> Optional[int]:
+        """Return the cached length of <route>, or None if it is not in this
+        cache.
+
+        >>> cache = RouteCostCache(2)
+        >>> cache.get(('Toronto', 'Guelph')) is None
+        True
+        >>> cache.put(('Toronto', 'Guelph'), 20)
+        >>> cache.get(('Toronto', 'Guelph'))
+        20
+        >>> cache.hits, cache.misses
+        (1, 1)
+        """
+        cost = self._costs.get(route)
+        if cost is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._costs.move_to_end(route)
+        return cost
+
+    def put(self, route: Hashable, cost: int) -> None:
+        """Record <cost> as the length of <route>, evicting the least recently
+        used route if this cache is full.
+
+        >>> cache = RouteCostCache(2)
+        >>> cache.put(('Toronto', 'Guelph'), 20)
+        >>> cache.put(('Toronto', 'London'), 30)
+        >>> cache.get(('Toronto', 'Guelph'))
+        20
+        >>> cache.put(('Toronto', 'Ottawa'), 40)
+        >>> cache.get(('Toronto', 'London')) is None
+        True
+        >>> len(cache)
+        2
+        """
+        self._costs[route] = cost
+        self._costs.move_to_end(route)
+        if len(self._costs) > self.maxsize:
+            self._costs.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every route from this cache.  The hit and miss counts are
+        kept.
+        """
+        self._costs.clear()
 
 
 class DistanceMap:
     """A class that lets client code store and look up the distance
     between any two cities.
 
+    Every city that is stored gets a small integer id, in the order that the
+    cities were first seen.  Client code that looks up many distances can
+    work with these ids instead of city names (see <distances>).
+
+    The lengths of recently costed routes are remembered in <route_costs>, so
+    that everything that costs routes with the same map shares one cache.
+
+    A DistanceMap is either sparse or dense.  A sparse map only stores the
+    distances that were added to it.  A dense map stores a full matrix with
+    one entry for every pair of cities, which makes lookups by id a single
+    index into an array, at the cost of memory proportional to the square of
+    the number of cities.
+
+    === Public Attributes ===
+    route_costs:
+      The lengths of recently costed routes, as returned by
+      <route_distances>.  Cleared whenever a distance in this map changes.
+
     === Private Attributes ===
+    _ids:
+      A dictionary that maps each city to its id.
+    _cities:
+      The cities in this map, where _cities[i] is the city with id i.
     _distances:
-      A list that contains lists of distance between any two cities.
+      A dictionary that maps each ordered pair of cities (c1, c2) to the
+      distance from c1 to c2.  Only used while this map is sparse.
+    _matrix:
+      The distances in row-major order, so that the distance from the city
+      with id i to the city with id j is _matrix[i * _stride + j], or -1 if
+      that distance is unknown.  None while this map is sparse.  This is a
+      read-only memoryview when the matrix is shared with other processes
+      (see <use_matrix>), until this map is first changed.
+    _stride:
+      The length of one row of <_matrix>.
+    _roads:
+      The stored distances when complete_distances was last called on a map
+      too large for Floyd-Warshall, as adjacency lists by id (see
+      <_adjacency>), or None if no row is waiting to be completed.
+    _pending:
+      The ids of the cities whose missing distances have not been filled in
+      from <_roads> yet.
+
+    === Representation Invariants ===
+    - _ids[_cities[i]] == i for every 0 <= i < len(_cities)
+    - Whenever (c1, c2) is a key of <_distances>, so is (c2, c1).
+    - If <_matrix> is None, <_stride> == 0.
+    - If <_matrix> is not None, <_distances> is empty,
+      <_stride> >= len(_cities) and len(_matrix) == _stride * _stride.
+    - <_roads> is None iff <_pending> is empty.
     """
-    _distances: List[List[Union[str, int]]]
+    route_costs: RouteCostCache
+    _ids: Dict[str, int]
+    _cities: List[str]
+    _distances: Dict[Tuple[str, str], int]
+    _matrix: Optional[Union[array, memoryview]]
+    _stride: int
+    _roads: Optional[List[List[Tuple[int, int]]]]
+    _pending: Set[int]
+
+    def __init__(self, dense: bool = False) -> None:
+        """Initializes the class. The new map is dense iff <dense> is True.
+        """
+        self._ids = {}
+        self._cities = []
+        self._distances = {}
+        self._matrix = array(MATRIX_TYPECODE) if dense else None
+        self._stride = 0
+        self._roads = None
+        self._pending = set()
+        self.route_costs = RouteCostCache()
+
+    def __getstate__(self) -> Dict[str, object]:
+        """Return the state of this map for pickling, for example to send it
+        to another process.
+
+        A memory-mapped matrix is copied, since it cannot be pickled, and the
+        costed routes are left behind.
+
+        >>> import pickle
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('Toronto', 'Guelph', 10)
+        >>> dm.route_distance(['Toronto', 'Guelph'])
+        20
+        >>> copy = pickle.loads(pickle.dumps(dm))
+        >>> copy.distance('Guelph', 'Toronto'), len(copy.route_costs)
+        (10, 0)
+        """
+        state = self.__dict__.copy()
+        if isinstance(self._matrix, memoryview):
+            state['_matrix'] = array(MATRIX_TYPECODE, self._matrix)
+        state['route_costs'] = RouteCostCache(self.route_costs.maxsize)
+        return state
+
+    def is_dense(self) -> bool:
+        """Return True iff this map stores a full distance matrix.
+
+        >>> DistanceMap().is_dense()
+        False
+        >>> DistanceMap(dense=True).is_dense()
+        True
+        """
+        return self._matrix is not None
+
+    def to_dense(self) -> None:
+        """Convert this map to a dense map.  Do nothing if it is already
+        dense.
+
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('Toronto', 'Guelph', 10, 20)
+        >>> dm.to_dense()
+        >>> dm.distance('Guelph', 'Toronto')
+        20
+        >>> dm.distance('Guelph', 'Ottawa')
+        -1
+        """
+        if self._matrix is not None:
+            return
+        self._matrix = self._sparse_matrix()
+        self._stride = len(self._cities)
+        self._distances = {}
+
+    def use_matrix(self, cities: List[str],
+                   matrix: Union[array, memoryview]) -> None:
+        """Make this map a dense map of <cities> whose distances are stored in
+        <matrix>, in the format returned by <export_matrix>.  This map
+        forgets any distances that were stored in it before.
+
+        <matrix> is used as is, without being copied, so it may be a
+        read-only memoryview over a memory-mapped file.  It is copied the
+        first time this map is changed.
+
+        Precondition: len(<matrix>) == len(<cities>) ** 2 and <cities> has
+                      no duplicates.
+
+        >>> dm = DistanceMap()
+        >>> dm.use_matrix(['Toronto', 'Guelph'], array('i', [0, 10, 20, 0]))
+        >>> dm.distance('Guelph', 'Toronto')
+        20
+        """
+        self._ids = {city: cid for cid, city in enumerate(cities)}
+        self._cities = list(cities)
+        self._distances = {}
+        self._matrix = matrix
+        self._stride = len(cities)
+        self._roads = None
+        self._pending = set()
+        self.route_costs.clear()
+
+    def export_matrix(self) -> Tuple[List[str], array]:
+        """Return the cities in this map, in order of id, and a matrix of
+        their distances in row-major order, with -1 for missing distances.
+
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('Toronto', 'Guelph', 10, 20)
+        >>> dm.export_matrix()
+        (['Toronto', 'Guelph'], array('i', [-1, 10, 20, -1]))
+        """
+        self._complete_rows(list(self._pending))
+        n = len(self._cities)
+        if self._matrix is None:
+            return self._cities[:], self._sparse_matrix()
+        if self._stride == n and isinstance(self._matrix, array):
+            return self._cities[:], self._matrix[:]
+        matrix = array(MATRIX_TYPECODE)
+        for i in range(n):
+            start = i * self._stride
+            matrix.extend(self._matrix[start:start + n])
+        return self._cities[:], matrix
+
+    def num_cities(self) -> int:
+        """Return the number of cities in this map.
+
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('Toronto', 'Guelph', 10)
+        >>> dm.num_cities()
+        2
+        """
+        return len(self._cities)
+
+    def city_id(self, city: str) -> int:
+        """Return the id of <city>, or -1 if <city> is not in this map.
+
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('Toronto', 'Guelph', 10)
+        >>> dm.city_id('Guelph')
+        1
+        >>> dm.city_id('Ottawa')
+        -1
+        """
+        return self._ids.get(city, -1)
 
-    def __init__(self) -> None:
-        """Initializes the class."""
-        self._distances = []
+    def city_name(self, cid: int) -> str:
+        """Return the city whose id is <cid>.
+
+        Precondition: 0 <= <cid> < self.num_cities()
+
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('Toronto', 'Guelph', 10)
+        >>> dm.city_name(0)
+        'Toronto'
+        """
+        return self._cities[cid]
 
     def distance(self, city1: str, city2: str) -> int:
         """Returns an integer which is the distance from <city1> to <city2>.
@@ -55,36 +351,454 @@ class DistanceMap:
         >>> dm.distance('Mississauga', 'Toronto')
         20
         """
-        for dist in self._distances:
-            if dist[0] == city1 and dist[1] == city2:
-                return dist[2]
-            if dist[1] == city1 and dist[0] == city2:
-                return dist[3]
-        return -1
+        d = self._distance(city1, city2)
+        if d == -1 and self._ids.get(city1) in self._pending:
+            self._complete_rows([self._ids[city1]])
+            d = self._distance(city1, city2)
+        return d
+
+    def _distance(self, city1: str, city2: str) -> int:
+        """Return the distance stored from <city1> to <city2>, or -1 if there
+        is none, without completing any rows.
+        """
+        if self._matrix is None:
+            return self._distances.get((city1, city2), -1)
+        i = self._ids.get(city1)
+        j = self._ids.get(city2)
+        if i is None or j is None:
+            return -1
+        return self._matrix[i * self._stride + j]
+
+    def distances(self, sources: Sequence[int],
+                  targets: Sequence[int]) -> List[int]:
+        """Return a list whose i-th element is the distance from the city with
+        id <sources>[i] to the city with id <targets>[i], or -1 if that
+        distance is not stored in this map.
+
+        An id of -1 stands for a city that is not in this map.
+
+        Precondition: len(<sources>) == len(<targets>)
+
+        >>> dm = DistanceMap(dense=True)
+        >>> dm.add_distance('Toronto', 'Guelph', 10, 20)
+        >>> dm.add_distance('Guelph', 'Ottawa', 30)
+        >>> dm.distances([0, 1, 2, -1], [1, 0, 0, 1])
+        [10, 20, -1, -1]
+        """
+        result = self._lookup(sources, targets)
+        if self._pending:
+            rows = {i for i, d in zip(sources, result)
+                    if d == -1 and i in self._pending}
+            if rows:
+                self._complete_rows(list(rows))
+                result = self._lookup(sources, targets)
+        return result
+
+    def _lookup(self, sources: Sequence[int],
+                targets: Sequence[int]) -> List[int]:
+        """Return distances as in <distances>, without completing any rows.
+        """
+        names = self._cities
+        if self._matrix is None:
+            lookup = self._distances.get
+            return [lookup((names[i], names[j]), -1) if i >= 0 and j >= 0
+                    else -1 for i, j in zip(sources, targets)]
+        matrix = self._matrix
+        stride = self._stride
+        return [matrix[i * stride + j] if i >= 0 and j >= 0 else -1
+                for i, j in zip(sources, targets)]
+
+    def route_distance(self, route: Sequence[str]) -> int:
+        """Return the distance travelled by a truck that follows <route> and
+        then returns to <route>[0], if it is not already there.
+
+        Precondition: this map contains every distance that is needed.
+
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('Toronto', 'Hamilton', 9)
+        >>> dm.add_distance('Hamilton', 'Guelph', 5)
+        >>> dm.add_distance('Guelph', 'Toronto', 7)
+        >>> dm.route_distance(['Toronto', 'Hamilton', 'Guelph'])
+        21
+        >>> dm.route_distance(['Toronto'])
+        0
+        """
+        return self.route_distances([route])[0]
+
+    def route_distances(self, routes: List[Sequence[str]]) -> List[int]:
+        """Return a list whose i-th element is route_distance(<routes>[i]).
+
+        Routes that are in <route_costs> are not costed again.  The legs of
+        all other routes are looked up together, in a single call to
+        <distances>, and their lengths are added to <route_costs>.
+
+        Precondition: this map contains every distance that is needed.
+
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('Toronto', 'Hamilton', 9)
+        >>> dm.route_distances([('Toronto', 'Hamilton'), ('Toronto',),
+        ...                     ('Toronto', 'Hamilton')])
+        [18, 0, 18]
+        >>> dm.route_distances([('Toronto', 'Hamilton')])
+        [18]
+        >>> dm.route_costs.hits, dm.route_costs.misses
+        (1, 2)
+        """
+        cache = self.route_costs
+        costs = []
+        missing = {}
+        for route in routes:
+            key = tuple(route)
+            cost = None
+            if key not in missing:
+                cost = cache.get(key)
+                if cost is None:
+                    missing[key] = 0
+            costs.append(cost)
+        if not missing:
+            return costs
+        sources = []
+        targets = []
+        ends = []
+        for route in missing:
+            ids = [self._ids.get(city, -1) for city in route]
+            sources.extend(ids[:-1])
+            targets.extend(ids[1:])
+            if route[-1] != route[0]:
+                sources.append(ids[-1])
+                targets.append(ids[0])
+            ends.append(len(sources))
+        legs = self.distances(sources, targets)
+        start = 0
+        for route, end in zip(missing, ends):
+            missing[route] = sum(legs[start:end])
+            cache.put(route, missing[route])
+            start = end
+        return [missing[tuple(route)] if cost is None else cost
+                for route, cost in zip(routes, costs)]
 
     def add_distance(self, c1: str, c2: str, d1: int, d2: int = 0) -> None:
         """Add distance <d1> from <c1> to <c2> and distance <d2> from <c2> to
         <c1> to DistanceMap.
 
+        If a distance between <c1> and <c2> has already been stored, the
+        earlier distance is kept.
+
+        Raise a ValueError if <d1> or <d2> is negative, as add_distances does,
+        without changing this map.  A dense map uses -1 to mean a missing
+        distance, so a negative distance could not be told apart from one.
+
         >>> dm = DistanceMap()
         >>> dm.add_distance('Toronto', 'Guelph', 10)
         >>> dm.distance("Toronto", "Guelph")
         10
         >>> dm.distance('Guelph', 'Toronto')
         10
+        >>> dm.add_distance('Guelph', 'Toronto', 15)
+        >>> dm.distance('Guelph', 'Toronto')
+        10
+        >>> dm.add_distance('Ottawa', 'Montreal', -5)
+        Traceback (most recent call last):
+        ...
+        ValueError: negative distance between Ottawa and Montreal: -5, 0
         """
+        if d1 < 0 or d2 < 0:
+            raise ValueError(f'negative distance between {c1} and {c2}: '
+                             f'{d1}, {d2}')
         if d2 == 0:
             d2 = d1
-            self._distances.append([c1, c2, d1, d2])
+        self.route_costs.clear()
+        self._complete_rows([self._ids.get(c1), self._ids.get(c2)])
+        i = self._intern(c1)
+        j = self._intern(c2)
+        if self._matrix is None:
+            self._distances.setdefault((c1, c2), d1)
+            self._distances.setdefault((c2, c1), d2)
+            return
+        matrix = self._writable_matrix()
+        stride = self._stride
+        if matrix[i * stride + j] == -1:
+            matrix[i * stride + j] = d1
+        if matrix[j * stride + i] == -1:
+            matrix[j * stride + i] = d2
+
+    def complete_distances(self) -> None:
+        """Fill in every missing distance in this map with the length of the
+        shortest path between the two cities, using the stored distances as
+        one-way roads.  Distances that are already stored are kept, the
+        distance from a city to itself becomes 0 unless it is already stored,
+        and pairs with no path between them stay missing.
+
+        Small maps are completed at once with Floyd-Warshall, one row at a
+        time.  Larger maps, which are usually sparse, are completed lazily:
+        the first time a distance from a city is looked up and missing,
+        Dijkstra's algorithm is run from that city over the distances stored
+        when this method was called, and the whole row of distances from it
+        is filled in and kept, in the matrix if this map is dense.  So only
+        the cities that are actually routed from cost any time or memory.
+        Adding a distance from or to a city first completes its row, and
+        export_matrix completes every row, so a lazily completed map always
+        gives the same distances as one completed at once.
+
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('Toronto', 'Guelph', 10, 20)
+        >>> dm.add_distance('Guelph', 'London', 30, 40)
+        >>> dm.add_distance('Ottawa', 'Montreal', 50)
+        >>> dm.complete_distances()
+        >>> dm.distance('Toronto', 'London')
+        40
+        >>> dm.distance('London', 'Toronto')
+        60
+        >>> dm.distance('Toronto', 'Toronto')
+        0
+        >>> dm.distance('Toronto', 'Ottawa')
+        -1
+        """
+        self.route_costs.clear()
+        n = len(self._cities)
+        if n <= FLOYD_WARSHALL_LIMIT:
+            self._complete_rows(list(self._pending))
+            rows = self._floyd_warshall()
+            for i in range(n):
+                self._fill_row(i, rows[i])
         else:
-            self._distances.append([c1, c2, d1, d2])
+            self._roads = self._adjacency()
+            self._pending = set(range(n))
+
+    def _complete_rows(self, ids: Iterable[Optional[int]]) -> None:
+        """Fill in the missing distances from each city whose id is in <ids>
+        and whose row is still waiting to be completed, by Dijkstra's
+        algorithm over <_roads>.  Ids that are None or not waiting are
+        skipped.
+        """
+        for i in ids:
+            if i in self._pending:
+                self._pending.remove(i)
+                self._fill_row(i, _dijkstra(self._roads, i))
+        if not self._pending:
+            self._roads = None
+
+    def _floyd_warshall(self) -> List[List[float]]:
+        """Return the matrix of shortest path lengths between the cities in
+        this map, with inf for pairs that have no path between them.
+        """
+        n = len(self._cities)
+        rows = [[inf] * n for _ in range(n)]
+        for i, adjacent in enumerate(self._adjacency()):
+            row = rows[i]
+            row[i] = 0
+            for j, d in adjacent:
+                row[j] = min(row[j], d)
+        for k in range(n):
+            row_k = rows[k]
+            for i in range(n):
+                d_ik = rows[i][k]
+                if d_ik < inf:
+                    rows[i] = [d_ij if d_ij <= d_ik + d_kj else d_ik + d_kj
+                               for d_ij, d_kj in zip(rows[i], row_k)]
+        return rows
+
+    def _adjacency(self) -> List[List[Tuple[int, int]]]:
+        """Return a list whose i-th element lists (j, d) for every distance d
+        stored from the city with id i to the city with id j.
+        """
+        n = len(self._cities)
+        adjacency = [[] for _ in range(n)]
+        if self._matrix is None:
+            ids = self._ids
+            for (c1, c2), d in self._distances.items():
+                adjacency[ids[c1]].append((ids[c2], d))
+            return adjacency
+        matrix = self._matrix
+        stride = self._stride
+        for i in range(n):
+            row = matrix[i * stride:i * stride + n]
+            adjacency[i] = [(j, d) for j, d in enumerate(row) if d != -1]
+        return adjacency
+
+    def _fill_row(self, i: int, row: Sequence[float]) -> None:
+        """Store <row>[j] as the distance from the city with id <i> to the city
+        with id j, for every j such that this distance is missing and
+        <row>[j] is finite.
+        """
+        if self._matrix is None:
+            city = self._cities[i]
+            for j, d in enumerate(row):
+                if d < inf:
+                    self._distances.setdefault((city, self._cities[j]),
+                                               int(d))
+            return
+        matrix = self._writable_matrix()
+        start = i * self._stride
+        for j, d in enumerate(row):
+            if d < inf and matrix[start + j] == -1:
+                matrix[start + j] = int(d)
+
+    def add_distances(self, c1s: Iterable, c2s: Optional[Iterable] = None,
+                      d1s: Optional[Iterable] = None,
+                      d2s: Optional[Iterable] = None) -> None:
+        """Add many distances to this map at once.
+
+        Either <c1s> is an iterable of entries (c1, c2, d1) or (c1, c2, d1, d2)
+        and the other arguments are None, or <c1s>, <c2s>, <d1s> and optionally
+        <d2s> are parallel iterables, whose i-th elements together form the
+        i-th entry.  Each entry is added as if by add_distance(c1, c2, d1, d2),
+        so the first distance for a pair of cities is kept, whether it was
+        stored earlier or comes earlier in the entries.
+
+        Every entry is checked before any distance is stored, and the map is
+        only updated once, at the end.  Raise a ValueError if an entry is
+        malformed or has a negative distance; add_distance rejects negative
+        distances in the same way.
+
+        >>> dm = DistanceMap()
+        >>> dm.add_distances([('Toronto', 'Guelph', 10),
+        ...                   ('Guelph', 'London', 30, 40),
+        ...                   ('Guelph', 'Toronto', 99)])
+        >>> dm.distance('Guelph', 'Toronto')
+        10
+        >>> dm.distance('London', 'Guelph')
+        40
+        >>> dm.add_distances(['Ottawa'], ['Kingston'], [200])
+        >>> dm.distance('Kingston', 'Ottawa')
+        200
+        >>> dm.add_distances([('Ottawa', 'Montreal', -5)])
+        Traceback (most recent call last):
+        ...
+        ValueError: entry 0 has a negative distance: ('Ottawa', 'Montreal', -5)
+        """
+        if c2s is not None:
+            if d2s is None:
+                c1s = zip(c1s, c2s, d1s)
+            else:
+                c1s = zip(c1s, c2s, d1s, d2s)
+        added = {}
+        for n, entry in enumerate(c1s):
+            if len(entry) not in (3, 4) or not isinstance(entry[0], str) \
+                    or not isinstance(entry[1], str):
+                raise ValueError(f'entry {n} is malformed: {entry!r}')
+            d1 = entry[2]
+            d2 = entry[3] if len(entry) == 4 else 0
+            if not isinstance(d1, int) or not isinstance(d2, int):
+                raise ValueError(f'entry {n} is malformed: {entry!r}')
+            if d1 < 0 or d2 < 0:
+                raise ValueError(f'entry {n} has a negative distance: '
+                                 f'{entry!r}')
+            if d2 == 0:
+                d2 = d1
+            added.setdefault((entry[0], entry[1]), d1)
+            added.setdefault((entry[1], entry[0]), d2)
+        if not added:
+            return
+        self.route_costs.clear()
+        if self._pending:
+            self._complete_rows([self._ids.get(city) for pair in added
+                                 for city in pair])
+        cities = {city for pair in added for city in pair}
+        cities.difference_update(self._ids)
+        if self._matrix is not None \
+                and len(self._cities) + len(cities) > self._stride:
+            self._grow(len(self._cities) + len(cities))
+        for pair in added:
+            self._intern(pair[0])
+        if self._matrix is None:
+            if self._distances:
+                for pair, d in added.items():
+                    self._distances.setdefault(pair, d)
+            else:
+                self._distances = added
+            return
+        matrix = self._writable_matrix()
+        stride = self._stride
+        ids = self._ids
+        for (c1, c2), d in added.items():
+            k = ids[c1] * stride + ids[c2]
+            if matrix[k] == -1:
+                matrix[k] = d
+
+    def _sparse_matrix(self) -> array:
+        """Return the distances in <_distances> as a row-major matrix whose
+        rows have length len(<_cities>).
+        """
+        n = len(self._cities)
+        matrix = array(MATRIX_TYPECODE, [-1]) * (n * n)
+        for (c1, c2), d in self._distances.items():
+            matrix[self._ids[c1] * n + self._ids[c2]] = d
+        return matrix
+
+    def _writable_matrix(self) -> array:
+        """Return <_matrix>, first replacing it with a private copy if it is
+        a read-only memoryview.
+
+        Precondition: <self> is dense.
+        """
+        if isinstance(self._matrix, memoryview):
+            matrix = array(MATRIX_TYPECODE)
+            matrix.frombytes(self._matrix.tobytes())
+            self._matrix = matrix
+        return self._matrix
+
+    def _intern(self, city: str) -> int:
+        """Return the id of <city>, giving it a new id first if it is not
+        already in this map.
+        """
+        cid = self._ids.get(city)
+        if cid is None:
+            cid = len(self._cities)
+            self._ids[city] = cid
+            self._cities.append(city)
+            if self._matrix is not None and cid >= self._stride:
+                self._grow(max(2 * self._stride, cid + 1))
+        return cid
+
+    def _grow(self, stride: int) -> None:
+        """Copy <_matrix> into a larger matrix whose rows have length
+        <stride>.
+
+        Precondition: <self> is dense and <stride> > <self>._stride
+        """
+        old = self._writable_matrix()
+        old_stride = self._stride
+        matrix = array(MATRIX_TYPECODE, [-1]) * (stride * stride)
+        for i in range(old_stride):
+            matrix[i * stride:i * stride + old_stride] = \
+                old[i * old_stride:(i + 1) * old_stride]
+        self._matrix = matrix
+        self._stride = stride
+
+
+def _dijkstra(adjacency: List[List[Tuple[int, int]]],
+              source: int) -> List[float]:
+    """Return a list whose j-th element is the length of the shortest path
+    from <source> to j in the graph given by <adjacency>, or inf if there is
+    no such path.
+
+    <adjacency>[i] lists (j, d) for every edge of length d from i to j.
+
+    >>> _dijkstra([[(1, 5), (2, 20)], [(2, 5)], [], []], 0)
+    [0, 5, 10, inf]
+    """
+    lengths = [inf] * len(adjacency)
+    lengths[source] = 0
+    heap = [(0, source)]
+    while heap:
+        length, i = heappop(heap)
+        if length > lengths[i]:
+            continue
+        for j, d in adjacency[i]:
+            if length + d < lengths[j]:
+                lengths[j] = length + d
+                heappush(heap, (length + d, j))
+    return lengths
 
 
 if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'allowed-import-modules': ['doctest', 'python_ta', 'typing'],
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'array', 'collections', 'heapq',
+                                   'math'],
         'disable': ['E1136'],
         'max-attributes': 15,
     })
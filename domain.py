@@ -19,8 +19,13 @@ Sophia Huynh, Maryam Majedi, and Jaisie Sin.
 
 This module contains the classes required to represent the entities
 in the simulation: Parcel, Truck and Fleet.
+
+Parcel and Truck use __slots__, so that a parcel or truck stores its
+attributes in fixed places instead of a dictionary of its own.  This makes
+each one much smaller (see bench_memory.py) and reading its attributes a
+little faster.
 """
-from typing import List, Dict
+from typing import List, Dict, Union
 from distance_map import DistanceMap
 
 
@@ -42,6 +47,9 @@ class Parcel:
     - <_volume> is a positive integer.
     - No parcels have the depot as their destination.
     """
+    # Parcels have no __dict__, which saves memory when there are millions
+    # of them, so no attributes other than these can be set on a parcel.
+    __slots__ = ('id', 'source', 'destiny', 'volume')
     id: int
     source: str
     destiny: str
@@ -83,6 +91,8 @@ class Truck:
     trucks can have the same _id.
     - <capacity> is a positive integer
     """
+    # As with Parcel, no attributes other than these can be set on a truck.
+    __slots__ = ('capacity', 'routes', 'parcels', 'current', 'id')
     capacity: int
     routes: List[str]
     parcels: List[Parcel]
@@ -127,6 +137,23 @@ class Truck:
             return True
         return False
 
+    def copy(self) -> 'Truck':
+        """Return a copy of this truck, which can be packed without changing
+        this truck.  The copy shares this truck's Parcel objects.
+
+        >>> t1 = Truck(1, 100, 'Toronto')
+        >>> t2 = t1.copy()
+        >>> t2.pack(Parcel(1, 20, 'Toronto', 'Guelph'))
+        True
+        >>> t1.routes, t2.routes
+        (['Toronto'], ['Toronto', 'Guelph'])
+        """
+        copy = Truck(self.id, self.capacity, self.routes[0])
+        copy.routes = self.routes[:]
+        copy.parcels = self.parcels[:]
+        copy.current = self.current
+        return copy
+
     def fullness(self) -> float:
         """Return the percentage of fullness for this truck.
 
@@ -374,13 +401,42 @@ class Fleet:
         >>> f.total_distance_travelled(m)
         36
         """
-        distance = 0
-        for truck in self.trucks:
-            for i in range(1, len(truck.routes)):
-                distance += dmap.distance(truck.routes[i - 1], truck.routes[i])
-            if truck.routes[-1] != truck.routes[0]:
-                distance += dmap.distance(truck.routes[-1], truck.routes[0])
-        return distance
+        return sum(self.distances_travelled(dmap).values())
+
+    def distances_travelled(self, dmap: DistanceMap) -> Dict[int, int]:
+        """Return a dictionary in which each key is the ID of a truck in this
+        fleet and its value is the distance travelled by that truck, according
+        to the distances in <dmap>.
+
+        The routes are costed together by <dmap>.route_distances, so routes
+        that <dmap> has costed recently are not costed again, and the legs of
+        all other routes are looked up in a single batch.
+
+        Precondition: <dmap> contains all distances required to compute the
+                      distance travelled by each truck.
+
+        >>> f = Fleet()
+        >>> t1 = Truck(1423, 10, 'Toronto')
+        >>> p1 = Parcel(1, 5, 'Toronto', 'Hamilton')
+        >>> t1.pack(p1)
+        True
+        >>> p2 = Parcel(2, 5, 'Toronto', 'Guelph')
+        >>> t1.pack(p2)
+        True
+        >>> t2 = Truck(1333, 10, 'Toronto')
+        >>> from distance_map import DistanceMap
+        >>> m = DistanceMap()
+        >>> m.add_distance('Toronto', 'Hamilton', 9)
+        >>> m.add_distance('Hamilton', 'Guelph', 5)
+        >>> m.add_distance('Guelph', 'Toronto', 7)
+        >>> f.add_truck(t1)
+        >>> f.add_truck(t2)
+        >>> f.distances_travelled(m) == {1423: 21, 1333: 0}
+        True
+        """
+        routes = [truck.routes for truck in self.trucks]
+        return {truck.id: distance for truck, distance
+                in zip(self.trucks, dmap.route_distances(routes))}
 
     def average_distance_travelled(self, dmap: DistanceMap) -> float:
         """Return the average distance travelled by the trucks in this fleet,
@@ -413,6 +469,41 @@ class Fleet:
         """
         return self.total_distance_travelled(dmap) / self.num_nonempty_trucks()
 
+    def statistics(self, dmap: DistanceMap,
+                   unscheduled: int) -> Dict[str, Union[int, float]]:
+        """Return statistics on how well the parcels are scheduled onto this
+        fleet, given the distances in <dmap> and the number of parcels that
+        could not be scheduled, <unscheduled>.
+
+        The keys and values are as specified in Step 6 of Assignment 1.
+
+        Preconditions:
+        - <dmap> contains all distances required to compute the average
+          distance travelled.
+        - At least one truck has travelled a non-zero distance.
+
+        >>> f = Fleet()
+        >>> t1 = Truck(1423, 10, 'Toronto')
+        >>> t1.pack(Parcel(1, 5, 'Toronto', 'Hamilton'))
+        True
+        >>> f.add_truck(t1)
+        >>> f.add_truck(Truck(1333, 10, 'Toronto'))
+        >>> m = DistanceMap()
+        >>> m.add_distance('Toronto', 'Hamilton', 9)
+        >>> f.statistics(m, 2) == {'fleet': 2, 'unused_trucks': 1,
+        ...                        'avg_distance': 18.0, 'avg_fullness': 50.0,
+        ...                        'unused_space': 5, 'unscheduled': 2}
+        True
+        """
+        return {
+            'fleet': self.num_trucks(),
+            'unused_trucks': self.num_trucks() - self.num_nonempty_trucks(),
+            'avg_distance': self.average_distance_travelled(dmap),
+            'avg_fullness': self.average_fullness(),
+            'unused_space': self.total_unused_space(),
+            'unscheduled': unscheduled
+        }
+
 
 if __name__ == '__main__':
     import python_ta
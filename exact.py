@@ -0,0 +1,566 @@
+"""Assignment 1 - Exact scheduling
+
+CSC148, Winter 2021
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2021 Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+===== Module Description =====
+
+This module contains the class ExactScheduler, which finds the best possible
+schedule for a small problem, so that the schedules of the heuristic
+schedulers can be compared against it.
+
+A schedule is scored by, in order of importance:
+1. the number of parcels that are not scheduled, then
+2. either the number of trucks used and then the total distance travelled,
+   or the total distance and then the number of trucks.
+Each truck drives the shortest tour from the depot through the cities of its
+parcels and back.
+
+The search is a branch and bound over the parcels, from the largest volume to
+the smallest, trying each truck with room for the parcel and then leaving the
+parcel unscheduled.  A branch is cut off when a lower bound on its score is
+no better than the best schedule found so far, which starts as the schedule
+of a greedy scheduler.  The lower bound counts the parcels that cannot fit in
+the space left in the trucks, the trucks already used plus the fewest empty
+trucks that can hold the volume that does not fit in them, and the length of
+the trucks' tours so far with every distance replaced by the shortest path
+between its cities.  A tour measured that way never gets shorter when a city
+is added, even when the distances break the triangle inequality, so it bounds
+the distance of every schedule the branch can lead to.
+Trucks in the same state (the same unused space and the same cities) are
+interchangeable, so only one of them is tried for each parcel, and a state
+that is reached again, for example by swapping two identical parcels, is not
+searched again.
+"""
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+from distance_map import DistanceMap
+from domain import Parcel, Truck
+from improve import sequence_tour
+from scheduler import Scheduler, GreedyScheduler
+
+# The largest number of parcels that ExactScheduler searches over.  Larger
+# problems get the schedule of its greedy scheduler.
+EXACT_PARCEL_LIMIT = 30
+
+# The largest number of cities whose shortest tour is found exactly.  Tours
+# through more cities are found with the heuristics of optimize_routes, and a
+# schedule that needs one is not reported as optimal.
+EXACT_TOUR_LIMIT = 9
+
+# The greedy scheduler whose schedule ExactScheduler starts from by default.
+INCUMBENT_CONFIG = {'parcel_priority': 'volume',
+                    'parcel_order': 'non-increasing',
+                    'truck_order': 'non-decreasing'}
+
+
+class ExactScheduler(Scheduler):
+    """A scheduler that finds an optimal schedule by branch and bound.
+
+    === Public Attributes ===
+    nodes:
+      The number of nodes searched in the last call to schedule.
+    optimal:
+      True iff the last call to schedule finished its search with every
+      tour length exact, so that its schedule is optimal.  False if a limit
+      stopped the search early, if there were too many parcels to search, or
+      if any truck's tour went through more than EXACT_TOUR_LIMIT cities and
+      so was only found by a heuristic.
+
+    === Private Attributes ===
+    _dmap:
+      The distances between cities.
+    _objective:
+      Either 'trucks', to use as few trucks as possible before travelling
+      as short a distance as possible, or 'distance', for the reverse.
+    _node_limit:
+      The largest number of nodes to search.
+    _time_limit:
+      The longest time to search for, in seconds.
+    _incumbent:
+      The scheduler whose schedule the search starts from.
+    """
+    nodes: int
+    optimal: bool
+    _dmap: DistanceMap
+    _objective: str
+    _node_limit: int
+    _time_limit: float
+    _incumbent: Scheduler
+
+    def __init__(self, dmap: DistanceMap, objective: str = 'trucks',
+                 node_limit: int = 1000000, time_limit: float = 10.0,
+                 incumbent: Optional[Scheduler] = None) -> None:
+        """Initialize a scheduler that minimizes by <objective> using the
+        distances in <dmap>, searching at most <node_limit> nodes for at most
+        <time_limit> seconds, starting from the schedule of <incumbent>, or of
+        a greedy scheduler if <incumbent> is None.
+
+        Precondition: <objective> is either 'trucks' or 'distance'.
+        """
+        self.nodes = 0
+        self.optimal = False
+        self._dmap = dmap
+        self._objective = objective
+        self._node_limit = node_limit
+        self._time_limit = time_limit
+        if incumbent is None:
+            incumbent = GreedyScheduler(INCUMBENT_CONFIG)
+        self._incumbent = incumbent
+
+    def schedule(self, parcels: List[Parcel], trucks: List[Truck],
+                 verbose: bool = False) -> List[Parcel]:
+        """Schedule the given <parcels> onto the given <trucks> as well as
+        possible.
+
+        Mutate the Truck objects in <trucks> so that they store information
+        about which parcel objects they will deliver and what route they will
+        take.  Do *not* mutate the list <parcels>, or any of the parcel objects
+        in that list.
+
+        Return a list containing the parcels that did not get scheduled onto any
+        truck, due to lack of capacity.
+
+        If <verbose> is True, print how the search went.
+
+        Preconditions:
+        - Every truck in <trucks> is empty, and they all start at the same
+          depot.
+        - <self._dmap> contains the distance between every two of the depot
+          and the destinations of <parcels>.
+
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('York', 'Guelph', 10)
+        >>> dm.add_distance('York', 'London', 20)
+        >>> dm.add_distance('Guelph', 'London', 15)
+        >>> trucks = [Truck(1, 25, 'York'), Truck(2, 20, 'York')]
+        >>> parcels = [Parcel(1, 10, 'York', 'Guelph'),
+        ...            Parcel(2, 10, 'York', 'London'),
+        ...            Parcel(3, 15, 'York', 'Guelph'),
+        ...            Parcel(4, 10, 'York', 'London')]
+        >>> scheduler = ExactScheduler(dm)
+        >>> scheduler.schedule(parcels, trucks)
+        []
+        >>> [truck.routes for truck in trucks], scheduler.optimal
+        ([['York', 'Guelph'], ['York', 'London']], True)
+        """
+        start = perf_counter()
+        depot = trucks[0].routes[0] if trucks else ''
+        names = [depot] + list(dict.fromkeys(p.destiny for p in parcels))
+        index = {name: c for c, name in enumerate(names)}
+        ids = [self._dmap.city_id(name) for name in names]
+        k = len(ids)
+        matrix = self._dmap.distances([i for i in ids for _ in ids], ids * k)
+        tours = _Tours(matrix, k)
+        closure = _closure(matrix, k)
+        bounds = tours if closure == matrix else _Tours(closure, k)
+
+        copies = [truck.copy() for truck in trucks]
+        self._incumbent.schedule(parcels, copies)
+        holders = {id(p): t for t, truck in enumerate(copies)
+                   for p in truck.parcels}
+        assignment = [holders.get(id(p), -1) for p in parcels]
+
+        self.nodes = 0
+        self.optimal = False
+        if len(parcels) <= EXACT_PARCEL_LIMIT:
+            search = _BranchAndBound(
+                [p.volume for p in parcels],
+                [index[p.destiny] for p in parcels],
+                [truck.unused_space() for truck in trucks], tours, bounds,
+                self._objective == 'distance', assignment)
+            search.run(self._node_limit, start + self._time_limit)
+            assignment = search.best
+            self.nodes = search.nodes
+            self.optimal = not search.stopped
+
+        for t, truck in enumerate(trucks):
+            load = [p for p, owner in zip(parcels, assignment) if owner == t]
+            mask = 0
+            for parcel in load:
+                mask |= 1 << index[parcel.destiny]
+            rank = {c: r for r, c in enumerate(tours.order(mask))}
+            load.sort(key=lambda p: rank[index[p.destiny]])
+            for parcel in load:
+                truck.pack(parcel)
+        # A heuristic tour length is not exact, so the bounds may have cut
+        # off the best schedule, and a truck's tour may not be the shortest.
+        self.optimal = self.optimal and tours.exact and bounds.exact
+        if verbose:
+            print(f'Searched {self.nodes} nodes in '
+                  f'{perf_counter() - start:.3f}s; optimal: {self.optimal}')
+        return [p for p, owner in zip(parcels, assignment) if owner == -1]
+
+
+class _Tours:
+    """The shortest tours from the depot through sets of cities.
+
+    The cities are numbered from 0 to k - 1, where city 0 is the depot, and a
+    set of cities is a bit mask in which bit c is set iff city c is in the
+    set.  The depot is never in a set.
+
+    === Public Attributes ===
+    exact:
+      True iff every tour found so far is a shortest tour, that is, none
+      went through more than EXACT_TOUR_LIMIT cities.
+
+    === Private Attributes ===
+    _matrix:
+      The distance from city i to city j is <_matrix>[i * <_k> + j].
+    _k:
+      The number of cities.
+    _tours:
+      The length and order of the cities of each tour found so far, by set.
+    """
+    exact: bool
+    _matrix: List[int]
+    _k: int
+    _tours: Dict[int, Tuple[int, List[int]]]
+
+    def __init__(self, matrix: List[int], k: int) -> None:
+        """Initialize tours through <k> cities with distances <matrix>."""
+        for i in range(k):
+            matrix[i * k + i] = 0
+        self.exact = True
+        self._matrix = matrix
+        self._k = k
+        self._tours = {0: (0, [])}
+
+    def cost(self, mask: int) -> int:
+        """Return the length of the shortest tour from the depot through the
+        cities in <mask> and back.
+
+        >>> tours = _Tours([0, 1, 5, 5, 0, 1, 1, 5, 0], 3)
+        >>> tours.cost(0b110), tours.cost(0b100), tours.cost(0)
+        (3, 6, 0)
+        """
+        if mask not in self._tours:
+            self._tours[mask] = self._find(mask)
+        return self._tours[mask][0]
+
+    def order(self, mask: int) -> List[int]:
+        """Return the cities in <mask> in the order of its shortest tour.
+
+        >>> _Tours([0, 1, 5, 5, 0, 1, 1, 5, 0], 3).order(0b110)
+        [1, 2]
+        """
+        self.cost(mask)
+        return self._tours[mask][1]
+
+    def _find(self, mask: int) -> Tuple[int, List[int]]:
+        """Return the length and order of the shortest tour through the cities
+        in <mask>, exactly by dynamic programming over subsets of the cities
+        if there are at most EXACT_TOUR_LIMIT of them, or else as found by
+        the heuristics of optimize_routes, in which case record that not
+        every tour is exact.
+        """
+        k = self._k
+        matrix = self._matrix
+        cities = [c for c in range(1, k) if mask >> c & 1]
+        m = len(cities)
+        if m > EXACT_TOUR_LIMIT:
+            self.exact = False
+            stops = [0] + cities
+            sub = [matrix[a * k + b] for a in stops for b in stops]
+            tour = sequence_tour(sub, m + 1, list(range(m + 1)))[0]
+            order = [stops[i] for i in tour[1:]]
+            return (sum([matrix[a * k + b] for a, b
+                         in zip([0] + order, order + [0])]), order)
+
+        # best[s][j] is the length of the shortest path from the depot through
+        # the cities in subset s of <cities>, ending at cities[j].
+        best = [[-1] * m for _ in range(1 << m)]
+        came = [[-1] * m for _ in range(1 << m)]
+        for j, city in enumerate(cities):
+            best[1 << j][j] = matrix[city]
+        for s in range(1, 1 << m):
+            for j in range(m):
+                length = best[s][j]
+                if length < 0:
+                    continue
+                here = cities[j] * k
+                for n in range(m):
+                    if s >> n & 1:
+                        continue
+                    t = s | 1 << n
+                    total = length + matrix[here + cities[n]]
+                    if best[t][n] < 0 or total < best[t][n]:
+                        best[t][n] = total
+                        came[t][n] = j
+        full = (1 << m) - 1
+        last = min(range(m),
+                   key=lambda j: best[full][j] + matrix[cities[j] * k])
+        length = best[full][last] + matrix[cities[last] * k]
+        order = []
+        s = full
+        while last != -1:
+            order.append(cities[last])
+            s, last = s & ~(1 << last), came[s][last]
+        return length, order[::-1]
+
+
+class _BranchAndBound:
+    """A branch and bound search for the best assignment of parcels to
+    trucks.
+
+    Parcels and trucks are numbered by their positions in the lists given to
+    the initializer, and an assignment gives, for each parcel, the truck it
+    goes on, or -1 if it is not scheduled.
+
+    === Public Attributes ===
+    best:
+      The best assignment found so far.
+    nodes:
+      The number of nodes searched so far.
+    stopped:
+      True iff a limit stopped the search before it finished.
+
+    === Private Attributes ===
+    _volumes, _cities:
+      The volume and destination city of each parcel.
+    _order:
+      The parcels in the order they are assigned: from the largest volume to
+      the smallest, with identical parcels next to each other.
+    _spaces, _visits:
+      The unused space and the set of cities of each truck, for the
+      assignment being built.
+    _tours:
+      The shortest tours through sets of cities.
+    _bounds:
+      The shortest tours through sets of cities when every distance is the
+      shortest path between its cities, which bound the lengths of <_tours>
+      from below and never get shorter as cities are added.
+    _by_distance:
+      True iff the distance matters more than the number of trucks.
+    _score:
+      The score of <best>.
+    _assignment:
+      The assignment being built.
+    _seen:
+      The fewest unscheduled parcels with which each state has been reached,
+      where a state is the number of parcels assigned and the sorted states
+      of the trucks.
+    _node_limit, _deadline:
+      The search stops after <_node_limit> nodes, or once perf_counter()
+      passes <_deadline>.
+    """
+    best: List[int]
+    nodes: int
+    stopped: bool
+    _volumes: List[int]
+    _cities: List[int]
+    _order: List[int]
+    _spaces: List[int]
+    _visits: List[int]
+    _tours: _Tours
+    _bounds: _Tours
+    _by_distance: bool
+    _score: Tuple[int, int, int]
+    _assignment: List[int]
+    _seen: Dict[Tuple[int, Tuple[Tuple[int, int], ...]], int]
+    _node_limit: int
+    _deadline: float
+
+    def __init__(self, volumes: List[int], cities: List[int],
+                 spaces: List[int], tours: _Tours, bounds: _Tours,
+                 by_distance: bool, incumbent: List[int]) -> None:
+        """Initialize a search over parcels with <volumes> going to <cities>,
+        onto empty trucks with <spaces>, with tour lengths from <tours> and
+        their lower bounds from <bounds>, starting from the assignment
+        <incumbent>.
+        """
+        self._volumes = volumes
+        self._cities = cities
+        self._order = sorted(range(len(volumes)),
+                             key=lambda p: (-volumes[p], cities[p]))
+        self._spaces = spaces[:]
+        self._visits = [0] * len(spaces)
+        self._tours = tours
+        self._bounds = bounds
+        self._by_distance = by_distance
+        self._assignment = [-1] * len(volumes)
+        self._seen = {}
+        self.best = incumbent
+        self._score = self._rate(incumbent)
+        self.nodes = 0
+        self.stopped = False
+        self._node_limit = 0
+        self._deadline = 0.0
+
+    def run(self, node_limit: int, deadline: float) -> None:
+        """Search for a better assignment than <best>, stopping after
+        <node_limit> nodes or once perf_counter() passes <deadline>.
+        """
+        self._node_limit = node_limit
+        self._deadline = deadline
+        self._search(0, 0, 0, 0, 0)
+
+    def _rate(self, assignment: List[int]) -> Tuple[int, int, int]:
+        """Return the score of <assignment>."""
+        masks = [0] * len(self._spaces)
+        for p, t in enumerate(assignment):
+            if t != -1:
+                masks[t] |= 1 << self._cities[p]
+        return self._key(assignment.count(-1),
+                         sum([1 for mask in masks if mask]),
+                         sum([self._tours.cost(mask) for mask in masks]))
+
+    def _key(self, unscheduled: int, used: int,
+             distance: int) -> Tuple[int, int, int]:
+        """Return the score of a schedule with <unscheduled> parcels not
+        scheduled, <used> trucks used, and <distance> travelled.
+        """
+        if self._by_distance:
+            return unscheduled, distance, used
+        return unscheduled, used, distance
+
+    def _unplaceable(self, i: int) -> int:
+        """Return a lower bound on how many of the parcels from position <i>
+        of <_order> on cannot be scheduled, given the space left in the
+        trucks.
+        """
+        room = max(self._spaces, default=0)
+        free = sum(self._spaces)
+        placed = 0
+        for p in reversed(self._order[i:]):
+            volume = self._volumes[p]
+            if volume <= room and volume <= free:
+                free -= volume
+                placed += 1
+        return len(self._order) - i - placed
+
+    def _extra_trucks(self, i: int, unplaceable: int) -> int:
+        """Return a lower bound on how many more trucks must be used to
+        schedule all but <unplaceable> of the parcels from position <i> of
+        <_order> on.
+        """
+        volumes = [self._volumes[p] for p in self._order[i:]]
+        needed = sum(volumes[unplaceable:])
+        needed -= sum([space for space, visits
+                       in zip(self._spaces, self._visits) if visits])
+        extra = 0
+        empty = sorted([space for space, visits
+                        in zip(self._spaces, self._visits) if not visits],
+                       reverse=True)
+        while needed > 0 and extra < len(empty):
+            needed -= empty[extra]
+            extra += 1
+        return extra
+
+    def _search(self, i: int, unscheduled: int, used: int,
+                distance: int, bound: int) -> None:
+        """Search every way of assigning the parcels from position <i> of
+        <_order> on, given that <unscheduled> parcels, <used> trucks and
+        <distance> are already accounted for, and that the tours so far are
+        <bound> long as measured by <_bounds>.
+        """
+        self.nodes += 1
+        if self.nodes > self._node_limit or (
+                self.nodes % 1024 == 0 and perf_counter() > self._deadline):
+            self.stopped = True
+        if self.stopped:
+            return
+        unplaceable = self._unplaceable(i)
+        if self._key(unscheduled + unplaceable,
+                     used + self._extra_trucks(i, unplaceable),
+                     bound) >= self._score:
+            return
+        if i == len(self._order):
+            score = self._key(unscheduled, used, distance)
+            if score < self._score:
+                self._score = score
+                self.best = self._assignment[:]
+            return
+
+        state = (i, tuple(sorted(zip(self._spaces, self._visits))))
+        if self._seen.get(state, unscheduled + 1) <= unscheduled:
+            return
+        self._seen[state] = unscheduled
+
+        p = self._order[i]
+        volume = self._volumes[p]
+        bit = 1 << self._cities[p]
+        spaces = self._spaces
+        visits = self._visits
+        trucks = sorted(range(len(spaces)),
+                        key=lambda t: (not visits[t] & bit, not visits[t]))
+        tried = set()
+        for t in trucks:
+            if spaces[t] < volume or (spaces[t], visits[t]) in tried:
+                continue
+            tried.add((spaces[t], visits[t]))
+            before = visits[t]
+            spaces[t] -= volume
+            visits[t] |= bit
+            self._assignment[p] = t
+            self._search(i + 1, unscheduled, used + (before == 0),
+                         distance + self._tours.cost(visits[t])
+                         - self._tours.cost(before),
+                         bound + self._bounds.cost(visits[t])
+                         - self._bounds.cost(before))
+            spaces[t] += volume
+            visits[t] = before
+        self._assignment[p] = -1
+        self._search(i + 1, unscheduled + 1, used, distance, bound)
+
+
+# ----- Helper functions -----
+
+
+def _closure(matrix: List[int], k: int) -> List[int]:
+    """Return a copy of <matrix> in which the distance from city i to city j
+    is the length of the shortest path from i to j, by Floyd-Warshall.
+
+    The distance from city i to city j is <matrix>[i * <k> + j], and a
+    distance of -1 is missing.  The distance from a city to itself is 0.
+
+    >>> _closure([0, 1, 9, 1, 0, 1, 9, 1, 0], 3)
+    [0, 1, 2, 1, 0, 1, 2, 1, 0]
+    >>> _closure([0, -1, 4, 3, 0, -1, -1, 2, 0], 3)
+    [0, 6, 4, 3, 0, 7, 5, 2, 0]
+    """
+    closure = matrix[:]
+    for i in range(k):
+        closure[i * k + i] = 0
+    for m in range(k):
+        row_m = m * k
+        for i in range(k):
+            to_m = closure[i * k + m]
+            if to_m < 0:
+                continue
+            row_i = i * k
+            for j in range(k):
+                via = closure[row_m + j]
+                if via >= 0 and (closure[row_i + j] < 0
+                                 or to_m + via < closure[row_i + j]):
+                    closure[row_i + j] = to_m + via
+    return closure
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'time', 'distance_map', 'domain',
+                                   'improve', 'scheduler'],
+        'allowed-io': ['ExactScheduler.schedule'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
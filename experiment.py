@@ -24,11 +24,49 @@ run the experiment, generate statistics as the result of the experiment, and
 
 This module is responsible for all the reading of data from the data files.
 """
-from typing import List, Dict, Union
+from typing import Callable, List, Dict, Optional, Tuple, Union
+from array import array
 import json
+import mmap
 from scheduler import RandomScheduler, GreedyScheduler, Scheduler
+from packing import FirstFitScheduler, BestFitScheduler
+from anytime import AnytimeScheduler
+from multistart import MultiStartScheduler, DEFAULT_OBJECTIVE
+from exact import ExactScheduler
+from cluster import ClusterScheduler
+from partition import PartitionedScheduler
+from improve import improve_schedule, optimize_routes
 from domain import Parcel, Truck, Fleet
-from distance_map import DistanceMap
+from distance_map import DistanceMap, MATRIX_TYPECODE
+
+# File name suffixes of the two files that make up a compiled distance map.
+MATRIX_SUFFIX = '.dmap'
+CITIES_SUFFIX = '.cities'
+
+# The scheduling algorithms that the 'algorithm' in a configuration can name.
+# Each is called with the configuration and the distance map of an experiment
+# to make its scheduler.
+SCHEDULERS: Dict[str, Callable[[Dict[str, Union[str, bool]], DistanceMap],
+                               Scheduler]] = {
+    'random': lambda config, dmap: RandomScheduler(),
+    'greedy': lambda config, dmap: GreedyScheduler(config),
+    'first_fit': lambda config, dmap: FirstFitScheduler(),
+    'first_fit_decreasing': lambda config, dmap: FirstFitScheduler(True),
+    'best_fit': lambda config, dmap: BestFitScheduler(),
+    'best_fit_decreasing': lambda config, dmap: BestFitScheduler(True),
+    'anytime': lambda config, dmap: AnytimeScheduler(
+        GreedyScheduler(config), dmap, config.get('deadline_ms', 1000)),
+    'multistart': lambda config, dmap: MultiStartScheduler(
+        SCHEDULERS[config.get('base_algorithm', 'random')](config, dmap),
+        dmap, config.get('trials', 8), config.get('seed', 0),
+        config.get('trial_workers'),
+        config.get('objective', DEFAULT_OBJECTIVE)),
+    'exact': lambda config, dmap: ExactScheduler(
+        dmap, config.get('exact_objective', 'trucks'),
+        config.get('node_limit', 1000000), config.get('time_limit', 10.0)),
+    'cluster': lambda config, dmap: ClusterScheduler(
+        dmap, config.get('clusters'), config.get('seed', 0))
+}
 
 
 class SchedulingExperiment:
@@ -54,6 +92,10 @@ class SchedulingExperiment:
       The trucks that parcels are scheduled to in this experiment.
     dmap:
       The distances between cities in this experiment.
+    improvement:
+      The report from improving the schedule after it is built, as returned
+      by improve_schedule, with the key 'route_distance_saved' added if the
+      routes are optimized, or an empty dictionary if neither is done.
 
     === Private Attributes ===
     _stats:
@@ -64,6 +106,12 @@ class SchedulingExperiment:
       A list of parcels. <_unscheduled>'s value is undefined until <self>.run
       is called, at which point it contains the list of parcels that could
       not be scheduled in the experiment.
+    _improve:
+      The number of seconds to spend improving the schedule after it is
+      built, or None to leave it as the scheduler built it.
+    _optimize_routes:
+      Whether to reorder the route of each truck to shorten it, once the
+      schedule is built and improved.
 
     === Representation Invariants ===
     - <fleet> contains at least one truck
@@ -76,29 +124,76 @@ class SchedulingExperiment:
     parcels: List[Parcel]
     fleet: Fleet
     dmap: DistanceMap
+    improvement: Dict[str, Union[int, float]]
     _stats: Dict[str, Union[int, float]]
     _unscheduled: List[Parcel]
+    _improve: Optional[float]
+    _optimize_routes: bool
 
-    def __init__(self, config: Dict[str, Union[str, bool]]) -> None:
+    def __init__(self, config: Dict[str, Union[str, bool]],
+                 dmap: Optional[DistanceMap] = None) -> None:
         """Initialize a new experiment with the configuration specified in
         <config>.
 
+        If <dmap> is not None, use it as the map instead of reading the
+        'map_file' from <config>.  Experiments that share a map also share
+        the lengths of the routes it has costed.
+
         Precondition: <config> contains keys and values as specified
-        in Assignment 1.
+        in Assignment 1, except that its 'algorithm' may be any key of
+        SCHEDULERS.
+
+        <config> may also contain these optional keys:
+        - 'complete_map': if True, fill in the distances missing from the
+          map file with shortest path lengths when it is read.
+        - 'dense_map': if True, store the map as a dense matrix.
+        - 'workers': if present, split the parcels into groups by destination
+          and schedule the groups in parallel, with at most this many
+          processes, using a PartitionedScheduler.
+        - 'seed': with 'workers', the seed that makes the parallel schedule
+          reproducible.
+        - 'deadline_ms': for the 'anytime' algorithm, how many milliseconds
+          it may take to build a schedule with the greedy algorithm in
+          <config> and improve it.  The default is 1000.
+        - 'base_algorithm', 'trials', 'trial_workers' and 'objective': for
+          the 'multistart' algorithm, the algorithm each trial runs (by
+          default 'random'), the number of trials (by default 8), the
+          largest number of processes to run them in, and the statistics
+          that choose the best trial (see MultiStartScheduler).  The trials
+          are seeded from 'seed', which is 0 by default.
+        - 'exact_objective', 'node_limit' and 'time_limit': for the 'exact'
+          algorithm, whether to minimize 'trucks' (the default) or
+          'distance' once as many parcels as possible are scheduled, and how
+          many nodes and seconds the search may take (by default 1000000
+          and 10).
+        - 'clusters': for the 'cluster' algorithm, how many clusters of
+          nearby destinations to make, by default about as many as the
+          trucks needed to hold all of the parcels.  The first medoids are
+          chosen with 'seed', which is 0 by default.
+        - 'improve': the number of seconds to spend improving the schedule
+          with relocate and swap moves after it is built.
+        - 'optimize_routes': if True, reorder the cities on each truck's
+          route to shorten it, without moving any parcels between trucks.
         """
         self.verbose = config['verbose']
-        if config['algorithm'] == 'random':
-            self.scheduler = RandomScheduler()
-        else:
-            self.scheduler = GreedyScheduler(config)
+        self.dmap = read_map(config) if dmap is None else dmap
+        algorithm = config['algorithm']
+        self.scheduler = SCHEDULERS.get(algorithm, SCHEDULERS['greedy'])(
+            config, self.dmap)
+        if 'workers' in config:
+            self.scheduler = PartitionedScheduler(self.scheduler,
+                                                  workers=config['workers'],
+                                                  seed=config.get('seed'))
 
         self.parcels = read_parcels(config['parcel_file'])
         self.fleet = read_trucks(config['truck_file'],
                                  config['depot_location'])
-        self.dmap = read_distance_map(config['map_file'])
 
+        self.improvement = {}
         self._stats = {}
         self._unscheduled = []
+        self._improve = config.get('improve')
+        self._optimize_routes = config.get('optimize_routes', False)
 
     def run(self, report: bool = False) -> Dict[str, Union[int, float]]:
         """Run the experiment and return statistics on the outcome.
@@ -115,6 +210,12 @@ class SchedulingExperiment:
         self._unscheduled = self.scheduler.schedule(self.parcels,
                                                     self.fleet.trucks,
                                                     self.verbose)
+        if self._improve is not None:
+            self.improvement = improve_schedule(self.fleet.trucks, self.dmap,
+                                                self._improve)
+        if self._optimize_routes:
+            self.improvement['route_distance_saved'] = optimize_routes(
+                self.fleet.trucks, self.dmap)
 
         self._compute_stats()
         if report:
@@ -128,15 +229,7 @@ class SchedulingExperiment:
 
         Precondition: _run has already been called.
         """
-        unused = self.fleet.num_trucks() - self.fleet.num_nonempty_trucks()
-        self._stats = {
-            'fleet': self.fleet.num_trucks(),
-            'unused_trucks': unused,
-            'avg_distance': self.fleet.average_distance_travelled(self.dmap),
-            'avg_fullness': self.fleet.average_fullness(),
-            'unused_space': self.fleet.total_unused_space(),
-            'unscheduled': len(self._unscheduled)
-        }
+        self._stats = self.fleet.statistics(self.dmap, len(self._unscheduled))
 
     def _print_report(self) -> None:
         """Report on the statistics for this experiment.
@@ -171,23 +264,102 @@ def read_parcels(parcel_file: str) -> List[Parcel]:
     return parcels
 
 
-def read_distance_map(distance_map_file: str) -> DistanceMap:
+def read_map(config: Dict[str, Union[str, bool]]) -> DistanceMap:
+    """Return the DistanceMap for the 'map_file' in <config>.
+
+    If the 'map_file' ends in MATRIX_SUFFIX, it is loaded as a compiled
+    distance map (see compile_distance_map).  Otherwise it is read as text,
+    using the optional 'dense_map' and 'complete_map' keys of <config>.
+
+    Precondition: <config> contains keys and values as specified for
+                  SchedulingExperiment.
+    """
+    if config['map_file'].endswith(MATRIX_SUFFIX):
+        return load_distance_map(config['map_file'])
+    return read_distance_map(config['map_file'],
+                             config.get('dense_map', False),
+                             config.get('complete_map', False))
+
+
+def read_distance_map(distance_map_file: str, dense: bool = False,
+                      complete: bool = False) -> DistanceMap:
     """Read distance data from <distance_map_file> and return a DistanceMap
-    that records it.
+    that records it.  The DistanceMap is dense iff <dense> is True.
+
+    If <complete> is True, fill in every distance that is missing from the
+    file with the length of the shortest path between the two cities.
 
     Precondition: <distance_map_file> is the path to a file containing distance
                   data in the form specified in Assignment 1.
     """
-    dm = DistanceMap()
+    dm = DistanceMap(dense)
     with open(distance_map_file, 'r') as file:
-        for line in file:
-            tokens = line.strip().split(',')
-            c1 = tokens[0].strip()
-            c2 = tokens[1].strip()
-            distance1 = int(tokens[2].strip())
-            distance2 = int(tokens[3].strip()) if len(tokens) == 4 \
-                else distance1
-            dm.add_distance(c1, c2, distance1, distance2)
+        dm.add_distances(_read_distance(line) for line in file)
+    if complete:
+        dm.complete_distances()
+    return dm
+
+
+def _read_distance(line: str) -> Tuple[str, str, int, int]:
+    """Return the entry (c1, c2, d1, d2) described by one <line> of a distance
+    map file.
+    """
+    tokens = line.strip().split(',')
+    c1 = tokens[0].strip()
+    c2 = tokens[1].strip()
+    distance1 = int(tokens[2].strip())
+    distance2 = int(tokens[3].strip()) if len(tokens) == 4 else distance1
+    return c1, c2, distance1, distance2
+
+
+def compile_distance_map(distance_map_file: str, output_base: str,
+                         complete: bool = False) -> None:
+    """Read distance data from <distance_map_file> and save it as a compiled
+    distance map, made of a city index <output_base> + CITIES_SUFFIX and a
+    matrix file <output_base> + MATRIX_SUFFIX.
+
+    The city index has one city name per line, in order of city id.  The
+    matrix file holds the n * n distances between the n cities in row-major
+    order, as machine integers of type MATRIX_TYPECODE in native byte order,
+    with -1 for missing distances.
+
+    If <complete> is True, missing distances are filled in with shortest path
+    lengths before the map is saved.
+
+    Precondition: <distance_map_file> is the path to a file containing distance
+                  data in the form specified in Assignment 1.
+    """
+    dm = read_distance_map(distance_map_file, complete=complete)
+    cities, matrix = dm.export_matrix()
+    with open(output_base + CITIES_SUFFIX, 'w') as file:
+        for city in cities:
+            file.write(city + '\n')
+    with open(output_base + MATRIX_SUFFIX, 'wb') as file:
+        matrix.tofile(file)
+
+
+def load_distance_map(matrix_file: str) -> DistanceMap:
+    """Return a dense DistanceMap that uses the compiled distance map whose
+    matrix file is <matrix_file>.
+
+    The matrix file is memory-mapped rather than read, so loading is fast even
+    for large maps, and processes that load the same map share one copy of it
+    in the page cache.  A DistanceMap that is changed after loading makes its
+    own copy of the matrix first.
+
+    Precondition: <matrix_file> ends in MATRIX_SUFFIX and was written by
+                  compile_distance_map on a machine with the same byte order.
+    """
+    base = matrix_file[:-len(MATRIX_SUFFIX)]
+    with open(base + CITIES_SUFFIX, 'r') as file:
+        cities = [line.rstrip('\n') for line in file]
+    dm = DistanceMap()
+    if not cities:
+        dm.use_matrix(cities, array(MATRIX_TYPECODE))
+        return dm
+    with open(matrix_file, 'rb') as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    dm.use_matrix(cities, memoryview(mapped).cast(MATRIX_TYPECODE))
     return dm
 
 
@@ -229,10 +401,13 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'allowed-io': ['read_parcels', 'read_distance_map', 'read_trucks',
+                       'compile_distance_map', 'load_distance_map',
                        '_print_report', 'simple_check'],
         'allowed-import-modules': ['doctest', 'python_ta', 'typing',
-                                   'json', 'scheduler', 'domain',
-                                   'distance_map'],
+                                   'json', 'scheduler', 'packing',
+                                   'anytime', 'multistart', 'exact',
+                                   'cluster', 'partition', 'improve', 'domain',
+                                   'distance_map', 'array', 'mmap'],
         'disable': ['E1136'],
         'max-attributes': 15,
     })
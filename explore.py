@@ -19,8 +19,9 @@ Sophia Huynh, Maryam Majedi, and Jaisie Sin.
 
 This module reads from a json file (whose name is hard-coded in the
 compare_algorithms block) to determine the parcel, truck and map files to use.
-It then constructs all nine possible algorithm configurations, and runs each
-on this same data.  Results are printed to a csv file called 'results.csv'.
+It then constructs the nine possible configurations of the random and greedy
+algorithms, and the four bin packing algorithms, and runs each on this same
+data.  Results are printed to a csv file called 'results.csv'.
 
 You have no tasks associated with this module.  It is provided to you so that
 you can compare the performance of the algorithms and notice any patterns or
@@ -29,13 +30,14 @@ reveals bugs in your code.
 """
 from typing import TextIO, Dict, Union
 import json
-from experiment import SchedulingExperiment
+from experiment import SchedulingExperiment, read_map
 
 
 def print_table_title(file: TextIO) -> None:
     """Print the title row of a results table in csv format to <file>.
     """
-    file.write('Algorithm,Parcel Priority,Parcel Order  ,Truck Order   ,'
+    file.write('Algorithm           ,'
+               + 'Parcel Priority,Parcel Order  ,Truck Order   ,'
                + 'Unused Trucks,Unused Space,Avg dist,Avg fullness,'
                + 'Unsched Parcels\n')
 
@@ -48,7 +50,7 @@ def print_table_row(config: Dict[str, Union[str, bool]],
     <stats> is the stats that resulted.
     <file> is the file to write to.
     """
-    file.write(f'{config["algorithm"]:<9},'
+    file.write(f'{config["algorithm"]:<20},'
                f'{config["parcel_priority"]:<15},'
                f'{config["parcel_order"]:<14},'
                f'{config["truck_order"]:<14},'
@@ -62,8 +64,10 @@ def print_table_row(config: Dict[str, Union[str, bool]],
 def compare_algorithms(config_file: str) -> None:
     """Compare all algorithms on a single problem.
 
-    Run the random algorithm and every configuration of the greedy
-    algorithm on the scheduling problem defined in <config_file>.
+    Run the random algorithm, every configuration of the greedy
+    algorithm, and the First-Fit and Best-Fit algorithms with and without
+    sorting by decreasing volume, on the scheduling problem defined in
+    <config_file>.
 
     Precondition: <config_file> a path to a json file with keys and values
     as in the dictionary format defined in Assignment 1.
@@ -116,9 +120,30 @@ def compare_algorithms(config_file: str) -> None:
         {'algorithm': 'greedy',
          'parcel_priority': 'destination',
          'parcel_order': 'non-increasing',
-         'truck_order': 'non-increasing'}
+         'truck_order': 'non-increasing'},
+        # --- Bin packing, with and without sorting by decreasing volume
+        {'algorithm': 'first_fit',
+         'parcel_priority': 'NA',
+         'parcel_order': 'NA',
+         'truck_order': 'NA'},
+        {'algorithm': 'first_fit_decreasing',
+         'parcel_priority': 'NA',
+         'parcel_order': 'NA',
+         'truck_order': 'NA'},
+        {'algorithm': 'best_fit',
+         'parcel_priority': 'NA',
+         'parcel_order': 'NA',
+         'truck_order': 'NA'},
+        {'algorithm': 'best_fit_decreasing',
+         'parcel_priority': 'NA',
+         'parcel_order': 'NA',
+         'truck_order': 'NA'}
     ]
 
+    # Every configuration uses the same map, so read it only once.  This also
+    # lets the configurations share the lengths of the routes it has costed.
+    dmap = read_map(basic_config)
+
     with open('data/results.csv', 'w') as file:
         print_table_title(file)
         for item in algorithm_configurations:
@@ -128,7 +153,7 @@ def compare_algorithms(config_file: str) -> None:
             config.update(item)
             # Run an experiment on this configuration and print the results
             # to our csv file.
-            expt = SchedulingExperiment(config)
+            expt = SchedulingExperiment(config, dmap)
             results = expt.run(report=False)
             print_table_row(config, results, file)
 
@@ -0,0 +1,674 @@
+"""Assignment 1 - Schedule improvement
+
+CSC148, Winter 2021
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2021 Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+===== Module Description =====
+
+This module contains functions that improve a schedule after a scheduler has
+built it, by moving parcels between trucks.
+
+The cost of a truck is a pair: 1 if it carries any parcels and 0 otherwise,
+followed by the distance of its route.  Costs are compared in that order, so
+a schedule is better when it uses fewer trucks, or the same number of trucks
+over a shorter total distance.  A move changes only two trucks, so it is
+scored by how much it changes the cost of those two trucks alone, and only
+the legs next to the stops that a move adds or removes are looked up.
+
+There are two kinds of move:
+- relocate: take a parcel off one truck and put it on another truck that has
+  room for it.
+- swap: exchange a parcel on one truck with a parcel on another, if both
+  trucks have room for the parcel they receive.
+
+It also contains optimize_routes, which leaves every parcel on its truck but
+changes the order in which each truck visits its cities.  Each truck's tour
+starts and ends at the depot.  It is built by always driving to the nearest
+city not yet visited, and then shortened with two kinds of move until neither
+helps:
+- 2-opt: reverse the order of a stretch of the tour.
+- Or-opt: move a stretch of one to three cities to elsewhere in the tour.
+The distances between a truck's cities are looked up once, into a small
+matrix, before the tour is built.  Trucks are sequenced in parallel when
+there are many of them.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Dict, List, Optional, Set, Tuple, Union
+from distance_map import DistanceMap
+from domain import Parcel, Truck
+
+# The number of trucks with routes to sequence at or above which
+# optimize_routes uses a process pool.
+PARALLEL_ROUTES = 256
+
+
+def improve_schedule(trucks: List[Truck], dmap: DistanceMap,
+                     budget: float = 1.0) -> Dict[str, Union[int, float]]:
+    """Improve the schedule in <trucks> with relocate and swap moves, for at
+    most about <budget> seconds, using <dmap> for the distances.
+
+    Mutate the Truck objects in <trucks> so that they store the improved
+    schedule.  Each truck keeps its own parcels in the order they were packed,
+    with any parcel it receives placed right after the last parcel it carries
+    to the same city, or at the end if there is none, and its route is the
+    route that packing its parcels in that order would give.
+
+    Return a report with these keys:
+    - 'relocations': the number of relocate moves made
+    - 'swaps': the number of swap moves made
+    - 'trucks_freed': how many fewer trucks carry parcels
+    - 'distance_saved': how much shorter the total distance is
+    - 'seconds': how long the improvement took
+
+    Precondition: <dmap> contains every distance needed to cost any route
+    through the cities in <trucks>.
+
+    >>> dm = DistanceMap()
+    >>> dm.add_distance('York', 'Guelph', 10)
+    >>> dm.add_distance('York', 'London', 20)
+    >>> dm.add_distance('Guelph', 'London', 15)
+    >>> t1, t2 = Truck(1, 50, 'York'), Truck(2, 50, 'York')
+    >>> t1.pack(Parcel(1, 10, 'York', 'Guelph'))
+    True
+    >>> t2.pack(Parcel(2, 10, 'York', 'London'))
+    True
+    >>> report = improve_schedule([t1, t2], dm)
+    >>> report['relocations'], report['trucks_freed'], report['distance_saved']
+    (1, 1, 15)
+    >>> t1.routes, t2.routes
+    (['York'], ['York', 'London', 'Guelph'])
+    """
+    start = perf_counter()
+    deadline = start + budget
+    costs = [_cost(dmap, truck.routes) for truck in trucks]
+    before = _total(costs)
+    report = {'relocations': 0, 'swaps': 0}
+
+    improved = True
+    while improved and perf_counter() < deadline:
+        improved = False
+        for a, truck in enumerate(trucks):
+            for parcel in truck.parcels[:]:
+                if perf_counter() >= deadline:
+                    break
+                if _relocate(trucks, costs, dmap, a, parcel):
+                    report['relocations'] += 1
+                    improved = True
+                elif _swap(trucks, costs, dmap, a, parcel, deadline):
+                    report['swaps'] += 1
+                    improved = True
+
+    after = _total(costs)
+    report['trucks_freed'] = before[0] - after[0]
+    report['distance_saved'] = before[1] - after[1]
+    report['seconds'] = perf_counter() - start
+    return report
+
+
+def optimize_routes(trucks: List[Truck], dmap: DistanceMap,
+                    workers: Optional[int] = None,
+                    budget: Optional[float] = None) -> int:
+    """Shorten the route of each truck in <trucks> by changing the order in
+    which it visits its cities, using <dmap> for the distances, and return the
+    total distance saved.
+
+    Each truck keeps the same parcels, and its parcels are reordered to match
+    its new route.  A truck whose new route would not be shorter keeps its
+    route, and so does a truck whose route needs a distance that is not in
+    <dmap>.
+
+    If there are at least PARALLEL_ROUTES routes to sequence and <workers> is
+    not 1, sequence them in a process pool of at most <workers> processes
+    (one per processor if <workers> is None).
+
+    If <budget> is not None, sequence the routes one at a time instead, and
+    stop after about <budget> seconds, leaving the remaining routes as they
+    are.
+
+    >>> dm = DistanceMap()
+    >>> dm.add_distance('York', 'Guelph', 10)
+    >>> dm.add_distance('York', 'London', 20)
+    >>> dm.add_distance('York', 'Barrie', 12)
+    >>> dm.add_distance('Guelph', 'London', 15)
+    >>> dm.add_distance('Guelph', 'Barrie', 18)
+    >>> dm.add_distance('London', 'Barrie', 30)
+    >>> truck = Truck(1, 50, 'York')
+    >>> for i, city in enumerate(['London', 'Barrie', 'Guelph', 'London']):
+    ...     _ = truck.pack(Parcel(i, 5, 'York', city))
+    >>> dm.route_distance(truck.routes)
+    103
+    >>> optimize_routes([truck], dm)
+    38
+    >>> truck.routes, [p.id for p in truck.parcels]
+    (['York', 'London', 'Guelph', 'Barrie'], [0, 3, 2, 1])
+    """
+    start = perf_counter()
+    jobs = []
+    owners = []
+    for truck in trucks:
+        cities = list(dict.fromkeys(truck.routes))
+        if len(cities) < 3:
+            continue
+        ids = [dmap.city_id(city) for city in cities]
+        k = len(ids)
+        matrix = dmap.distances([i for i in ids for _ in ids], ids * k)
+        for i in range(k):
+            matrix[i * k + i] = 0
+        if min(matrix) < 0:
+            continue
+        positions = {city: i for i, city in enumerate(cities)}
+        jobs.append((matrix, k, [positions[city] for city in truck.routes]))
+        owners.append((truck, cities))
+
+    if budget is not None:
+        results = []
+        for job in jobs:
+            if perf_counter() - start >= budget:
+                break
+            results.append(sequence_tour(*job))
+    elif workers == 1 or len(jobs) < PARALLEL_ROUTES:
+        results = [sequence_tour(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(sequence_tour, *zip(*jobs),
+                                    chunksize=64))
+
+    saved = 0
+    for (truck, cities), (tour, gain) in zip(owners, results):
+        if gain > 0:
+            truck.routes = [cities[i] for i in tour]
+            rank = {city: r for r, city in enumerate(truck.routes)}
+            truck.parcels.sort(key=lambda p: rank[p.destiny])
+            saved += gain
+    return saved
+
+
+def sequence_tour(matrix: List[int], k: int,
+                  route: List[int]) -> Tuple[List[int], int]:
+    """Return (tour, gain), where tour is the shortest tour found through the
+    cities 0 to <k> - 1 that starts at city 0, and gain is how much shorter
+    it is than <route>.  Return (<route>, 0) if no shorter tour is found.
+
+    The distance from city i to city j is <matrix>[i * <k> + j].  Tours and
+    routes end with a return to city 0.
+
+    Precondition: <route> starts at city 0 and visits every city.
+
+    >>> sequence_tour([0, 1, 5, 5, 0, 1, 1, 5, 0], 3, [0, 2, 1])
+    ([0, 1, 2], 12)
+    >>> sequence_tour([0, 1, 5, 5, 0, 1, 1, 5, 0], 3, [0, 1, 2])
+    ([0, 1, 2], 0)
+    """
+    tour = [0]
+    left = set(range(1, k))
+    while left:
+        here = tour[-1] * k
+        city = min(left, key=lambda j: (matrix[here + j], j))
+        tour.append(city)
+        left.remove(city)
+
+    improved = True
+    while improved:
+        improved = _two_opt(matrix, k, tour)
+        improved = _or_opt(matrix, k, tour) or improved
+
+    gain = _tour_length(matrix, k, route) - _tour_length(matrix, k, tour)
+    if gain > 0:
+        return tour, gain
+    return route, 0
+
+
+# ----- Helper functions -----
+
+
+class _Stops:
+    """The stops of a truck's route, with which stop each parcel is for.
+
+    Moves are scored from these, by looking up only the legs of the route
+    next to the stop that changes, so that no candidate route is built or
+    costed as a whole.
+
+    === Private Attributes ===
+    _route:
+        The route of the truck: its depot, then the city of each run of
+        parcels going to the same city.
+    _runs:
+        _runs[s] is the number of parcels delivered at _route[s].
+    _stop:
+        _stop[i] is the index in _route of the stop for parcel i.
+    _cities:
+        The cities that the truck's parcels go to.
+    """
+    _route: List[str]
+    _runs: List[int]
+    _stop: List[int]
+    _cities: Set[str]
+
+    def __init__(self, truck: Truck) -> None:
+        """Initialize the stops of <truck>'s route from its parcels."""
+        self._route = [truck.routes[0]]
+        self._runs = [0]
+        self._stop = []
+        for parcel in truck.parcels:
+            if self._route[-1] != parcel.destiny:
+                self._route.append(parcel.destiny)
+                self._runs.append(0)
+            self._runs[-1] += 1
+            self._stop.append(len(self._route) - 1)
+        self._cities = {parcel.destiny for parcel in truck.parcels}
+
+    def removal(self, dmap: DistanceMap, i: int) -> Tuple[int, int, str]:
+        """Return (stops, distance, last): how the number of stops and the
+        distance of the route change if parcel <i> is taken off, and the last
+        city of the route after that.
+
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('York', 'Guelph', 10)
+        >>> dm.add_distance('York', 'London', 20)
+        >>> dm.add_distance('Guelph', 'London', 15)
+        >>> truck = Truck(1, 50, 'York')
+        >>> truck.pack(Parcel(1, 5, 'York', 'Guelph'))
+        True
+        >>> truck.pack(Parcel(2, 5, 'York', 'London'))
+        True
+        >>> truck.pack(Parcel(3, 5, 'York', 'Guelph'))
+        True
+        >>> _Stops(truck).removal(dm, 1)
+        (-2, -30, 'Guelph')
+        >>> _Stops(truck).removal(dm, 2)
+        (-1, -5, 'London')
+        """
+        s = self._stop[i]
+        route = self._route
+        if s == 0 or self._runs[s] > 1:
+            return 0, 0, route[-1]
+        window = route[s - 1:s + 3]
+        if s + 3 > len(route):
+            window.append(route[0])
+        stops = -1
+        if s + 1 < len(route) and route[s + 1] == route[s - 1]:
+            stops = -2
+        last = route[-1] if s + 1 < len(route) else route[s - 1]
+        return stops, _legs(dmap, window[:1] + window[2:]) - \
+            _legs(dmap, window), last
+
+    def insertion(self, dmap: DistanceMap, last: str,
+                  parcel: Parcel) -> Tuple[int, int]:
+        """Return (stops, distance): how the number of stops and the distance
+        of the route change if <parcel> is put on as in _with, once the route
+        ends at <last>.
+
+        Precondition: any parcel taken off first goes to a city other than
+        <parcel>'s.
+
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('York', 'Guelph', 10)
+        >>> dm.add_distance('York', 'London', 20)
+        >>> dm.add_distance('Guelph', 'London', 15)
+        >>> truck = Truck(1, 50, 'York')
+        >>> truck.pack(Parcel(1, 5, 'York', 'Guelph'))
+        True
+        >>> stops = _Stops(truck)
+        >>> stops.insertion(dm, 'Guelph', Parcel(2, 5, 'York', 'London'))
+        (1, 25)
+        >>> stops.insertion(dm, 'Guelph', Parcel(3, 5, 'York', 'Guelph'))
+        (0, 0)
+        """
+        city = parcel.destiny
+        if city in self._cities or city == last:
+            return 0, 0
+        depot = self._route[0]
+        return 1, _legs(dmap, [last, city, depot]) - \
+            _legs(dmap, [last, depot])
+
+    def size(self) -> int:
+        """Return the number of stops on the route, including the depot."""
+        return len(self._route)
+
+    def last(self) -> str:
+        """Return the last city of the route."""
+        return self._route[-1]
+
+
+def _relocate(trucks: List[Truck], costs: List[Tuple[int, int]],
+              dmap: DistanceMap, a: int, parcel: Parcel) -> bool:
+    """Move <parcel> from <trucks>[a] to the truck with room for it where the
+    move lowers the cost the most, and update <costs> to match.  Return
+    whether a move was made.
+
+    <costs>[t] is the cost of <trucks>[t].
+
+    >>> dm = DistanceMap()
+    >>> dm.add_distance('York', 'Guelph', 10)
+    >>> t1, t2 = Truck(1, 50, 'York'), Truck(2, 50, 'York')
+    >>> p1 = Parcel(1, 10, 'York', 'Guelph')
+    >>> p2 = Parcel(2, 10, 'York', 'Guelph')
+    >>> t1.pack(p1) and t2.pack(p2)
+    True
+    >>> costs = [(1, 20), (1, 20)]
+    >>> _relocate([t1, t2], costs, dm, 1, p2)
+    True
+    >>> [p.id for p in t1.parcels], t2.routes, costs
+    ([1, 2], ['York'], [(1, 20), (0, 0)])
+    """
+    source = trucks[a]
+    stops = _Stops(source)
+    size, distance, _ = stops.removal(dmap, _index(source.parcels, parcel))
+    source_cost = (int(stops.size() + size > 1), costs[a][1] + distance)
+    best = (0, 0)
+    choice = None
+    for b, truck in enumerate(trucks):
+        if b == a or truck.unused_space() < parcel.volume:
+            continue
+        target = _Stops(truck)
+        size, distance = target.insertion(dmap, target.last(), parcel)
+        cost = (int(target.size() + size > 1), costs[b][1] + distance)
+        delta = (source_cost[0] + cost[0] - costs[a][0] - costs[b][0],
+                 source_cost[1] + cost[1] - costs[a][1] - costs[b][1])
+        if delta < best:
+            best = delta
+            choice = (b, cost)
+    if choice is None:
+        return False
+    b, cost = choice
+    _load(source, _without(source.parcels, parcel))
+    _load(trucks[b], _with(trucks[b].parcels, parcel))
+    costs[a] = source_cost
+    costs[b] = cost
+    return True
+
+
+def _swap(trucks: List[Truck], costs: List[Tuple[int, int]],
+          dmap: DistanceMap, a: int, parcel: Parcel, deadline: float) -> bool:
+    """Exchange <parcel> on <trucks>[a] with the parcel on another truck
+    where the exchange fits and lowers the cost the most, and update <costs>
+    to match.  Stop looking once perf_counter() reaches <deadline>.  Return
+    whether a swap was made.
+
+    Each truck places the parcel it receives as in _with.
+
+    <costs>[t] is the cost of <trucks>[t].
+
+    >>> dm = DistanceMap()
+    >>> dm.add_distance('York', 'Guelph', 10)
+    >>> dm.add_distance('York', 'London', 20)
+    >>> dm.add_distance('Guelph', 'London', 15)
+    >>> t1, t2 = Truck(1, 20, 'York'), Truck(2, 20, 'York')
+    >>> p1 = Parcel(1, 15, 'York', 'Guelph')
+    >>> p2 = Parcel(2, 15, 'York', 'London')
+    >>> p3, p4 = Parcel(3, 5, 'York', 'London'), Parcel(4, 5, 'York', 'Guelph')
+    >>> t1.pack(p1) and t1.pack(p3) and t2.pack(p2) and t2.pack(p4)
+    True
+    >>> costs = [(1, 45), (1, 45)]
+    >>> _swap([t1, t2], costs, dm, 0, p3, perf_counter() + 1)
+    True
+    >>> t1.routes, t2.routes, costs
+    (['York', 'Guelph'], ['York', 'London'], [(1, 20), (1, 40)])
+    """
+    source = trucks[a]
+    space = source.unused_space() + parcel.volume
+    stops = _Stops(source)
+    size_a, distance_a, last_a = stops.removal(
+        dmap, _index(source.parcels, parcel))
+    best = (0, 0)
+    choice = None
+    for b, truck in enumerate(trucks):
+        if perf_counter() >= deadline:
+            break
+        if b == a:
+            continue
+        target = None
+        for j, other in enumerate(truck.parcels):
+            if other.volume > space or other.destiny == parcel.destiny or \
+                    parcel.volume > truck.unused_space() + other.volume:
+                continue
+            if target is None:
+                target = _Stops(truck)
+            size_b, distance_b, last_b = target.removal(dmap, j)
+            gained_b = target.insertion(dmap, last_b, parcel)
+            gained_a = stops.insertion(dmap, last_a, other)
+            cost_a = (int(stops.size() + size_a + gained_a[0] > 1),
+                      costs[a][1] + distance_a + gained_a[1])
+            cost_b = (int(target.size() + size_b + gained_b[0] > 1),
+                      costs[b][1] + distance_b + gained_b[1])
+            delta = (0, cost_a[1] + cost_b[1] - costs[a][1] - costs[b][1])
+            if delta < best:
+                best = delta
+                choice = (b, other, cost_a, cost_b)
+    if choice is None:
+        return False
+    b, other, cost_a, cost_b = choice
+    _load(source, _with(_without(source.parcels, parcel), other))
+    _load(trucks[b], _with(_without(trucks[b].parcels, other), parcel))
+    costs[a] = cost_a
+    costs[b] = cost_b
+    return True
+
+
+def _two_opt(matrix: List[int], k: int, tour: List[int]) -> bool:
+    """Shorten <tour> by reversing stretches of it, until no reversal makes it
+    shorter, and return whether it changed.
+
+    The distances are as in sequence_tour, so the cost of a stretch can
+    differ depending on the direction it is driven in.
+
+    >>> tour = [0, 2, 1, 3]
+    >>> _two_opt([0, 1, 9, 9, 1, 0, 1, 9, 9, 1, 0, 1, 1, 9, 9, 0], 4, tour)
+    True
+    >>> tour
+    [0, 1, 2, 3]
+    """
+    n = len(tour)
+    changed = False
+    improved = True
+    while improved:
+        improved = False
+        forward = [0]
+        backward = [0]
+        for m in range(n - 1):
+            a, b = tour[m], tour[m + 1]
+            forward.append(forward[-1] + matrix[a * k + b])
+            backward.append(backward[-1] + matrix[b * k + a])
+        for i in range(1, n - 1):
+            before, first = tour[i - 1], tour[i]
+            for j in range(i + 1, n):
+                last, after = tour[j], tour[(j + 1) % n]
+                delta = matrix[before * k + last] + matrix[first * k + after] \
+                    + backward[j] - backward[i] \
+                    - matrix[before * k + first] - matrix[last * k + after] \
+                    - forward[j] + forward[i]
+                if delta < 0:
+                    tour[i:j + 1] = tour[i:j + 1][::-1]
+                    improved = changed = True
+                    break
+            if improved:
+                break
+    return changed
+
+
+def _or_opt(matrix: List[int], k: int, tour: List[int]) -> bool:
+    """Shorten <tour> by moving stretches of one to three cities elsewhere in
+    it, until no move makes it shorter, and return whether it changed.
+
+    The distances are as in sequence_tour.
+
+    >>> tour = [0, 2, 1, 3]
+    >>> _or_opt([0, 1, 9, 9, 1, 0, 1, 9, 9, 1, 0, 1, 1, 9, 9, 0], 4, tour)
+    True
+    >>> tour
+    [0, 1, 2, 3]
+    """
+    n = len(tour)
+    changed = False
+    improved = True
+    while improved:
+        improved = False
+        for size in range(1, min(3, n - 2) + 1):
+            for s in range(1, n - size + 1):
+                e = s + size - 1
+                first, last = tour[s], tour[e]
+                before, after = tour[s - 1], tour[(e + 1) % n]
+                removed = matrix[before * k + first] + \
+                    matrix[last * k + after] - matrix[before * k + after]
+                for p in range(n):
+                    if s - 1 <= p <= e:
+                        continue
+                    a, b = tour[p], tour[(p + 1) % n]
+                    if matrix[a * k + first] + matrix[last * k + b] - \
+                            matrix[a * k + b] < removed:
+                        stretch = tour[s:e + 1]
+                        del tour[s:e + 1]
+                        q = tour.index(a) + 1
+                        tour[q:q] = stretch
+                        improved = changed = True
+                        break
+                if improved:
+                    break
+            if improved:
+                break
+    return changed
+
+
+def _tour_length(matrix: List[int], k: int, tour: List[int]) -> int:
+    """Return the length of <tour>, including the return to its first city,
+    with the distances as in sequence_tour.
+
+    >>> _tour_length([0, 1, 5, 5, 0, 1, 1, 5, 0], 3, [0, 2, 1])
+    15
+    """
+    n = len(tour)
+    return sum([matrix[tour[m] * k + tour[(m + 1) % n]] for m in range(n)])
+
+
+def _cost(dmap: DistanceMap, route: List[str]) -> Tuple[int, int]:
+    """Return the cost of a truck that follows <route>: whether it leaves the
+    depot, and the distance it travels.
+
+    >>> dm = DistanceMap()
+    >>> dm.add_distance('York', 'Guelph', 10)
+    >>> _cost(dm, ['York', 'Guelph']), _cost(dm, ['York'])
+    ((1, 20), (0, 0))
+    """
+    return int(len(route) > 1), dmap.route_distance(route)
+
+
+def _legs(dmap: DistanceMap, cities: List[str]) -> int:
+    """Return the distance of driving through <cities> in order, skipping
+    any city that is the same as the one before it.
+
+    >>> dm = DistanceMap()
+    >>> dm.add_distance('York', 'Guelph', 10)
+    >>> _legs(dm, ['York', 'Guelph', 'Guelph', 'York']), _legs(dm, ['York'])
+    (20, 0)
+    """
+    return sum([dmap.distance(cities[m], cities[m + 1])
+                for m in range(len(cities) - 1)
+                if cities[m] != cities[m + 1]])
+
+
+def _index(parcels: List[Parcel], parcel: Parcel) -> int:
+    """Return the index of <parcel> itself in <parcels>.
+
+    >>> p1, p2 = Parcel(1, 5, 'York', 'Guelph'), Parcel(2, 5, 'York', 'Guelph')
+    >>> _index([p1, p2], p2)
+    1
+    """
+    for i, other in enumerate(parcels):
+        if other is parcel:
+            return i
+    return -1
+
+
+def _total(costs: List[Tuple[int, int]]) -> Tuple[int, int]:
+    """Return the total of <costs>.
+
+    >>> _total([(1, 20), (0, 0), (1, 5)])
+    (2, 25)
+    """
+    return sum([cost[0] for cost in costs]), sum([cost[1] for cost in costs])
+
+
+def _route(depot: str, parcels: List[Parcel]) -> List[str]:
+    """Return the route of a truck that starts at <depot> and packs <parcels>
+    in order.
+
+    >>> _route('York', [Parcel(1, 5, 'York', 'Guelph'),
+    ...                 Parcel(2, 5, 'York', 'Guelph'),
+    ...                 Parcel(3, 5, 'York', 'London')])
+    ['York', 'Guelph', 'London']
+    """
+    route = [depot]
+    for parcel in parcels:
+        if route[-1] != parcel.destiny:
+            route.append(parcel.destiny)
+    return route
+
+
+def _without(parcels: List[Parcel], parcel: Parcel) -> List[Parcel]:
+    """Return a copy of <parcels> without <parcel>.
+
+    >>> p1, p2 = Parcel(1, 5, 'York', 'Guelph'), Parcel(2, 5, 'York', 'Guelph')
+    >>> [p.id for p in _without([p1, p2], p1)]
+    [2]
+    """
+    return [p for p in parcels if p is not parcel]
+
+
+def _with(parcels: List[Parcel], parcel: Parcel) -> List[Parcel]:
+    """Return a copy of <parcels> with <parcel> placed right after the last
+    parcel going to the same city, or at the end if there is none.
+
+    >>> p1, p2 = Parcel(1, 5, 'York', 'Guelph'), Parcel(2, 5, 'York', 'London')
+    >>> p3 = Parcel(3, 5, 'York', 'Guelph')
+    >>> [p.id for p in _with([p1, p2], p3)]
+    [1, 3, 2]
+    """
+    result = parcels[:]
+    for i in range(len(result) - 1, -1, -1):
+        if result[i].destiny == parcel.destiny:
+            result.insert(i + 1, parcel)
+            return result
+    result.append(parcel)
+    return result
+
+
+def _load(truck: Truck, parcels: List[Parcel]) -> None:
+    """Replace the parcels on <truck> with <parcels>, packed in order.
+
+    >>> truck = Truck(1, 50, 'York')
+    >>> _load(truck, [Parcel(1, 5, 'York', 'Guelph')])
+    >>> truck.routes, truck.current
+    (['York', 'Guelph'], 5)
+    """
+    truck.parcels = parcels
+    truck.routes = _route(truck.routes[0], parcels)
+    truck.current = sum([parcel.volume for parcel in parcels])
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'concurrent.futures', 'time',
+                                   'distance_map', 'domain'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
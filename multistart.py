@@ -0,0 +1,290 @@
+"""Assignment 1 - Multi-start scheduling
+
+CSC148, Winter 2021
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2021 Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+===== Module Description =====
+
+This module contains the class MultiStartScheduler, which runs another
+scheduler several times and keeps the best schedule.
+
+Each run, or "trial", has its own seed.  It seeds the random module, shuffles
+the parcels, and schedules them onto copies of the trucks.  With a random
+scheduler, each trial is a different random schedule; with a greedy
+scheduler, shuffling the parcels changes how parcels of equal priority are
+ordered, which adds a little noise to the greedy choices.  The trials run in
+parallel, in separate processes, and each is scored by an objective over the
+statistics of its schedule.  The parcels and distance map are sent to each
+process once, when it starts, rather than with every trial.  Only the best
+schedule is copied into the real trucks.
+"""
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from distance_map import DistanceMap
+from domain import Parcel, Truck, Fleet
+from scheduler import Scheduler
+
+# The default objective: schedule as many parcels as possible, then leave as
+# many trucks unused as possible, then travel as short an average distance as
+# possible.
+DEFAULT_OBJECTIVE = ('unscheduled', '-unused_trucks', 'avg_distance')
+
+# In a worker process, the scheduler, parcels and distance map shared by all
+# of the trials it runs, set once by _init_worker so that each trial only
+# sends its own seed and copy of the trucks.
+_WORKER: Dict[str, Any] = {}
+
+
+class MultiStartScheduler(Scheduler):
+    """A scheduler that keeps the best of several seeded runs of another
+    scheduler.
+
+    === Public Attributes ===
+    trial_stats:
+      The statistics of each trial of the last call to schedule, in order of
+      trial, as returned by Fleet.statistics, with the extra keys 'trial'
+      (the trial number, from 0), 'seed' and 'best' (True only for the
+      trial whose schedule was kept).
+
+    === Private Attributes ===
+    _scheduler:
+      The scheduler that each trial runs.  It must be picklable.
+    _dmap:
+      The distances used to compute the statistics of each trial.
+    _trials:
+      The number of trials.
+    _seed:
+      Trial i is seeded with <_seed> + i.
+    _workers:
+      The largest number of processes to use at once, or None to use one per
+      processor.
+    _objective:
+      The names of the statistics to minimize, in order of importance.  A
+      name that starts with '-' is maximized instead.
+
+    === Representation Invariants ===
+    - <_trials> >= 1
+    """
+    trial_stats: List[Dict[str, Union[int, float]]]
+    _scheduler: Scheduler
+    _dmap: DistanceMap
+    _trials: int
+    _seed: int
+    _workers: Optional[int]
+    _objective: Sequence[str]
+
+    def __init__(self, scheduler: Scheduler, dmap: DistanceMap,
+                 trials: int, seed: int = 0, workers: Optional[int] = None,
+                 objective: Sequence[str] = DEFAULT_OBJECTIVE) -> None:
+        """Initialize a scheduler that runs <trials> seeded trials of
+        <scheduler>, starting from <seed>, in at most <workers> processes, and
+        keeps the trial that is best by <objective>, using the distances in
+        <dmap>.
+
+        If <workers> is 1, run the trials one after another, in this process.
+
+        Precondition: <trials> >= 1, and each name in <objective>, without
+        any leading '-', is a key of the statistics of a schedule.
+        """
+        self.trial_stats = []
+        self._scheduler = scheduler
+        self._dmap = dmap
+        self._trials = trials
+        self._seed = seed
+        self._workers = workers
+        self._objective = objective
+
+    def schedule(self, parcels: List[Parcel], trucks: List[Truck],
+                 verbose: bool = False) -> List[Parcel]:
+        """Schedule the given <parcels> onto the given <trucks> with the best
+        of the trials of this scheduler, breaking ties by the earliest trial.
+
+        Mutate the Truck objects in <trucks> so that they store information
+        about which parcel objects they will deliver and what route they will
+        take.  Do *not* mutate the list <parcels>, or any of the parcel objects
+        in that list.
+
+        Return a list containing the parcels that did not get scheduled onto any
+        truck, due to lack of capacity.
+
+        If <verbose> is True, print the statistics of each trial.
+
+        >>> from scheduler import RandomScheduler
+        >>> dm = DistanceMap()
+        >>> dm.add_distance('York', 'Guelph', 10)
+        >>> dm.add_distance('York', 'London', 20)
+        >>> dm.add_distance('Guelph', 'London', 15)
+        >>> trucks = [Truck(1, 10, 'York'), Truck(2, 30, 'York')]
+        >>> parcels = [Parcel(1, 10, 'York', 'Guelph'),
+        ...            Parcel(2, 10, 'York', 'London'),
+        ...            Parcel(3, 20, 'York', 'Guelph')]
+        >>> scheduler = MultiStartScheduler(RandomScheduler(), dm, 8,
+        ...                                 workers=1)
+        >>> scheduler.schedule(parcels, trucks)
+        []
+        >>> len(scheduler.trial_stats)
+        8
+        >>> [s['unscheduled'] for s in scheduler.trial_stats if s['best']]
+        [0]
+        """
+        copies = [[truck.copy() for truck in trucks]
+                  for _ in range(self._trials)]
+        seeds = [self._seed + i for i in range(self._trials)]
+        if self._workers == 1 or self._trials == 1:
+            results = [_run_trial(self._scheduler, parcels, fleet, self._dmap,
+                                  seed) for fleet, seed in zip(copies, seeds)]
+        else:
+            with ProcessPoolExecutor(self._workers, initializer=_init_worker,
+                                     initargs=(self._scheduler, parcels,
+                                               self._dmap)) as pool:
+                results = list(pool.map(_run_worker_trial, copies, seeds))
+
+        scores = [_score(stats, self._objective) for _, _, stats in results]
+        best = scores.index(min(scores))
+        self.trial_stats = []
+        for i, (seed, (_, _, stats)) in enumerate(zip(seeds, results)):
+            self.trial_stats.append(dict(stats, trial=i, seed=seed,
+                                         best=i == best))
+            if verbose:
+                print(self.trial_stats[-1])
+
+        loads, unscheduled, _ = results[best]
+        for truck, load in zip(trucks, loads):
+            for p in load:
+                truck.pack(parcels[p])
+        return [parcels[p] for p in unscheduled]
+
+
+# ----- Helper functions -----
+
+
+def _run_trial(scheduler: Scheduler, parcels: List[Parcel],
+               trucks: List[Truck], dmap: DistanceMap, seed: int) \
+        -> Tuple[List[List[int]], List[int], Dict[str, Union[int, float]]]:
+    """Seed the random module with <seed>, shuffle <parcels>, and schedule
+    them onto <trucks> with <scheduler>.  Afterwards, put the random module
+    back in its earlier state, so that a trial run in the caller's process
+    does not change the random numbers the caller sees next.
+
+    Return (loads, unscheduled, stats), where loads[t] lists the positions in
+    <parcels> of the parcels packed into <trucks>[t], in the order they were
+    packed, unscheduled lists the positions of the parcels that did not fit,
+    and stats are the statistics of the schedule, with distances from <dmap>.
+
+    >>> from scheduler import RandomScheduler
+    >>> dm = DistanceMap()
+    >>> dm.add_distance('York', 'Guelph', 10)
+    >>> loads, unscheduled, stats = _run_trial(
+    ...     RandomScheduler(), [Parcel(1, 15, 'York', 'Guelph'),
+    ...                         Parcel(2, 20, 'York', 'Guelph')],
+    ...     [Truck(1, 30, 'York')], dm, 0)
+    >>> len(loads[0]) + len(unscheduled), stats['avg_distance']
+    (2, 20.0)
+    """
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        order = parcels[:]
+        random.shuffle(order)
+        before = [len(truck.parcels) for truck in trucks]
+        unscheduled = scheduler.schedule(order, trucks)
+    finally:
+        random.setstate(state)
+
+    stats = _statistics(trucks, dmap, len(unscheduled))
+
+    positions = {id(parcel): p for p, parcel in enumerate(parcels)}
+    loads = [[positions[id(parcel)] for parcel in truck.parcels[start:]]
+             for truck, start in zip(trucks, before)]
+    return loads, [positions[id(parcel)] for parcel in unscheduled], stats
+
+
+def _statistics(trucks: List[Truck], dmap: DistanceMap,
+                unscheduled: int) -> Dict[str, Union[int, float]]:
+    """Return the statistics of the schedule on <trucks>, as Fleet.statistics
+    does, given the distances in <dmap> and the number of parcels that could
+    not be scheduled, <unscheduled>.
+
+    If no truck carries a parcel, Fleet.statistics has no averages to give,
+    so the average distance and fullness are 0.
+
+    >>> dm = DistanceMap()
+    >>> stats = _statistics([Truck(1, 10, 'York')], dm, 1)
+    >>> stats['unused_trucks'], stats['avg_distance'], stats['avg_fullness']
+    (1, 0.0, 0.0)
+    """
+    fleet = Fleet()
+    for truck in trucks:
+        fleet.add_truck(truck)
+    if fleet.num_nonempty_trucks() > 0:
+        return fleet.statistics(dmap, unscheduled)
+    return {
+        'fleet': fleet.num_trucks(),
+        'unused_trucks': fleet.num_trucks(),
+        'avg_distance': 0.0,
+        'avg_fullness': 0.0,
+        'unused_space': fleet.total_unused_space(),
+        'unscheduled': unscheduled
+    }
+
+
+def _init_worker(scheduler: Scheduler, parcels: List[Parcel],
+                 dmap: DistanceMap) -> None:
+    """Store <scheduler>, <parcels> and <dmap> for the trials run by this
+    worker process.
+    """
+    _WORKER['scheduler'] = scheduler
+    _WORKER['parcels'] = parcels
+    _WORKER['dmap'] = dmap
+
+
+def _run_worker_trial(trucks: List[Truck], seed: int) \
+        -> Tuple[List[List[int]], List[int], Dict[str, Union[int, float]]]:
+    """Run a trial with <trucks> and <seed>, as in _run_trial, using the
+    scheduler, parcels and distance map stored by _init_worker.
+    """
+    return _run_trial(_WORKER['scheduler'], _WORKER['parcels'], trucks,
+                      _WORKER['dmap'], seed)
+
+
+def _score(stats: Dict[str, Union[int, float]],
+           objective: Sequence[str]) -> Tuple[Union[int, float], ...]:
+    """Return the score of a schedule with <stats> under <objective>, where a
+    lower score is better.
+
+    >>> stats = {'unscheduled': 2, 'unused_trucks': 3, 'avg_distance': 9.5}
+    >>> _score(stats, DEFAULT_OBJECTIVE)
+    (2, -3, 9.5)
+    """
+    return tuple(-stats[name[1:]] if name.startswith('-') else stats[name]
+                 for name in objective)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'random', 'concurrent.futures',
+                                   'distance_map', 'domain', 'scheduler'],
+        'allowed-io': ['MultiStartScheduler.schedule'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
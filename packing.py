@@ -0,0 +1,345 @@
+"""Assignment 1 - Bin packing schedulers
+
+CSC148, Winter 2021
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2021 Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+===== Module Description =====
+
+This module contains schedulers that treat scheduling as bin packing: each
+truck is a bin, and each parcel is an item whose size is its volume.
+Destinations are not considered.
+
+- FirstFitScheduler puts each parcel onto the first truck in the fleet with
+  enough unused space.
+- BestFitScheduler puts each parcel onto the truck with the least unused space
+  that is still enough, breaking ties by the truck's position in the fleet.
+
+Both take the parcels in the order given, or, in their "decreasing" variants
+(First-Fit-Decreasing and Best-Fit-Decreasing), from the largest volume to
+the smallest.  Each keeps an index of the unused space of the trucks so that
+finding the truck for a parcel, and updating the index after packing it,
+takes O(log T) time for T trucks: a segment tree for First-Fit, and a
+balanced search tree for Best-Fit (O(log T) expected time).
+"""
+from random import Random
+from typing import List, Tuple
+from domain import Parcel, Truck
+from scheduler import Scheduler
+
+
+class FirstFitScheduler(Scheduler):
+    """A scheduler that puts each parcel onto the first truck with room for it.
+
+    === Private Attributes ===
+    _decreasing:
+      If True, schedule the parcels from the largest volume to the smallest.
+      Otherwise, schedule them in the order given.
+    """
+    _decreasing: bool
+
+    def __init__(self, decreasing: bool = False) -> None:
+        """Initialize a First-Fit scheduler, or a First-Fit-Decreasing
+        scheduler if <decreasing> is True.
+        """
+        self._decreasing = decreasing
+
+    def schedule(self, parcels: List[Parcel], trucks: List[Truck],
+                 verbose: bool = False) -> List[Parcel]:
+        """Schedule each of the given <parcels> onto the first truck in
+        <trucks> with enough unused space for it.
+
+        Mutate the Truck objects in <trucks> so that they store information
+        about which parcel objects they will deliver and what route they will
+        take.  Do *not* mutate the list <parcels>, or any of the parcel objects
+        in that list.
+
+        Return a list containing the parcels that did not get scheduled onto any
+        truck, due to lack of capacity.
+
+        <verbose> is ignored.
+
+        >>> parcels = [Parcel(1, 5, 'York', 'Guelph'),
+        ...            Parcel(2, 10, 'York', 'London'),
+        ...            Parcel(3, 15, 'York', 'Guelph'),
+        ...            Parcel(4, 10, 'York', 'London')]
+        >>> trucks = [Truck(1, 20, 'York'), Truck(2, 20, 'York')]
+        >>> [p.id for p in FirstFitScheduler().schedule(parcels, trucks)]
+        [4]
+        >>> trucks = [Truck(1, 20, 'York'), Truck(2, 20, 'York')]
+        >>> [p.id for p in FirstFitScheduler(True).schedule(parcels, trucks)]
+        []
+        >>> [[p.id for p in truck.parcels] for truck in trucks]
+        [[3, 1], [2, 4]]
+        """
+        tree = _SpaceTree([truck.unused_space() for truck in trucks])
+        unscheduled = []
+        for parcel in _ordered(parcels, self._decreasing):
+            t = tree.first_fit(parcel.volume)
+            if t == -1:
+                unscheduled.append(parcel)
+            else:
+                trucks[t].pack(parcel)
+                tree.set(t, trucks[t].unused_space())
+        return unscheduled
+
+
+class BestFitScheduler(Scheduler):
+    """A scheduler that puts each parcel onto the fullest truck with room
+    for it.
+
+    === Private Attributes ===
+    _decreasing:
+      If True, schedule the parcels from the largest volume to the smallest.
+      Otherwise, schedule them in the order given.
+    """
+    _decreasing: bool
+
+    def __init__(self, decreasing: bool = False) -> None:
+        """Initialize a Best-Fit scheduler, or a Best-Fit-Decreasing scheduler
+        if <decreasing> is True.
+        """
+        self._decreasing = decreasing
+
+    def schedule(self, parcels: List[Parcel], trucks: List[Truck],
+                 verbose: bool = False) -> List[Parcel]:
+        """Schedule each of the given <parcels> onto the truck in <trucks> with
+        the least unused space that is enough for it, breaking ties by
+        position in <trucks>.
+
+        Mutate the Truck objects in <trucks> so that they store information
+        about which parcel objects they will deliver and what route they will
+        take.  Do *not* mutate the list <parcels>, or any of the parcel objects
+        in that list.
+
+        Return a list containing the parcels that did not get scheduled onto any
+        truck, due to lack of capacity.
+
+        <verbose> is ignored.
+
+        >>> parcels = [Parcel(1, 10, 'York', 'Guelph'),
+        ...            Parcel(2, 15, 'York', 'London'),
+        ...            Parcel(3, 5, 'York', 'Guelph')]
+        >>> trucks = [Truck(1, 30, 'York'), Truck(2, 20, 'York')]
+        >>> [p.id for p in BestFitScheduler().schedule(parcels, trucks)]
+        []
+        >>> [[p.id for p in truck.parcels] for truck in trucks]
+        [[2], [1, 3]]
+        """
+        tree = _SpaceTreap([truck.unused_space() for truck in trucks])
+        unscheduled = []
+        for parcel in _ordered(parcels, self._decreasing):
+            t = tree.best_fit(parcel.volume)
+            if t == -1:
+                unscheduled.append(parcel)
+            else:
+                trucks[t].pack(parcel)
+                tree.set(t, trucks[t].unused_space())
+        return unscheduled
+
+
+class _SpaceTree:
+    """A segment tree over the unused space of a list of trucks, which finds
+    the first truck with at least a given amount of unused space.
+
+    === Private Attributes ===
+    _size:
+      The number of leaves, a power of two that is at least the number of
+      trucks.
+    _tree:
+      The tree, stored as a list.  <_tree>[_size + t] is the unused space of
+      truck t, or -1 past the last truck, and <_tree>[i] is the larger of
+      <_tree>[2 * i] and <_tree>[2 * i + 1] for 1 <= i < <_size>.
+    """
+    _size: int
+    _tree: List[int]
+
+    def __init__(self, spaces: List[int]) -> None:
+        """Initialize a tree in which truck t has <spaces>[t] unused space."""
+        size = 1
+        while size < len(spaces):
+            size *= 2
+        self._size = size
+        self._tree = [-1] * size + spaces + [-1] * (size - len(spaces))
+        for i in range(size - 1, 0, -1):
+            self._tree[i] = max(self._tree[2 * i], self._tree[2 * i + 1])
+
+    def set(self, t: int, space: int) -> None:
+        """Record that truck <t> has <space> unused space."""
+        i = self._size + t
+        tree = self._tree
+        tree[i] = space
+        i //= 2
+        while i:
+            tree[i] = max(tree[2 * i], tree[2 * i + 1])
+            i //= 2
+
+    def first_fit(self, volume: int) -> int:
+        """Return the position of the first truck with at least <volume> unused
+        space, or -1 if there is none.
+
+        >>> tree = _SpaceTree([5, 20, 10])
+        >>> tree.first_fit(8), tree.first_fit(15), tree.first_fit(25)
+        (1, 1, -1)
+        >>> tree.set(1, 0)
+        >>> tree.first_fit(8)
+        2
+        """
+        tree = self._tree
+        if tree[1] < volume:
+            return -1
+        i = 1
+        while i < self._size:
+            i *= 2
+            if tree[i] < volume:
+                i += 1
+        return i - self._size
+
+
+class _SpaceTreap:
+    """A balanced binary search tree (a treap) of trucks, ordered by
+    (unused space, position), which finds the truck with the least unused
+    space that is at least a given amount.
+
+    Each truck is a node, numbered by its position.  Nodes are kept in
+    search-tree order by their keys and in heap order by their priorities,
+    which are random, so the tree has O(log T) expected depth for T trucks,
+    and every operation takes O(log T) expected time.  The priorities come
+    from a private random generator, so the global random module is not
+    used.
+
+    === Private Attributes ===
+    _spaces:
+      The unused space of each truck.  The key of node t is
+      (<_spaces>[t], t).
+    _priorities:
+      The priority of each node.  No node has a higher priority than its
+      parent.
+    _left, _right:
+      The left and right child of each node, or -1 for none.
+    _root:
+      The root node, or -1 if the tree is empty.
+    """
+    _spaces: List[int]
+    _priorities: List[float]
+    _left: List[int]
+    _right: List[int]
+    _root: int
+
+    def __init__(self, spaces: List[int]) -> None:
+        """Initialize a tree in which truck t has <spaces>[t] unused space."""
+        rng = Random(0)
+        self._spaces = spaces[:]
+        self._priorities = [rng.random() for _ in spaces]
+        self._left = [-1] * len(spaces)
+        self._right = [-1] * len(spaces)
+        self._root = -1
+        for t in range(len(spaces)):
+            self._insert(t)
+
+    def set(self, t: int, space: int) -> None:
+        """Record that truck <t> has <space> unused space."""
+        below, rest = self._split(self._root, (self._spaces[t], t))
+        _, above = self._split(rest, (self._spaces[t], t + 1))
+        self._root = self._merge(below, above)
+        self._spaces[t] = space
+        self._insert(t)
+
+    def best_fit(self, volume: int) -> int:
+        """Return the position of the truck with the least unused space that
+        is at least <volume>, breaking ties by position, or -1 if there is
+        none.
+
+        >>> tree = _SpaceTreap([20, 10, 30, 10])
+        >>> tree.best_fit(8), tree.best_fit(15), tree.best_fit(35)
+        (1, 0, -1)
+        >>> tree.set(1, 5)
+        >>> tree.best_fit(8)
+        3
+        """
+        node = self._root
+        best = -1
+        while node != -1:
+            if self._spaces[node] >= volume:
+                best = node
+                node = self._left[node]
+            else:
+                node = self._right[node]
+        return best
+
+    def _insert(self, t: int) -> None:
+        """Insert node <t>, which is not in the tree, with no children."""
+        self._left[t] = self._right[t] = -1
+        below, above = self._split(self._root, (self._spaces[t], t))
+        self._root = self._merge(self._merge(below, t), above)
+
+    def _split(self, node: int, key: Tuple[int, int]) -> Tuple[int, int]:
+        """Split the subtree rooted at <node> into a tree of the nodes whose
+        keys are less than <key> and a tree of the rest, and return their
+        roots.
+        """
+        if node == -1:
+            return -1, -1
+        if (self._spaces[node], node) < key:
+            below, above = self._split(self._right[node], key)
+            self._right[node] = below
+            return node, above
+        below, above = self._split(self._left[node], key)
+        self._left[node] = above
+        return below, node
+
+    def _merge(self, below: int, above: int) -> int:
+        """Merge the subtrees rooted at <below> and <above>, where every key
+        in <below> is less than every key in <above>, and return the root.
+        """
+        if below == -1:
+            return above
+        if above == -1:
+            return below
+        if self._priorities[below] > self._priorities[above]:
+            self._right[below] = self._merge(self._right[below], above)
+            return below
+        self._left[above] = self._merge(below, self._left[above])
+        return above
+
+
+def _ordered(parcels: List[Parcel], decreasing: bool) -> List[Parcel]:
+    """Return <parcels> from the largest volume to the smallest if <decreasing>
+    is True, keeping parcels of equal volume in order, or else return
+    <parcels> unchanged.
+
+    >>> parcels = [Parcel(1, 5, 'York', 'Guelph'),
+    ...            Parcel(2, 9, 'York', 'Guelph'),
+    ...            Parcel(3, 5, 'York', 'Guelph')]
+    >>> [p.id for p in _ordered(parcels, True)]
+    [2, 1, 3]
+    """
+    if decreasing:
+        return sorted(parcels, key=lambda p: p.volume, reverse=True)
+    return parcels
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'random', 'domain', 'scheduler'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
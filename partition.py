@@ -0,0 +1,262 @@
+"""Assignment 1 - Partitioned scheduling
+
+CSC148, Winter 2021
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2021 Diane Horton, Ian Berlott-Atwell, Jonathan Calver,
+Sophia Huynh, Maryam Majedi, and Jaisie Sin.
+
+===== Module Description =====
+
+This module contains the class PartitionedScheduler, which splits a
+scheduling problem into independent groups and schedules the groups in
+parallel, each in its own process.
+
+The parcels are grouped by a partition function (by default, their
+destination), and the trucks are shared out between the groups in proportion
+to the volume of parcels in each group.  Each group is then scheduled by its
+own copy of another scheduler, in a separate process.  The processes send
+back which parcels went onto which trucks, and the parcels are packed onto
+the caller's trucks in the same order.  Finally, the parcels that did not fit
+in their own group get one more chance, on any truck with room left.
+"""
+import random
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heapify, heapreplace
+from typing import Callable, Hashable, List, Optional, Tuple
+from domain import Parcel, Truck
+from scheduler import Scheduler
+
+
+class PartitionedScheduler(Scheduler):
+    """A scheduler that schedules independent groups of parcels in parallel.
+
+    === Private Attributes ===
+    _scheduler:
+      The scheduler used for each group, and for the parcels left over at
+      the end.  It must be picklable.
+    _partition:
+      The function that gives the group of a parcel.
+    _workers:
+      The largest number of processes to use at once, or None to use one per
+      processor.
+    _seed:
+      If not None, the seed of the random module for each group, so that the
+      same input always gets the same schedule.  Group number i (counting
+      from 0, in order of the first parcel in each group) is seeded with
+      <_seed> + i, and the leftover pass with <_seed> + the number of groups.
+      The caller's state of the random module is restored afterwards.
+
+    === Representation Invariants ===
+    - <_workers> is None or at least 1.
+    """
+    _scheduler: Scheduler
+    _partition: Callable[[Parcel], Hashable]
+    _workers: Optional[int]
+    _seed: Optional[int]
+
+    def __init__(self, scheduler: Scheduler,
+                 partition: Optional[Callable[[Parcel], Hashable]] = None,
+                 workers: Optional[int] = None,
+                 seed: Optional[int] = None) -> None:
+        """Initialize a PartitionedScheduler that schedules each group with
+        <scheduler>, groups parcels with <partition> (by destination if it is
+        None), and runs at most <workers> processes at once.
+
+        If <seed> is not None, seed the random module of each group from it,
+        so the schedule is reproducible.
+
+        Precondition: <workers> is None or at least 1.
+        """
+        self._scheduler = scheduler
+        self._partition = _destination if partition is None else partition
+        self._workers = workers
+        self._seed = seed
+
+    def schedule(self, parcels: List[Parcel], trucks: List[Truck],
+                 verbose: bool = False) -> List[Parcel]:
+        """Schedule the given <parcels> onto the given <trucks>, one group of
+        parcels at a time, with the groups running in parallel.
+
+        Mutate the Truck objects in <trucks> so that they store information
+        about which parcel objects they will deliver and what route they will
+        take.  Do *not* mutate the list <parcels>, or any of the parcel objects
+        in that list.
+
+        Return a list containing the parcels that did not get scheduled onto any
+        truck, due to lack of capacity.
+
+        If <verbose> is True, print step-by-step details regarding
+        the scheduling algorithm as it runs.
+
+        >>> from scheduler import GreedyScheduler
+        >>> config = {'parcel_priority': 'volume',
+        ...           'parcel_order': 'non-increasing',
+        ...           'truck_order': 'non-decreasing'}
+        >>> scheduler = PartitionedScheduler(GreedyScheduler(config),
+        ...                                  workers=1)
+        >>> trucks = [Truck(1, 30, 'York'), Truck(2, 20, 'York')]
+        >>> parcels = [Parcel(1, 15, 'York', 'Guelph'),
+        ...            Parcel(2, 20, 'York', 'London'),
+        ...            Parcel(3, 10, 'York', 'Guelph')]
+        >>> scheduler.schedule(parcels, trucks)
+        []
+        >>> [truck.routes for truck in trucks]
+        [['York', 'Guelph'], ['York', 'London']]
+        """
+        groups = {}
+        for parcel in parcels:
+            groups.setdefault(self._partition(parcel), []).append(parcel)
+        groups = list(groups.values())
+        shares = _share_trucks(trucks, [sum([parcel.volume for parcel in group])
+                                        for group in groups])
+        seeds = [None if self._seed is None else self._seed + g
+                 for g in range(len(groups))]
+        jobs = list(zip([self._scheduler] * len(groups), groups,
+                        [[trucks[t].copy() for t in share] for share in shares],
+                        seeds))
+        if verbose:
+            print(f'Scheduling {len(groups)} groups of parcels')
+
+        if self._workers == 1 or len(groups) <= 1:
+            results = [_schedule_group(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(self._workers) as pool:
+                results = list(pool.map(_schedule_group, *zip(*jobs)))
+
+        leftover = []
+        for group, share, (loads, unscheduled) in zip(groups, shares, results):
+            for t, load in zip(share, loads):
+                for p in load:
+                    trucks[t].pack(group[p])
+            leftover.extend([group[p] for p in unscheduled])
+
+        if not leftover:
+            return []
+        if verbose:
+            print(f'Scheduling {len(leftover)} leftover parcels')
+        seed = None if self._seed is None else self._seed + len(groups)
+        return _seeded_schedule(self._scheduler, leftover, trucks, seed,
+                                verbose)
+
+
+# ----- Helper functions -----
+
+
+def _schedule_group(scheduler: Scheduler, parcels: List[Parcel],
+                    trucks: List[Truck], seed: Optional[int]) \
+        -> Tuple[List[List[int]], List[int]]:
+    """Schedule <parcels> onto <trucks> with <scheduler>, with the random
+    module seeded with <seed> if it is not None, as in _seeded_schedule.
+
+    Return (loads, unscheduled), where loads[t] lists the positions in
+    <parcels> of the parcels packed into <trucks>[t], in the order they were
+    packed, and unscheduled lists the positions of the parcels that did not
+    fit.
+
+    >>> from scheduler import RandomScheduler
+    >>> _schedule_group(RandomScheduler(),
+    ...                 [Parcel(1, 15, 'York', 'Guelph'),
+    ...                  Parcel(2, 20, 'York', 'London')],
+    ...                 [Truck(1, 30, 'York')], 0)
+    ([[0]], [1])
+    """
+    before = [len(truck.parcels) for truck in trucks]
+    positions = {id(parcel): p for p, parcel in enumerate(parcels)}
+    unscheduled = _seeded_schedule(scheduler, parcels, trucks, seed)
+    loads = [[positions[id(parcel)] for parcel in truck.parcels[start:]]
+             for truck, start in zip(trucks, before)]
+    return loads, [positions[id(parcel)] for parcel in unscheduled]
+
+
+def _seeded_schedule(scheduler: Scheduler, parcels: List[Parcel],
+                     trucks: List[Truck], seed: Optional[int],
+                     verbose: bool = False) -> List[Parcel]:
+    """Schedule <parcels> onto <trucks> with <scheduler>, and return the
+    parcels that did not fit.
+
+    If <seed> is not None, seed the random module with it first, and put the
+    random module back in its earlier state afterwards, so that scheduling
+    does not change the random numbers that the caller sees next.
+
+    >>> from scheduler import RandomScheduler
+    >>> random.seed(1)
+    >>> state = random.getstate()
+    >>> _seeded_schedule(RandomScheduler(), [Parcel(1, 15, 'York', 'Guelph')],
+    ...                  [Truck(1, 30, 'York'), Truck(2, 30, 'York')], 0)
+    []
+    >>> random.getstate() == state
+    True
+    """
+    if seed is None:
+        return scheduler.schedule(parcels, trucks, verbose)
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        return scheduler.schedule(parcels, trucks, verbose)
+    finally:
+        random.setstate(state)
+
+
+def _share_trucks(trucks: List[Truck], volumes: List[int]) -> List[List[int]]:
+    """Share out <trucks> between groups of parcels with total volumes
+    <volumes>, and return the positions of the trucks given to each group.
+
+    Trucks are given out from the most unused space to the least, each to the
+    group whose volume is furthest from being covered by the trucks it
+    already has, with ties going to the earlier group.
+
+    >>> trucks = [Truck(1, 10, 'York'), Truck(2, 30, 'York'),
+    ...           Truck(3, 20, 'York')]
+    >>> _share_trucks(trucks, [25, 20])
+    [[1], [2, 0]]
+    >>> _share_trucks(trucks, [])
+    []
+    """
+    shares = [[] for _ in volumes]
+    if not volumes:
+        return shares
+    needs = [(-volume, g) for g, volume in enumerate(volumes)]
+    heapify(needs)
+    order = sorted(range(len(trucks)),
+                   key=lambda t: trucks[t].unused_space(), reverse=True)
+    for t in order:
+        need, g = needs[0]
+        shares[g].append(t)
+        heapreplace(needs, (need + trucks[t].unused_space(), g))
+    return shares
+
+
+def _destination(parcel: Parcel) -> str:
+    """Return the destination of <parcel>, its group by default.
+
+    >>> _destination(Parcel(1, 5, 'York', 'Guelph'))
+    'Guelph'
+    """
+    return parcel.destiny
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod()
+
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': ['doctest', 'python_ta', 'typing',
+                                   'random', 'concurrent.futures', 'heapq',
+                                   'domain', 'scheduler'],
+        'allowed-io': ['PartitionedScheduler.schedule'],
+        'disable': ['E1136'],
+        'max-attributes': 15,
+    })
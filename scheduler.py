@@ -21,9 +21,11 @@ This module contains the abstract Scheduler class, as well as the two
 subclasses RandomScheduler and GreedyScheduler, which implement the two
 scheduling algorithms described in the handout.
 """
-from typing import List, Dict, Union
+from bisect import bisect_left, insort
+from typing import Callable, List, Dict, Hashable, Optional, \
+    Tuple, Union
 from random import shuffle, choice
-from container import PriorityQueue
+from container import Container, BucketQueue
 from domain import Parcel, Truck
 
 
@@ -56,6 +58,166 @@ class Scheduler:
         """
         raise NotImplementedError
 
+    def session(self, trucks: List[Truck]) -> 'SchedulingSession':
+        """Return a new session that schedules parcels onto <trucks> as they
+        arrive, in the same way as this scheduler.
+
+        Not every scheduler supports sessions.
+        """
+        raise NotImplementedError
+
+
+class SchedulingSession:
+    """A session that schedules parcels onto a fixed list of trucks as the
+    parcels arrive, rather than all at once.
+
+    A session keeps what it knows about the trucks between submissions, so
+    each submission only costs as much as scheduling the new parcels.  Only
+    the session should pack parcels into its trucks while it is in use.
+
+    This is an abstract class.  Only child classes should be instantiated.
+
+    === Private Attributes ===
+    _index:
+      An index of the trucks that parcels are scheduled onto.
+    """
+    _index: '_TruckIndex'
+
+    def __init__(self, trucks: List[Truck]) -> None:
+        """Initialize a session that schedules parcels onto <trucks>."""
+        self._index = _TruckIndex(trucks)
+
+    def submit(self, parcel: Parcel) -> bool:
+        """Schedule <parcel> onto one of the trucks of this session.  Return
+        True iff it was scheduled, and False if no truck had enough space.
+        """
+        raise NotImplementedError
+
+    def submit_many(self, parcels: List[Parcel]) -> List[Parcel]:
+        """Schedule the given <parcels> onto the trucks of this session, in the
+        way that the session's scheduler would schedule them all at once.  Do
+        not mutate the list <parcels>.
+
+        Return a list containing the parcels that did not get scheduled onto
+        any truck, due to lack of capacity.
+        """
+        raise NotImplementedError
+
+
+class RandomSession(SchedulingSession):
+    """A session that schedules each parcel onto a truck chosen at random, as
+    RandomScheduler does.
+    """
+
+    def submit(self, parcel: Parcel) -> bool:
+        """Schedule <parcel> onto a randomly chosen truck that has enough space
+        for it.  Return True iff it was scheduled, and False if no truck had
+        enough space.
+
+        >>> session = RandomScheduler().session([Truck(1, 20, 'York')])
+        >>> session.submit(Parcel(1, 15, 'York', 'Guelph'))
+        True
+        >>> session.submit(Parcel(2, 15, 'York', 'Guelph'))
+        False
+        """
+        truck = self._index.random_fit(parcel.volume)
+        return truck is not None and self._index.pack(truck, parcel)
+
+    def submit_many(self, parcels: List[Parcel]) -> List[Parcel]:
+        """Schedule the given <parcels> onto the trucks of this session, in
+        random order, onto randomly chosen trucks.  Do not mutate the list
+        <parcels>.
+
+        Return a list containing the parcels that did not get scheduled onto
+        any truck, due to lack of capacity.
+        """
+        parcels = parcels[:]
+        shuffle(parcels)
+        return [parcel for parcel in parcels if not self.submit(parcel)]
+
+
+class GreedySession(SchedulingSession):
+    """A session that schedules parcels onto the "best" truck for each, as
+    GreedyScheduler does.
+
+    === Private Attributes ===
+    _queue:
+      The priority queue that orders the parcels of each submit_many call by
+      volume, or None if parcels are ordered by destination.
+    _reverse:
+      True iff parcels are taken from the largest priority to the smallest.
+    _find:
+      The method of <_index> that finds the best truck for a parcel.
+    """
+    _queue: Optional[Container]
+    _reverse: bool
+    _find: Callable[[int, Optional[str]], Optional[Truck]]
+
+    def __init__(self, trucks: List[Truck], priority: str, parcel_order: str,
+                 truck_order: str) -> None:
+        """Initialize a session that schedules parcels onto <trucks>, with the
+        <priority>, <parcel_order> and <truck_order> of a GreedyScheduler.
+        """
+        SchedulingSession.__init__(self, trucks)
+        self._queue = None
+        if priority == 'volume':
+            self._queue = _choose(parcel_order)
+        self._reverse = parcel_order == 'non-increasing'
+        if truck_order == 'non-decreasing':
+            self._find = self._index.smallest_fit
+        else:
+            self._find = self._index.largest_fit
+
+    def submit(self, parcel: Parcel) -> bool:
+        """Schedule <parcel> onto the best truck for it.  Return True iff it
+        was scheduled, and False if no truck had enough space.
+
+        >>> config = {'parcel_priority': 'volume',
+        ...           'parcel_order': 'non-increasing',
+        ...           'truck_order': 'non-decreasing'}
+        >>> trucks = [Truck(1, 30, 'York'), Truck(2, 20, 'York')]
+        >>> session = GreedyScheduler(config).session(trucks)
+        >>> session.submit(Parcel(1, 15, 'York', 'Guelph'))
+        True
+        >>> [len(truck.parcels) for truck in trucks]
+        [0, 1]
+        >>> session.submit(Parcel(2, 5, 'York', 'Guelph'))
+        True
+        >>> [len(truck.parcels) for truck in trucks]
+        [0, 2]
+        """
+        # Prefer trucks that have the parcel’s destination at the end of
+        # their route.
+        truck = self._find(parcel.volume, parcel.destiny)
+        if truck is None:
+            truck = self._find(parcel.volume)
+        return truck is not None and self._index.pack(truck, parcel)
+
+    def submit_many(self, parcels: List[Parcel]) -> List[Parcel]:
+        """Schedule the given <parcels> onto the trucks of this session, one at
+        a time in priority order, picking the best truck for each.  Do not
+        mutate the list <parcels>.
+
+        Return a list containing the parcels that did not get scheduled onto
+        any truck, due to lack of capacity.
+
+        Parcels ordered by destination are sorted once, by a stable sort,
+        rather than pushed through a priority queue that compares their
+        destinations at every step; the order is the same, with ties in the
+        order given.
+        """
+        if self._queue is None:
+            return [parcel for parcel in sorted(parcels, key=_destination,
+                                                reverse=self._reverse)
+                    if not self.submit(parcel)]
+        unscheduled = []
+        _add_queue(parcels, self._queue)
+        while not self._queue.is_empty():
+            parcel = self._queue.remove()
+            if not self.submit(parcel):
+                unscheduled.append(parcel)
+        return unscheduled
+
 
 class RandomScheduler(Scheduler):
     """A random scheduler, randomly decide what parcels go onto which trucks.
@@ -93,19 +255,16 @@ class RandomScheduler(Scheduler):
         set to True.
         """
         self._parcels = parcels[:]
-        unscheduled = []
         shuffle(self._parcels)
-        for parcel in self._parcels:
-            va_trucks = []  # a list of all trucks that have the capacity
-            for truck in trucks:
-                if truck.unused_space() >= parcel.volume:
-                    va_trucks.append(truck)
-            if len(va_trucks) == 0:
-                unscheduled.append(parcel)
-            else:
-                choice(va_trucks).pack(parcel)
+        session = self.session(trucks)
+        return [parcel for parcel in self._parcels
+                if not session.submit(parcel)]
 
-        return unscheduled
+    def session(self, trucks: List[Truck]) -> RandomSession:
+        """Return a new session that schedules parcels onto <trucks> as they
+        arrive, in the same way as this scheduler.
+        """
+        return RandomSession(trucks)
 
 
 class GreedyScheduler(Scheduler):
@@ -158,102 +317,263 @@ class GreedyScheduler(Scheduler):
         information is your choice; we will not test your code with <verbose>
         set to True.
         """
-        unscheduled = []
-        pq = _choose(self._priority, self._par)
-        _add_queue(parcels, pq)
-        while not pq.is_empty():
-            parcel = pq.remove()
-            va_truck = []  # a list of all trucks that have the capacity
-            bt_truck = []  # a list of trucks that have capacity and have
-            # the parcel’s destination at the end of their route
-            _mutates_lists(parcel, trucks, va_truck, bt_truck)  # Call helper
-
-            if len(va_truck) == 0:
-                unscheduled.append(parcel)
-            elif len(bt_truck) == 0:
-                use_truck = va_truck
-                temp = _find_best_truck(use_truck, self._trk)
-                temp.pack(parcel)
-            else:
-                use_truck = bt_truck
-                temp = _find_best_truck(use_truck, self._trk)
-                temp.pack(parcel)
-        return unscheduled
+        return self.session(trucks).submit_many(parcels)
+
+    def session(self, trucks: List[Truck]) -> GreedySession:
+        """Return a new session that schedules parcels onto <trucks> as they
+        arrive, in the same way as this scheduler.
+
+        Submitting parcels one at a time to the session, in the order that
+        this scheduler's priority queue would remove them, schedules them
+        exactly as <schedule> would.
+        """
+        return GreedySession(trucks, self._priority, self._par, self._trk)
 
 
 # ----- Helper functions -----
 
 
-def _find_best_truck(trucks: List[Truck], order: str) -> Truck:
-    """Return the 'best' Truck in <trucks> that satisfies <order>."""
-    temp = trucks[0]
-    if order == 'non-decreasing':
-        for truck in trucks:
-            if truck.unused_space() < temp.unused_space():
-                temp = truck
-    else:
-        for truck in trucks:
-            if truck.unused_space() > temp.unused_space():
-                temp = truck
-    return temp
-
-
-def _mutates_lists(p: Parcel, trucks: List[Truck], va: List, bt: List) -> None:
-    """Mutates <va> and <bt> with correspondence with <p> and <trucks>."""
-    for truck in trucks:
-        if truck.unused_space() >= p.volume \
-                and truck.routes[-1] == p.destiny:
-            va.append(truck)
-            bt.append(truck)
-        elif truck.unused_space() >= p.volume:
-            va.append(truck)
-
-
-def _add_queue(parcels: List[Parcel], priority_q: PriorityQueue) -> None:
-    """add <parcels> to <priority>. Implemented only for GreedyScheduler
-    schedule method."""
-    for parcel in parcels:
-        priority_q.add(parcel)
+class SpaceIndex:
+    """An index of bins, such as trucks, ordered by their unused space, which
+    finds the bin with the least or the most unused space that can still hold
+    an item in O(log T) time for T bins, either among all bins or among the
+    bins with a given end, such as the last city on a truck's route.  It can
+    also pick a random bin that can hold an item in O(log T) time.
 
+    Bins are known by their position, from 0, and bins with the same unused
+    space are ordered by position, so that ties go to the bin that comes
+    first.
 
-def _choose(priority: str, order: str) -> PriorityQueue:
-    """Return a PriorityQueue in regards with the parcel priority and
-    parcel order.
+    === Public Attributes ===
+    spaces:
+      The unused space of each bin.
+    ends:
+      The end of each bin.
+
+    === Private Attributes ===
+    _by_space:
+      A sorted list of (unused space, position) for every bin.
+    _by_end:
+      A dictionary that maps each end to a sorted list of
+      (unused space, position) for every bin with that end.
 
-    precondition: <priority> is either 'volume' or 'destination'
-                  <order> is either 'non-decreasing' or 'non-increasing'
+    === Representation Invariants ===
+    - <spaces> and <ends> only change through <move>.
     """
-    if priority == 'volume' and order == 'non-decreasing':
-        return PriorityQueue(_incr_volume)
-    if priority == 'volume' and order == 'non-increasing':
-        return PriorityQueue(_decr_volume)
-    if priority == 'destination' and order == 'non-decreasing':
-        return PriorityQueue(_incr_dest)
+    spaces: List[int]
+    ends: List[Hashable]
+    _by_space: List[Tuple[int, int]]
+    _by_end: Dict[Hashable, List[Tuple[int, int]]]
 
-    return PriorityQueue(_decr_dest)
+    def __init__(self, spaces: List[int], ends: List[Hashable]) -> None:
+        """Initialize an index of bins where bin i has <spaces>[i] unused space
+        and end <ends>[i].  The index keeps <spaces> and <ends> up to date.
 
+        Precondition: len(<spaces>) == len(<ends>)
+        """
+        self.spaces = spaces
+        self.ends = ends
+        self._by_space = sorted((space, i) for i, space in enumerate(spaces))
+        self._by_end = {}
+        for space, i in self._by_space:
+            self._by_end.setdefault(ends[i], []).append((space, i))
+
+    def smallest_fit(self, volume: int, end: Optional[Hashable] = None) -> int:
+        """Return the position of the first bin with the least unused space
+        that is at least <volume>, or -1 if there is no such bin.  If <end> is
+        not None, only consider bins with that end.
+
+        >>> index = SpaceIndex([30, 20, 20], ['York'] * 3)
+        >>> index.smallest_fit(15), index.smallest_fit(25)
+        (1, 0)
+        >>> index.smallest_fit(35), index.smallest_fit(15, 'Guelph')
+        (-1, -1)
+        """
+        spaces = self._by_space if end is None else self._by_end.get(end, [])
+        k = bisect_left(spaces, (volume, -1))
+        if k == len(spaces):
+            return -1
+        return spaces[k][1]
+
+    def largest_fit(self, volume: int, end: Optional[Hashable] = None) -> int:
+        """Return the position of the first bin with the most unused space, or
+        -1 if it has less than <volume> unused space.  If <end> is not None,
+        only consider bins with that end.
+
+        >>> index = SpaceIndex([20, 30, 30], ['York'] * 3)
+        >>> index.largest_fit(15), index.largest_fit(35)
+        (1, -1)
+        """
+        spaces = self._by_space if end is None else self._by_end.get(end, [])
+        if not spaces or spaces[-1][0] < volume:
+            return -1
+        return spaces[bisect_left(spaces, (spaces[-1][0], -1))][1]
+
+    def random_fit(self, volume: int) -> int:
+        """Return the position of a bin chosen uniformly at random from the
+        bins with at least <volume> unused space, or -1 if there is no such
+        bin.
+
+        The bins with enough space are the end of <_by_space> from the first
+        one that fits, so the choice is a single random index into that range.
+
+        >>> index = SpaceIndex([20, 30], ['York'] * 2)
+        >>> index.random_fit(25), index.random_fit(35)
+        (1, -1)
+        """
+        spaces = self._by_space
+        k = bisect_left(spaces, (volume, -1))
+        if k == len(spaces):
+            return -1
+        return spaces[choice(range(k, len(spaces)))][1]
+
+    def move(self, i: int, space: int, end: Hashable) -> None:
+        """Record that bin <i> now has <space> unused space and end <end>.
+
+        >>> index = SpaceIndex([20, 30], ['York'] * 2)
+        >>> index.move(1, 15, 'Guelph')
+        >>> index.largest_fit(15), index.smallest_fit(10, 'Guelph')
+        (0, 1)
+        >>> index.spaces, index.ends
+        ([20, 15], ['York', 'Guelph'])
+        """
+        old = (self.spaces[i], i)
+        new = (space, i)
+        del self._by_space[bisect_left(self._by_space, old)]
+        insort(self._by_space, new)
+        old_end = self.ends[i]
+        ends = self._by_end[old_end]
+        del ends[bisect_left(ends, old)]
+        if not ends:
+            del self._by_end[old_end]
+        insort(self._by_end.setdefault(end, []), new)
+        self.spaces[i] = space
+        self.ends[i] = end
+
+
+class _TruckIndex:
+    """A SpaceIndex over Truck objects, where the end of a truck is the last
+    city on its route.
+
+    The index only stays correct if every parcel is packed through <pack>.
 
-def _incr_volume(p1: Parcel, p2: Parcel) -> bool:
-    """Return True if <p1> has lesser volume than <p2>.
+    === Private Attributes ===
+    _trucks:
+      The indexed trucks.
+    _positions:
+      A dictionary that maps the id of each truck to its position in
+      <_trucks>.
+    _index:
+      The index of the unused space and route end of each truck, by position.
     """
-    return p1.volume < p2.volume
+    _trucks: List[Truck]
+    _positions: Dict[int, int]
+    _index: SpaceIndex
+
+    def __init__(self, trucks: List[Truck]) -> None:
+        """Initialize an index of <trucks>."""
+        self._trucks = trucks
+        self._positions = {truck.id: i for i, truck in enumerate(trucks)}
+        self._index = SpaceIndex([truck.unused_space() for truck in trucks],
+                                 [truck.routes[-1] for truck in trucks])
+
+    def smallest_fit(self, volume: int,
+                     city: Optional[str] = None) -> Optional[Truck]:
+        """Return the first truck with the least unused space that is at least
+        <volume>, or None if there is no such truck.  If <city> is not None,
+        only consider trucks whose route ends at <city>.
+
+        >>> index = _TruckIndex([Truck(1, 30, 'York'), Truck(2, 20, 'York'),
+        ...                      Truck(3, 20, 'York')])
+        >>> index.smallest_fit(15).id
+        2
+        >>> index.smallest_fit(25).id
+        1
+        >>> index.smallest_fit(35) is None
+        True
+        >>> index.smallest_fit(15, 'Guelph') is None
+        True
+        """
+        return self._truck(self._index.smallest_fit(volume, city))
+
+    def largest_fit(self, volume: int,
+                    city: Optional[str] = None) -> Optional[Truck]:
+        """Return the first truck with the most unused space, or None if it has
+        less than <volume> unused space.  If <city> is not None, only consider
+        trucks whose route ends at <city>.
+
+        >>> index = _TruckIndex([Truck(1, 20, 'York'), Truck(2, 30, 'York'),
+        ...                      Truck(3, 30, 'York')])
+        >>> index.largest_fit(15).id
+        2
+        >>> index.largest_fit(35) is None
+        True
+        """
+        return self._truck(self._index.largest_fit(volume, city))
 
+    def random_fit(self, volume: int) -> Optional[Truck]:
+        """Return a truck chosen uniformly at random from the trucks with at
+        least <volume> unused space, or None if there is no such truck.
 
-def _decr_volume(p1: Parcel, p2: Parcel) -> bool:
-    """Return True if <p1>.volume is higher than <p2>.volume."""
-    return p1.volume > p2.volume
+        >>> index = _TruckIndex([Truck(1, 20, 'York'), Truck(2, 30, 'York')])
+        >>> index.random_fit(25).id
+        2
+        >>> index.random_fit(35) is None
+        True
+        """
+        return self._truck(self._index.random_fit(volume))
+
+    def pack(self, truck: Truck, parcel: Parcel) -> bool:
+        """Pack <parcel> into <truck> and update this index.  Return True iff
+        <parcel> was packed.
+
+        Precondition: <truck> is in this index.
+
+        >>> index = _TruckIndex([Truck(1, 20, 'York'), Truck(2, 30, 'York')])
+        >>> index.pack(index.largest_fit(15), Parcel(1, 15, 'York', 'Guelph'))
+        True
+        >>> index.largest_fit(15).id
+        1
+        >>> index.smallest_fit(10, 'Guelph').id
+        2
+        """
+        if not truck.pack(parcel):
+            return False
+        self._index.move(self._positions[truck.id], truck.unused_space(),
+                         truck.routes[-1])
+        return True
+
+    def _truck(self, i: int) -> Optional[Truck]:
+        """Return the truck at position <i>, or None if <i> is -1."""
+        return None if i == -1 else self._trucks[i]
+
+
+def _add_queue(parcels: List[Parcel], priority_q: Container) -> None:
+    """add <parcels> to <priority>. Implemented only for GreedyScheduler
+    schedule method."""
+    priority_q.add_all(parcels)
+
+
+def _choose(order: str) -> Container:
+    """Return a priority queue for parcels ordered by volume in <order>.
+    Volumes are small integers, so the queue is a BucketQueue.  (Parcels
+    ordered by destination are sorted instead; see GreedySession.)
+
+    precondition: <order> is either 'non-decreasing' or 'non-increasing'
+    """
+    return BucketQueue(_volume, reverse=order == 'non-increasing')
 
 
-def _incr_dest(p1: Parcel, p2: Parcel) -> bool:
-    """Return True if <p1>'s destination is alphabetically smaller than <p2>'s
-    destination."""
-    return p1.destiny < p2.destiny
+def _volume(p: Parcel) -> int:
+    """Return the volume of <p>, which is its key when parcels are ordered by
+    volume."""
+    return p.volume
 
 
-def _decr_dest(p1: Parcel, p2: Parcel) -> bool:
-    """Return True if <p1>'s destination is alphabetically larger than <p2>'s
-    destination."""
-    return p1.destiny > p2.destiny
+def _destination(p: Parcel) -> str:
+    """Return the destination of <p>, which is its key when parcels are
+    ordered by destination."""
+    return p.destiny
 
 
 if __name__ == '__main__':
@@ -266,7 +586,8 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'allowed-io': ['compare_algorithms'],
         'allowed-import-modules': ['doctest', 'python_ta', 'typing',
-                                   'random', 'container', 'domain'],
+                                   'bisect', 'random', 'container',
+                                   'domain'],
         'disable': ['E1136'],
         'max-attributes': 15,
     })